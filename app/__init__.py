@@ -19,15 +19,35 @@ def create_app():
    login_manager.init_app(app)
    cors.init_app(app)
    mail.init_app(app)
+   mail_templates.init_app(app)
    csrf.init_app(app)
    bootstrap.init_app(app)
 
    # configure celery
    make_celery(app)
+   # The web process enqueues tasks and reads their results through the shared instance
+   celery.conf.update(
+      broker_url=app.config['CELERY_BROKER_URL'],
+      result_backend=app.config['CELERY_RESULT_BACKEND'],
+      task_routes=app.config['CELERY_TASK_ROUTES']
+   )
+   invoice_api.init_app(app)
+   domain_rate_limiter.init_app(app)
 
    # import tasks to register them
    from app import tasks
 
+   # import stats and search to register their session listeners
+   from app import stats, search
+
+   # Register CLI commands
+   from app.commands import monthly_stats_cli, search_cli, invoices_cli, report_snapshots_cli, mail_outbox_cli
+   app.cli.add_command(monthly_stats_cli)
+   app.cli.add_command(search_cli)
+   app.cli.add_command(invoices_cli)
+   app.cli.add_command(report_snapshots_cli)
+   app.cli.add_command(mail_outbox_cli)
+
    # User loader for Flask-Login
    @login_manager.user_loader
    def load_user(user_id):
@@ -42,6 +62,22 @@ def create_app():
    # Import views and models after app and extensions setup
    from app import models
 
+   # Drop the cached dashboard whenever a commit touches its source tables
+   dashboard_cache.init_app(
+      app,
+      session=db.session,
+      models=(models.Job, models.Payment, models.Expense, models.Client)
+   )
+
+   # Month snapshots are immutable once built, so nothing invalidates them
+   report_cache.init_app(app)
+
+   # One confirmation email per user per CONFIRMATION_THROTTLE_CACHE_TTL
+   confirmation_throttle.init_app(app)
+
+   # Reload the cached job form choices whenever a commit touches clients or job types
+   form_choices.init_app(app, session=db.session, models=(models.Client, models.JobType))
+
    # Register Blueprints for different routes (modular views)
    from app.views import auth_bp, main_bp, clients_bp, jobs_bp, http_bp
    app.register_blueprint(auth_bp)
@@ -0,0 +1,203 @@
+# app/cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from sqlalchemy import event
+
+
+class ContextCache:
+    """
+    Cache JSON-serialisable view contexts in Redis.
+
+    Falls back to an in-process LRU while Redis is unreachable, and drops
+    every entry once a committed session flush touched one of the watched
+    models. Another process cannot clear this LRU, so its entries live at
+    most local_ttl seconds. Each clear bumps a generation counter; pass the
+    generation read before computing a value to set, and the value is only
+    stored if no clear happened in between.
+    """
+
+    def __init__(self, namespace, ttl=300, max_local_entries=128, retry_interval=30, local_ttl=30):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_local_entries = max_local_entries
+        self.retry_interval = retry_interval
+        self.redis = None
+        self.hits = 0
+        self.misses = 0
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_down_until = 0
+        self._generation = 0
+        self._watched_models = ()
+
+    def init_app(self, app, session=None, models=()):
+        self.ttl = app.config.get(f'{self.namespace.upper()}_CACHE_TTL', self.ttl)
+        self.redis = redis.Redis.from_url(
+            app.config['REDIS_URL'],
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+        if session is not None and not self._watched_models:
+            self._watched_models = tuple(models)
+            event.listen(session, 'after_flush', self._after_flush)
+            event.listen(session, 'after_commit', self._after_commit)
+            event.listen(session, 'after_rollback', self._after_rollback)
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def _redis_available(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self):
+        self._redis_down_until = time.monotonic() + self.retry_interval
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        value = None
+        if self._redis_available():
+            try:
+                raw = self.redis.get(self._key(key))
+                value = json.loads(raw) if raw is not None else None
+            except redis.RedisError:
+                self._redis_failed()
+                value = self._local_get(key)
+        else:
+            value = self._local_get(key)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def generation(self):
+        """Return the current generation, to hand to set after computing a value"""
+        if self._redis_available():
+            try:
+                return int(self.redis.get(self._key('generation')) or 0)
+            except redis.RedisError:
+                self._redis_failed()
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, generation=None):
+        """
+        Store value under key for the configured TTL.
+
+        With a generation from generation(), nothing is stored if the cache
+        was cleared since, as value may predate the commit that cleared it.
+        """
+        if self._redis_available():
+            try:
+                with self.redis.pipeline() as pipe:
+                    # WATCH makes the write fail if a clear bumps the generation before it runs
+                    pipe.watch(self._key('generation'))
+                    if generation is not None and int(pipe.get(self._key('generation')) or 0) != generation:
+                        return
+                    pipe.multi()
+                    pipe.set(self._key(key), json.dumps(value), ex=self.ttl)
+                    pipe.sadd(self._key('keys'), self._key(key))
+                    pipe.execute()
+                return
+            except redis.WatchError:
+                return
+            except redis.RedisError:
+                self._redis_failed()
+        self._local_set(key, value, generation)
+
+    def add(self, key, value):
+        """Store value under key for the configured TTL unless key is already cached; returns True when stored"""
+        if self._redis_available():
+            try:
+                pipe = self.redis.pipeline()
+                pipe.set(self._key(key), json.dumps(value), ex=self.ttl, nx=True)
+                pipe.sadd(self._key('keys'), self._key(key))
+                stored, _ = pipe.execute()
+                return bool(stored)
+            except redis.RedisError:
+                self._redis_failed()
+        if self._local_get(key) is not None:
+            return False
+        self._local_set(key, value)
+        return True
+
+    def delete(self, key):
+        """Drop key from Redis and the local LRU"""
+        with self._lock:
+            self._local.pop(key, None)
+        if self._redis_available():
+            try:
+                pipe = self.redis.pipeline()
+                pipe.delete(self._key(key))
+                pipe.srem(self._key('keys'), self._key(key))
+                pipe.execute()
+            except redis.RedisError:
+                self._redis_failed()
+
+    def clear(self):
+        """Drop every entry in this namespace from Redis and the local LRU, and start a new generation"""
+        with self._lock:
+            self._generation += 1
+            self._local.clear()
+        if self._redis_available():
+            try:
+                self.redis.incr(self._key('generation'))
+                keys = self.redis.smembers(self._key('keys'))
+                self.redis.delete(self._key('keys'), *keys)
+            except redis.RedisError:
+                self._redis_failed()
+
+    def stats(self):
+        """Return the hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'namespace': self.namespace,
+                'backend': 'redis' if self._redis_available() else 'local',
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+                'local_entries': len(self._local)
+            }
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._local[key] = (time.monotonic() + min(self.ttl, self.local_ttl), value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def _after_flush(self, session, flush_context):
+        # Remember whether this transaction touched a watched model
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, self._watched_models):
+                session.info[self._key('stale')] = True
+                return
+
+    def _after_commit(self, session):
+        if session.info.pop(self._key('stale'), False):
+            self.clear()
+
+    def _after_rollback(self, session):
+        session.info.pop(self._key('stale'), None)
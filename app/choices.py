@@ -0,0 +1,134 @@
+# app/choices.py
+import bisect
+import re
+import threading
+import time
+
+from sqlalchemy import event, select
+
+
+def _tokens(name):
+    return re.findall(r'\w+', name.lower())
+
+
+class ChoiceSnapshot:
+    """Active client and job type choices plus a word-prefix index over client names"""
+
+    def __init__(self, clients, job_types):
+        self.clients = clients
+        self.job_types = job_types
+        self.client_names = dict(clients)
+        self._client_tokens = {client_id: _tokens(name) for client_id, name in clients}
+        self._index = sorted(
+            (token, client_id)
+            for client_id, tokens in self._client_tokens.items()
+            for token in tokens
+        )
+
+    def _ids_with_prefix(self, prefix):
+        ids = set()
+        position = bisect.bisect_left(self._index, (prefix,))
+        while position < len(self._index) and self._index[position][0].startswith(prefix):
+            ids.add(self._index[position][1])
+            position += 1
+        return ids
+
+    def search_clients(self, query, limit=10):
+        """Return up to limit (id, name) clients with a word starting with every term of query"""
+        terms = _tokens(query)
+        if not terms:
+            return []
+
+        # Walk the index for the longest term, then check the rest per client
+        terms.sort(key=len, reverse=True)
+        matches = [
+            client_id for client_id in self._ids_with_prefix(terms[0])
+            if all(
+                any(token.startswith(term) for token in self._client_tokens[client_id])
+                for term in terms[1:]
+            )
+        ]
+
+        # Names that start with the query come first, then alphabetical
+        lowered = query.strip().lower()
+        matches.sort(key=lambda client_id: (
+            not self.client_names[client_id].lower().startswith(lowered),
+            self.client_names[client_id].lower(),
+            client_id
+        ))
+        return [(client_id, self.client_names[client_id]) for client_id in matches[:limit]]
+
+
+class ChoiceCache:
+    """
+    Cache the AddJobForm choice lists in process memory.
+
+    The snapshot is dropped once a committed session flush touched a Client
+    or JobType, and after ttl seconds so other processes' changes show up.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._snapshot = None
+        self._expires_at = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._watched_models = ()
+
+    def init_app(self, app, session=None, models=()):
+        self.ttl = app.config.get('FORM_CHOICES_TTL', self.ttl)
+        if session is not None and not self._watched_models:
+            self._watched_models = tuple(models)
+            event.listen(session, 'after_flush', self._after_flush)
+            event.listen(session, 'after_commit', self._after_commit)
+            event.listen(session, 'after_rollback', self._after_rollback)
+
+    def get(self):
+        """Return the current ChoiceSnapshot, loading it on first use or after invalidation"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._expires_at:
+            return snapshot
+
+        generation = self._generation
+        snapshot = self._load()
+        with self._lock:
+            # Only keep it if no commit invalidated the tables while it loaded
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._expires_at = time.monotonic() + self.ttl
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _load(self):
+        from app.extensions import db
+        from app.models import Client, ClientStatusEnum, JobType
+
+        clients = db.session.execute(
+            select(Client.id, Client.name)
+            .where(Client.status == ClientStatusEnum.ACTIVE)
+            .order_by(Client.name, Client.id)
+        ).all()
+        job_types = db.session.execute(
+            select(JobType.id, JobType.name).order_by(JobType.name, JobType.id)
+        ).all()
+        return ChoiceSnapshot(
+            [tuple(row) for row in clients],
+            [tuple(row) for row in job_types]
+        )
+
+    def _after_flush(self, session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, self._watched_models):
+                session.info['form_choices_stale'] = True
+                return
+
+    def _after_commit(self, session):
+        if session.info.pop('form_choices_stale', False):
+            self.clear()
+
+    def _after_rollback(self, session):
+        session.info.pop('form_choices_stale', None)
@@ -0,0 +1,106 @@
+# app/client_reminders.py
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db, domain_rate_limiter, mail_templates
+from app.models import Client, ClientReminder, Job, Payment, PaymentStatus
+from app.outbox import queue_email
+
+
+def reminder_period(today):
+    """Return the ISO week a weekly reminder belongs to, e.g. '2026-W42'"""
+    year, week, _ = today.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def overdue_clients(today):
+    """
+    Read every client with an email address and overdue unpaid payments,
+    with one query grouped by client.
+
+    Returns:
+        list: A JSON-serialisable dict per client with client_id, client,
+            email, payment_count, total_overdue and oldest_due_date (ISO).
+    """
+    rows = db.session.query(
+        Client.id,
+        Client.name,
+        Client.email,
+        func.count(Payment.id),
+        func.sum(Payment.amount),
+        func.min(Payment.due_date)
+    ).join(
+        Job, Job.client_id == Client.id
+    ).join(
+        Payment, Payment.job_id == Job.id
+    ).filter(
+        Payment.payment_status == PaymentStatus.UNPAID,
+        Payment.due_date < today,
+        Client.email.isnot(None)
+    ).group_by(
+        Client.id, Client.name, Client.email
+    ).order_by(Client.id)
+
+    return [
+        {
+            'client_id': client_id,
+            'client': name,
+            'email': email,
+            'payment_count': payment_count,
+            'total_overdue': total_overdue,
+            'oldest_due_date': oldest_due_date.isoformat()
+        }
+        for client_id, name, email, payment_count, total_overdue, oldest_due_date in rows
+    ]
+
+
+def queue_client_reminder(reminder, period, started_at):
+    """
+    Queue one client's payment reminder for period, at most once.
+
+    The ClientReminder row and the outbox email are committed together, so a
+    retried task finds the row and queues nothing, and a concurrent
+    duplicate loses on the unique (client_id, period) constraint. The email
+    is held back until the slot the domain rate limiter gives it.
+
+    Args:
+        reminder (dict): An overdue_clients entry.
+        started_at (datetime): When the fan-out run started.
+
+    Returns:
+        dict: The reminder with a 'status' of 'queued' (and its 'send_at') or 'duplicate'.
+    """
+    already_sent = db.session.query(ClientReminder.id).filter_by(
+        client_id=reminder['client_id'], period=period
+    ).first()
+    if already_sent:
+        return {**reminder, 'status': 'duplicate'}
+
+    send_at = domain_rate_limiter.reserve(f'{period}:{started_at.isoformat()}', reminder['email'], started_at)
+    oldest_due_date = datetime.fromisoformat(reminder['oldest_due_date'])
+    message = mail_templates.message(
+        'client_payment_reminder',
+        subject=f"Payment reminder - £{reminder['total_overdue']:.2f} overdue",
+        recipients=[reminder['email']],
+        client=reminder['client'],
+        payment_count=reminder['payment_count'],
+        total_overdue=reminder['total_overdue'],
+        oldest_due_date=oldest_due_date,
+        days_overdue=(started_at - oldest_due_date).days
+    )
+    email = queue_email(message, commit=False, send_at=send_at)
+    db.session.flush()
+    db.session.add(ClientReminder(
+        client_id=reminder['client_id'],
+        period=period,
+        outbox_email_id=email.id,
+        total_overdue=reminder['total_overdue']
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return {**reminder, 'status': 'duplicate'}
+    return {**reminder, 'status': 'queued', 'send_at': send_at.isoformat()}
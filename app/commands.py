@@ -0,0 +1,139 @@
+# app/commands.py
+import click
+from flask.cli import AppGroup
+
+monthly_stats_cli = AppGroup('monthly-stats', help='Maintain the monthly_stats rollup table.')
+search_cli = AppGroup('search', help='Maintain the job search index.')
+invoices_cli = AppGroup('invoices', help='Render invoice PDFs in bulk.')
+report_snapshots_cli = AppGroup('report-snapshots', help='Maintain the report_snapshots table.')
+mail_outbox_cli = AppGroup('mail-outbox', help='Inspect and drain the mail outbox.')
+
+
+def parse_month(ctx, param, value):
+    """Click callback turning YYYY-MM into a (year, month) tuple"""
+    if value is None:
+        return None
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM")
+    if not 1 <= month <= 12:
+        raise click.BadParameter("month must be between 01 and 12")
+    return year, month
+
+
+@monthly_stats_cli.command('rebuild')
+def rebuild_monthly_stats_command():
+    """Recompute every monthly_stats row from the raw tables"""
+    from app.stats import rebuild_monthly_stats
+
+    count = rebuild_monthly_stats()
+    click.echo(f"Rebuilt {count} monthly_stats rows")
+
+
+@monthly_stats_cli.command('verify')
+@click.option('--fix', is_flag=True, help='Rebuild the rollups if any drift is found.')
+def verify_monthly_stats_command(fix):
+    """Report monthly_stats rows that differ from the raw tables"""
+    from app.stats import rebuild_monthly_stats, verify_monthly_stats
+
+    drift = verify_monthly_stats()
+    if not drift:
+        click.echo("monthly_stats is consistent with the raw tables")
+        return
+
+    for item in drift:
+        year, month, client_id, job_type_id = item['key']
+        click.echo(
+            f"{year}-{month:02d} client={client_id} job_type={job_type_id}: "
+            f"expected {item['expected']}, stored {item['stored']}"
+        )
+    click.echo(f"{len(drift)} drifted buckets")
+
+    if fix:
+        count = rebuild_monthly_stats()
+        click.echo(f"Rebuilt {count} monthly_stats rows")
+    else:
+        raise SystemExit(1)
+
+
+@search_cli.command('rebuild')
+def rebuild_search_index_command():
+    """Rebuild every job search document from the raw tables"""
+    from app.search import rebuild_search_index
+
+    count = rebuild_search_index()
+    click.echo(f"Indexed {count} jobs")
+
+
+@invoices_cli.command('month-end')
+@click.option('--year', type=int, help='Invoice year (defaults to last month).')
+@click.option('--month', type=click.IntRange(1, 12), help='Invoice month (defaults to last month).')
+@click.option('--concurrency', type=click.IntRange(min=1), help='Rendering processes (INVOICE_RUN_CONCURRENCY).')
+def month_end_invoices_command(year, month, concurrency):
+    """Render the month's invoice PDF for every active client"""
+    from app.invoice_run import run_month_end_invoices
+
+    if (year is None) != (month is None):
+        raise click.UsageError("Pass --year and --month together")
+
+    manifest = run_month_end_invoices(year, month, concurrency)
+    for entry in manifest['invoices']:
+        status = f"FAILED {entry['error']}" if entry['error'] else ('cached' if entry['cached'] else 'rendered')
+        click.echo(f"{entry['client_name']}: {entry['jobs']} jobs, {entry['seconds']:.2f}s, {status}")
+    click.echo(
+        f"{manifest['period']}: {manifest['clients']} invoices ({manifest['rendered']} rendered, "
+        f"{manifest['cached']} cached, {manifest['failed']} failed) in {manifest['wall_seconds']:.1f}s"
+    )
+    click.echo(f"Manifest written to {manifest['manifest']}")
+    if manifest['failed']:
+        raise SystemExit(1)
+
+
+@report_snapshots_cli.command('backfill')
+@click.option('--since', callback=parse_month, help='First month as YYYY-MM (defaults to the earliest job).')
+@click.option('--until', callback=parse_month, help='Last month as YYYY-MM (defaults to last month).')
+@click.option('--batch-size', default=12, show_default=True, type=click.IntRange(min=1), help='Months per batch.')
+@click.option('--overwrite', is_flag=True, help='Take the snapshot again for months that already have one.')
+def backfill_report_snapshots_command(since, until, batch_size, overwrite):
+    """Store report snapshots for past months from the monthly_stats rollup"""
+    from app.reporting import backfill_report_snapshots, first_report_month
+    from app.stats import previous_month
+
+    since = since or first_report_month()
+    until = until or previous_month()
+    if since is None:
+        click.echo("No jobs to snapshot")
+        return
+
+    count = backfill_report_snapshots(since, until, batch_size=batch_size, overwrite=overwrite)
+    click.echo(f"Wrote {count} report snapshots from {since[0]}-{since[1]:02d} to {until[0]}-{until[1]:02d}")
+
+
+@mail_outbox_cli.command('status')
+def mail_outbox_status_command():
+    """Count the outbox emails in each status"""
+    from app.extensions import db
+    from app.models import OutboxEmail, OutboxStatus
+
+    counts = dict(db.session.query(OutboxEmail.status, db.func.count(OutboxEmail.id)).group_by(OutboxEmail.status))
+    for status in OutboxStatus:
+        click.echo(f"{status.value}: {counts.get(status, 0)}")
+
+
+@mail_outbox_cli.command('deliver')
+def deliver_mail_outbox_command():
+    """Send the due outbox emails now instead of waiting for the worker"""
+    from app.outbox import drain_outbox
+
+    totals = drain_outbox()
+    click.echo(f"{totals['sent']} sent, {totals['retrying']} retrying, {totals['dead']} dead")
+
+
+@mail_outbox_cli.command('requeue-dead')
+def requeue_dead_emails_command():
+    """Queue every dead-lettered email again"""
+    from app.outbox import requeue_dead_emails
+
+    count = requeue_dead_emails()
+    click.echo(f"Requeued {count} dead emails")
@@ -7,15 +7,27 @@ from flask_talisman import Talisman
 from flask_wtf.csrf import CSRFProtect
 from celery import Celery
 from flask_bootstrap import Bootstrap5
+from app.cache import ContextCache
+from app.choices import ChoiceCache
+from app.invoicing import InvoiceApiClient
+from app.mail_templates import MailTemplates
+from app.ratelimit import DomainRateLimiter
 
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 cors = CORS()
 mail = Mail()
+mail_templates = MailTemplates()
 # talisman = Talisman()
 csrf = CSRFProtect()
 bootstrap = Bootstrap5()
+dashboard_cache = ContextCache('dashboard')
+report_cache = ContextCache('report')
+confirmation_throttle = ContextCache('confirmation_throttle')
+form_choices = ChoiceCache()
+invoice_api = InvoiceApiClient()
+domain_rate_limiter = DomainRateLimiter()
 
 celery = Celery()
 
@@ -46,6 +58,7 @@ def make_celery(app):
         result_serializer='json',
         timezone='UTC',
         enable_utc=True,
+        task_routes=app.config['CELERY_TASK_ROUTES'],
     )
     
     class ContextTask(celery.Task):
@@ -55,4 +68,38 @@ def make_celery(app):
 
 
     celery.Task = ContextTask
-    return celery
\ No newline at end of file
+    return celery
+
+
+def apply_worker_profile(celery, app, name):
+    """
+    Configure a worker's Celery instance from one of the app's CELERY_WORKER_PROFILES.
+
+    The profile sets the queues the worker consumes, its concurrency and
+    prefetch multiplier, whether tasks are acknowledged only once they
+    finish, whether results are stored, and how many tasks a pool process
+    runs before it is replaced. The worker's -Q and --concurrency options
+    still override it.
+
+    Args:
+        celery: The worker's Celery instance.
+        app: The Flask app whose config holds the profiles.
+        name (str): The profile to apply.
+
+    Returns:
+        dict: The applied profile.
+    """
+    profiles = app.config['CELERY_WORKER_PROFILES']
+    if name not in profiles:
+        raise ValueError(f"Unknown Celery worker profile {name!r}, expected one of: {', '.join(profiles)}")
+
+    profile = profiles[name]
+    celery.conf.update(
+        worker_concurrency=profile['concurrency'],
+        worker_prefetch_multiplier=profile['prefetch_multiplier'],
+        task_acks_late=profile['acks_late'],
+        task_ignore_result=profile['ignore_result'],
+        worker_max_tasks_per_child=profile['max_tasks_per_child'],
+    )
+    celery.amqp.queues.select(profile['queues'])
+    return profile
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField,SubmitField, SelectField
-from wtforms.validators import DataRequired, Length
+from wtforms.validators import DataRequired, Email, Length, Optional
 from app.models import ClientStatusEnum, ClientTypeEnum
 
 class AddClientForm(FlaskForm):
@@ -13,6 +13,7 @@ class AddClientForm(FlaskForm):
     city = StringField('City', validators=[DataRequired()])
     state = StringField('State', validators=[DataRequired()])
     post_code = StringField('Post Code', validators=[DataRequired()])
+    email = StringField('Email', validators=[Optional(), Email()])
     submit = SubmitField('Add Client')
 
 class EditClientForm(FlaskForm):
@@ -23,4 +24,5 @@ class EditClientForm(FlaskForm):
     city = StringField('City', validators=[DataRequired()])
     state = StringField('State', validators=[DataRequired()])
     post_code = StringField('Post Code', validators=[DataRequired()])
+    email = StringField('Email', validators=[Optional(), Email()])
     submit = SubmitField('Update Client')
\ No newline at end of file
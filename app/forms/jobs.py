@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
 from wtforms import SelectField, SubmitField, DateTimeField, DecimalField, StringField, TextAreaField
 from wtforms.validators import DataRequired, ValidationError
-from app.models import Client, JobType, ClientStatusEnum
+from app.extensions import form_choices
+from flask import current_app
 from datetime import datetime
 
 
@@ -19,17 +20,14 @@ class AddJobForm(FlaskForm):
 
         super(AddJobForm, self).__init__(*args, **kwargs)
         
-        # Get active clients dynamically
-        active_clients = Client.query.filter_by(status=ClientStatusEnum.ACTIVE).all()
-        self.client_id.choices = [(0, 'Select a client...')] + [
-            (client.id, client.name) for client in active_clients
-        ]
-        
-        # Get job types dynamically
-        job_types = JobType.query.all()
-        self.job_type_id.choices = [(0, 'Select a job type...')] + [
-            (job_type.id, job_type.name) for job_type in job_types
-        ]
+        # Choices come from the per-process cache, reloaded when clients or job types change
+        choices = form_choices.get()
+        self.client_id.choices = [(0, 'Select a client...')] + choices.clients
+        self.job_type_id.choices = [(0, 'Select a job type...')] + choices.job_types
+
+        # Large client lists are picked through the typeahead rather than rendered as a <select>
+        self.client_typeahead = len(choices.clients) > current_app.config['JOB_FORM_CLIENT_SELECT_LIMIT']
+        self.client_name = choices.client_names.get(self.client_id.data, '')
 
     def validate_time_started(self, field):
         """Validate that start time is not in the future"""
@@ -0,0 +1,121 @@
+# app/invoice_pdf.py
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from flask import current_app
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Bump when the layout changes so cached PDFs are rendered again
+RENDERER_VERSION = 1
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def invoice_digest(invoice_data):
+    """Hash a get_invoice_data payload; equal payloads always give the same digest"""
+    canonical = json.dumps(
+        {'renderer': RENDERER_VERSION, 'invoice': invoice_data},
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def invoice_pdf_path(digest, directory=None):
+    """Path of the cached PDF for a digest, in INVOICE_PDF_DIR unless directory is given"""
+    return os.path.join(directory or current_app.config['INVOICE_PDF_DIR'], f'{digest}.pdf')
+
+
+def get_invoice_pdf(invoice_data, directory=None):
+    """
+    Return the cached PDF for an invoice payload, rendering it on a cache miss.
+
+    Args:
+        invoice_data (dict): A get_invoice_data payload.
+        directory (str): Cache directory; needed outside an app context.
+
+    Returns:
+        tuple: The payload digest, the PDF path and whether it was already cached.
+    """
+    digest = invoice_digest(invoice_data)
+    path = invoice_pdf_path(digest, directory)
+    if os.path.exists(path):
+        return digest, path, True
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Render next to the target and rename, so readers never see a partial file
+    partial = f'{path}.{os.getpid()}.tmp'
+    try:
+        render_invoice_pdf(invoice_data, partial, reference=digest[:12].upper())
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return digest, path, False
+
+
+def render_invoice_pdf(invoice_data, path, reference=''):
+    """Render a get_invoice_data payload as an A4 PDF invoice"""
+    styles = getSampleStyleSheet()
+    document = SimpleDocTemplate(
+        path,
+        pagesize=A4,
+        leftMargin=18 * mm,
+        rightMargin=18 * mm,
+        topMargin=18 * mm,
+        bottomMargin=18 * mm,
+        title=f"Invoice {reference}",
+        author="MaidVally"
+    )
+
+    address = [
+        invoice_data.get(key) for key in ('client_address', 'client_city', 'client_state', 'client_post_code')
+    ]
+    story = [
+        Paragraph("Invoice", styles['Title']),
+        Paragraph(f"Reference: {reference}", styles['Normal']),
+        Spacer(1, 6 * mm),
+        Paragraph(f"<b>{_escape(invoice_data['client_name'])}</b>", styles['Normal']),
+        Paragraph("<br/>".join(_escape(line) for line in address if line), styles['Normal']),
+        Spacer(1, 8 * mm)
+    ]
+
+    cell = styles['BodyText']
+    rows = [['Date', 'Job Type', 'Description', 'Location', 'Amount']]
+    total = 0
+    for job in invoice_data['jobs']:
+        total += job['total_amount']
+        rows.append([
+            datetime.fromisoformat(job['time_started']).strftime('%d/%m/%Y'),
+            Paragraph(_escape(job['job_type']), cell),
+            Paragraph(_escape(job.get('description') or ''), cell),
+            Paragraph(_escape(job.get('location') or ''), cell),
+            f"£{job['total_amount']:,.2f}"
+        ])
+    rows.append(['', '', '', 'Total', f"£{total:,.2f}"])
+
+    table = Table(rows, colWidths=[24 * mm, 32 * mm, 60 * mm, 32 * mm, 26 * mm], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#343a40')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f2f2f2')]),
+        ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP')
+    ]))
+    story.append(table)
+
+    document.build(story)
+
+
+def _escape(text):
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
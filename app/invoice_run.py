@@ -0,0 +1,169 @@
+# app/invoice_run.py
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.invoice_pdf import get_invoice_pdf
+from app.models import Client, ClientStatusEnum, Job, JobType
+from app.stats import month_bounds, previous_month
+
+
+def collect_month_invoices(year, month):
+    """
+    Build the invoice payload of every active client with jobs in a month.
+
+    One query reads the month's jobs for all active clients, ordered by
+    client, and the rows are grouped per client into payloads shaped like
+    get_invoice_data(client_id, period) so they share its PDF cache entries.
+    """
+    start, end = month_bounds(year, month)
+    rows = db.session.execute(
+        select(
+            Client.id.label('client_id'),
+            Client.name.label('client_name'),
+            Client.address,
+            Client.city,
+            Client.state,
+            Client.post_code,
+            Job.id.label('job_id'),
+            JobType.name.label('job_type'),
+            Job.total_amount,
+            Job.time_started,
+            Job.time_ended,
+            Job.location,
+            Job.description
+        )
+        .join(Job, Job.client_id == Client.id)
+        .join(JobType, JobType.id == Job.job_type_id)
+        .where(
+            Client.status == ClientStatusEnum.ACTIVE,
+            Job.time_started >= start,
+            Job.time_started < end
+        )
+        .order_by(Client.id, Job.time_started, Job.id)
+    )
+
+    payloads = []
+    for _, client_rows in groupby(rows, key=lambda row: row.client_id):
+        client_rows = list(client_rows)
+        first = client_rows[0]
+        payloads.append({
+            "client_id": first.client_id,
+            "client_name": first.client_name,
+            'client_address': first.address,
+            'client_city': first.city,
+            'client_state': first.state,
+            'client_post_code': first.post_code,
+            "jobs": [
+                {
+                    "job_id": row.job_id,
+                    "job_type": row.job_type,
+                    "total_amount": row.total_amount,
+                    "time_started": row.time_started.isoformat(),
+                    "time_ended": row.time_ended.isoformat(),
+                    "location": row.location,
+                    "description": row.description
+                }
+                for row in client_rows
+            ]
+        })
+    return payloads
+
+
+def render_invoice_entry(invoice_data, directory):
+    """Render one client's invoice and return its manifest entry with the time it took"""
+    started = time.perf_counter()
+    entry = {
+        'client_id': invoice_data['client_id'],
+        'client_name': invoice_data['client_name'],
+        'jobs': len(invoice_data['jobs']),
+        'total_amount': round(sum(job['total_amount'] for job in invoice_data['jobs']), 2)
+    }
+    try:
+        digest, path, cached = get_invoice_pdf(invoice_data, directory)
+        entry.update(digest=digest, file=os.path.basename(path), cached=cached, error=None)
+    except Exception as e:
+        entry.update(digest=None, file=None, cached=False, error=f'{type(e).__name__}: {e}')
+    entry['seconds'] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def _render(args):
+    return render_invoice_entry(*args)
+
+
+def write_manifest(year, month, invoices, started_at, directory, **details):
+    """
+    Write the JSON manifest of a month-end run under directory/runs.
+
+    Args:
+        invoices (list): render_invoice_entry results, one per client.
+        started_at (float): time.time() when the run started.
+        details: Extra top-level fields, e.g. the concurrency used.
+
+    Returns:
+        dict: The manifest, plus its path under 'manifest'.
+    """
+    finished_at = time.time()
+    manifest = {
+        'period': f'{year}-{month:02d}',
+        'started_at': datetime.fromtimestamp(started_at).isoformat(timespec='seconds'),
+        'finished_at': datetime.fromtimestamp(finished_at).isoformat(timespec='seconds'),
+        'wall_seconds': round(finished_at - started_at, 3),
+        **details,
+        'clients': len(invoices),
+        'rendered': len([entry for entry in invoices if not entry['error'] and not entry['cached']]),
+        'cached': len([entry for entry in invoices if entry['cached']]),
+        'failed': len([entry for entry in invoices if entry['error']]),
+        'invoices': invoices
+    }
+
+    runs = os.path.join(directory, 'runs')
+    os.makedirs(runs, exist_ok=True)
+    path = os.path.join(
+        runs, f"{year}-{month:02d}-{datetime.fromtimestamp(started_at).strftime('%Y%m%dT%H%M%S%f')}.json"
+    )
+    with open(path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    manifest['manifest'] = path
+    return manifest
+
+
+def run_month_end_invoices(year=None, month=None, concurrency=None):
+    """
+    Render the month's invoice PDF for every active client in a process pool.
+
+    Args:
+        year (int): Invoice year; defaults with month to the previous month.
+        month (int): Invoice month.
+        concurrency (int): Pool size; defaults to INVOICE_RUN_CONCURRENCY.
+
+    Returns:
+        dict: The run manifest, also written as JSON under INVOICE_PDF_DIR/runs.
+    """
+    if year is None or month is None:
+        year, month = previous_month()
+    concurrency = max(1, concurrency or current_app.config['INVOICE_RUN_CONCURRENCY'])
+    directory = current_app.config['INVOICE_PDF_DIR']
+
+    started_at = time.time()
+    payloads = collect_month_invoices(year, month)
+    collect_seconds = round(time.time() - started_at, 3)
+
+    work = [(payload, directory) for payload in payloads]
+    if concurrency == 1 or len(work) <= 1:
+        invoices = [_render(item) for item in work]
+    else:
+        with ProcessPoolExecutor(max_workers=min(concurrency, len(work))) as pool:
+            invoices = list(pool.map(_render, work))
+
+    return write_manifest(
+        year, month, invoices, started_at, directory, concurrency=concurrency, collect_seconds=collect_seconds
+    )
@@ -0,0 +1,181 @@
+# app/invoicing.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class InvoiceApiError(Exception):
+    pass
+
+
+def invoice_idempotency_key(invoice_data):
+    """Key for an invoice payload; posting the same invoice again always sends the same key"""
+    canonical = json.dumps(invoice_data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class CircuitOpenError(InvoiceApiError):
+    pass
+
+
+class InvoiceApiUnavailable(InvoiceApiError):
+    """The call timed out, lost its connection or was answered 429/5xx; the API may still have acted on it"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service for a while.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast. Once reset_timeout seconds have passed a single trial call is
+    let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial_running):
+                raise CircuitOpenError("Invoice API circuit is open; not calling it")
+            if state == 'half-open':
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class InvoiceApiClient:
+    """
+    Post invoices to the invoice API over a pooled keep-alive session.
+
+    Only connection errors, where the request never reached the API, are
+    retried here, a bounded number of times with exponential backoff. A read
+    timeout or a 429/5xx answer raises InvoiceApiUnavailable straight away,
+    since the API may already have created the invoice; the post_invoice task
+    posts it again later, with the same Idempotency-Key header derived from
+    the payload, and the API answers a repeated key with the invoice it
+    created the first time. A call that fails counts once towards the circuit
+    breaker. State is kept per process, so every Celery worker child has its
+    own pool and breaker.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self):
+        self.url = None
+        self.timeout = None
+        self.retries = 3
+        self.backoff = 0.5
+        self.breaker = CircuitBreaker()
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.url = app.config['INVOICE_API_URL']
+        self.timeout = (app.config['INVOICE_API_CONNECT_TIMEOUT'], app.config['INVOICE_API_READ_TIMEOUT'])
+        self.retries = app.config['INVOICE_API_RETRIES']
+        self.backoff = app.config['INVOICE_API_BACKOFF']
+        self.breaker = CircuitBreaker(
+            failure_threshold=app.config['INVOICE_API_BREAKER_THRESHOLD'],
+            reset_timeout=app.config['INVOICE_API_BREAKER_RESET']
+        )
+        self.close()
+
+    @property
+    def session(self):
+        # Pooled sockets must not be shared with a forked worker child
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                self._session = self._make_session()
+                self._session_pid = os.getpid()
+            return self._session
+
+    def _make_session(self):
+        # POST is not in allowed_methods, so read errors and error statuses are never retried here
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=0,
+            backoff_factor=self.backoff,
+            raise_on_status=False
+        )
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        session.mount('https://', HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        return session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+    def post_invoice(self, invoice_data, idempotency_key=None):
+        """
+        Post invoice data and return the API's JSON response.
+
+        Args:
+            idempotency_key (str): Sent as the Idempotency-Key header; defaults
+                to invoice_idempotency_key(invoice_data).
+
+        Raises:
+            CircuitOpenError: The API failed repeatedly and is not being called.
+            InvoiceApiUnavailable: The call failed in a way worth posting again later.
+            InvoiceApiError: The API rejected the invoice or sent back a bad response.
+        """
+        self.breaker.before_call()
+        try:
+            response = self.session.post(
+                self.url,
+                json=invoice_data,
+                headers={'Idempotency-Key': idempotency_key or invoice_idempotency_key(invoice_data)},
+                timeout=self.timeout
+            )
+            if response.status_code in self.RETRY_STATUSES:
+                raise InvoiceApiUnavailable(f"Invoice API answered {response.status_code}")
+            response.raise_for_status()
+            result = response.json()
+        except InvoiceApiUnavailable:
+            self.breaker.record_failure()
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self.breaker.record_failure()
+            raise InvoiceApiUnavailable(str(e)) from e
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            raise InvoiceApiError(str(e)) from e
+        self.breaker.record_success()
+        return result
@@ -0,0 +1,108 @@
+# app/mail_templates.py
+import io
+import os
+
+from flask_mail import Message
+from markupsafe import escape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateNotFound, select_autoescape
+
+
+def money(value):
+    """Format an amount as pounds with two decimals"""
+    return f"£{value:.2f}"
+
+
+class MailTemplates:
+    """
+    Render emails from the templates in templates/mail.
+
+    An email NAME is a NAME.txt template for the plain-text part and an
+    optional NAME.html template for the HTML part. Templates are compiled
+    once per process, and their bytecode is cached on disk so new worker
+    processes skip parsing them. Rendering streams each template's chunks
+    into a single buffer.
+    """
+
+    def __init__(self):
+        self.env = None
+        self._text_only = set()
+        self._rendered = {}
+
+    def init_app(self, app):
+        cache_dir = app.config.get('MAIL_TEMPLATE_CACHE_DIR')
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.env = Environment(
+            loader=FileSystemLoader(os.path.join(app.root_path, app.template_folder, 'mail')),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            autoescape=select_autoescape(['html']),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=app.debug
+        )
+        self.env.filters['money'] = money
+        self._text_only = set()
+        self._rendered = {}
+
+    def _stream(self, template, context):
+        buffer = io.StringIO()
+        buffer.writelines(template.generate(context))
+        return buffer.getvalue()
+
+    def _html_template(self, name):
+        # Remember which emails have no HTML part instead of looking for it on every send
+        if name in self._text_only:
+            return None
+        try:
+            return self.env.get_template(f'{name}.html')
+        except TemplateNotFound:
+            self._text_only.add(name)
+            return None
+
+    def render(self, name, **context):
+        """
+        Render an email's parts.
+
+        Returns:
+            tuple: The text part, and the HTML part or None when the email has no NAME.html template.
+        """
+        text = self._stream(self.env.get_template(f'{name}.txt'), context)
+        html_template = self._html_template(name)
+        html = self._stream(html_template, context) if html_template is not None else None
+        return text, html
+
+    def render_cached(self, name, slots, **context):
+        """
+        Render an email whose only per-send values are the strings in slots.
+
+        Both parts are rendered once per template version with a placeholder
+        for each slot, and later calls only substitute the slot values
+        (HTML-escaped in the HTML part). Slots must be printed as they are,
+        without filters, and context must not change between calls.
+        """
+        text_template = self.env.get_template(f'{name}.txt')
+        html_template = self._html_template(name)
+        cached = self._rendered.get(name)
+        # get_template hands back a new Template when auto_reload picks up an edit
+        if cached is None or cached[0] is not text_template or cached[1] is not html_template:
+            placeholders = {slot: f'[[slot:{slot}]]' for slot in slots}
+            context = {**context, **placeholders}
+            html = self._stream(html_template, context) if html_template is not None else None
+            cached = (text_template, html_template, self._stream(text_template, context), html)
+            self._rendered[name] = cached
+
+        _, _, text, html = cached
+        for slot, value in slots.items():
+            placeholder = f'[[slot:{slot}]]'
+            text = text.replace(placeholder, value)
+            if html is not None:
+                html = html.replace(placeholder, str(escape(value)))
+        return text, html
+
+    def message(self, name, subject, recipients, sender=None, slots=None, **context):
+        """Build a Message whose body and HTML are rendered from the NAME templates, cached when slots are given"""
+        if slots:
+            text, html = self.render_cached(name, slots, **context)
+        else:
+            text, html = self.render(name, **context)
+        return Message(subject=subject, recipients=recipients, body=text, html=html, sender=sender)
@@ -4,6 +4,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import enum
 
+from sqlalchemy.dialects import mysql
+
 from app.extensions import db
 
 # Enum Definitions
@@ -24,6 +26,11 @@ class PaymentStatus(enum.Enum):
     PAID = "PAID"
     UNPAID = "UNPAID"
 
+class OutboxStatus(enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    DEAD = "DEAD"
+
 # User model for authentication (Flask-Login)
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -78,6 +85,8 @@ class Client(db.Model):
     city = db.Column(db.String(255), nullable=False)
     state = db.Column(db.String(255), nullable=False)
     post_code = db.Column(db.String(255), nullable=False)
+    # Where per-client payment reminders go; clients without one are only in the business weekly reminder
+    email = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
@@ -101,15 +110,21 @@ class JobType(db.Model):
 
 class Job(db.Model):
     __tablename__ = "job"
+    __table_args__ = (
+        db.Index('ix_job_client_id_time_started', 'client_id', 'time_started'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     job_type_id = db.Column(db.Integer, db.ForeignKey("jobtype.id"), nullable=False)
     client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
-    time_started = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    time_started = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     time_ended = db.Column(db.DateTime, nullable=False)
     location = db.Column(db.String(255), nullable=True)
     description = db.Column(db.String(255), nullable=True)
+    # Denormalized payment/expense totals, kept in sync by app.stats
+    amount_paid = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    amount_expensed = db.Column(db.Float, nullable=False, default=0, server_default='0')
 
     # Relationships
     job_type = db.relationship("JobType", back_populates="jobs")
@@ -117,26 +132,17 @@ class Job(db.Model):
     payments = db.relationship("Payment", back_populates="job", lazy='dynamic')
     expenses = db.relationship("Expense", back_populates="job", lazy='dynamic')
 
-    @property
-    def total_paid(self):
-        """Calculate total amount paid for this job"""
-        return sum(payment.amount for payment in self.payments)
-
-    @property
-    def total_expenses(self):
-        """Calculate total expenses for this job"""
-        return sum(expense.amount for expense in self.expenses)
-    
-    @property
-    def profit(self):
-        """Calculate profit (total_amount - total_expenses)"""
-        return self.total_amount - self.total_expenses
+    # total_paid, total_expenses and profit are SQL column properties,
+    # defined below once Payment and Expense exist
 
     def __repr__(self):
         return f"<Job(id={self.id}, client={self.client.name if self.client else 'None'}, total_amount={self.total_amount})>"
 
 class Expense(db.Model):
     __tablename__ = "expenses"
+    __table_args__ = (
+        db.Index('ix_expenses_job_id_amount', 'job_id', 'amount'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     job_id = db.Column(db.Integer, db.ForeignKey("job.id"), nullable=False)
@@ -153,6 +159,10 @@ class Expense(db.Model):
 
 class Payment(db.Model):
     __tablename__ = "payments"
+    __table_args__ = (
+        db.Index('ix_payments_status_due_date', 'payment_status', 'due_date'),
+        db.Index('ix_payments_job_id_status', 'job_id', 'payment_status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     job_id = db.Column(db.Integer, db.ForeignKey("job.id"), nullable=False)
@@ -166,4 +176,127 @@ class Payment(db.Model):
     job = db.relationship("Job", back_populates="payments")
 
     def __repr__(self):
-        return f"<Payment(id={self.id}, job_id={self.job_id}, amount={self.amount}, payment_status={self.payment_status})>"
\ No newline at end of file
+        return f"<Payment(id={self.id}, job_id={self.job_id}, amount={self.amount}, payment_status={self.payment_status})>"
+
+# Job totals as correlated subqueries. They are deferred, so a plain Job load
+# stays a single-table SELECT; use undefer(Job.total_paid) etc. to load them
+# with the jobs in one query, or use them directly in filter()/order_by().
+_job_total_paid = db.select(db.func.coalesce(db.func.sum(Payment.amount), 0)).where(
+    Payment.job_id == Job.id
+).correlate_except(Payment).scalar_subquery()
+
+_job_total_expenses = db.select(db.func.coalesce(db.func.sum(Expense.amount), 0)).where(
+    Expense.job_id == Job.id
+).correlate_except(Expense).scalar_subquery()
+
+Job.total_paid = db.column_property(_job_total_paid, deferred=True)
+Job.total_expenses = db.column_property(_job_total_expenses, deferred=True)
+Job.profit = db.column_property(Job.__table__.c.total_amount - _job_total_expenses, deferred=True)
+
+
+# Search Models
+class JobSearch(db.Model):
+    """
+    Search document per job (client, job type, description and location),
+    maintained by app.search. MySQL searches it through a FULLTEXT index,
+    SQLite through the job_search_fts FTS5 table kept in sync by triggers.
+    """
+    __tablename__ = "job_search"
+    __table_args__ = (
+        db.Index('ix_job_search_content', 'content', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+
+    job_id = db.Column(db.Integer, db.ForeignKey("job.id", ondelete='CASCADE'), primary_key=True, autoincrement=False)
+    content = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f"<JobSearch(job_id={self.job_id})>"
+
+
+# Reporting Models
+class MonthlyStats(db.Model):
+    """Per-month job, payment and expense rollup, maintained by app.stats"""
+    __tablename__ = "monthly_stats"
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', 'client_id', 'job_type_id', name='uq_monthly_stats_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
+    job_type_id = db.Column(db.Integer, db.ForeignKey("jobtype.id"), nullable=False)
+    job_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+    total_paid = db.Column(db.Float, nullable=False, default=0)
+    total_expenses = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MonthlyStats(year={self.year}, month={self.month}, client_id={self.client_id}, job_type_id={self.job_type_id}, job_count={self.job_count})>"
+
+
+class ReportSnapshot(db.Model):
+    """A closed month's report figures, taken by the monthly report or the backfill command and kept by app.reporting"""
+    __tablename__ = "report_snapshots"
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', name='uq_report_snapshots_month'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    job_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+    total_paid = db.Column(db.Float, nullable=False, default=0)
+    total_expenses = db.Column(db.Float, nullable=False, default=0)
+    cash_received = db.Column(db.Float, nullable=False, default=0)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ReportSnapshot(year={self.year}, month={self.month}, job_count={self.job_count}, generated_at={self.generated_at})>"
+
+
+class OutboxEmail(db.Model):
+    """An email queued for delivery by the app.outbox consumer, kept after sending or dead-lettering"""
+    __tablename__ = "mail_outbox"
+    __table_args__ = (
+        db.Index('ix_mail_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.JSON, nullable=False)
+    body = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'), nullable=True)
+    html = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'), nullable=True)
+    status = db.Column(db.Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxEmail(id={self.id}, subject={self.subject!r}, status={self.status}, attempts={self.attempts})>"
+
+
+class ClientReminder(db.Model):
+    """A payment reminder queued for a client, at most one per client and reminder period"""
+    __tablename__ = "client_reminders"
+    __table_args__ = (
+        db.UniqueConstraint('client_id', 'period', name='uq_client_reminders_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
+    period = db.Column(db.String(16), nullable=False)
+    outbox_email_id = db.Column(db.Integer, db.ForeignKey("mail_outbox.id"), nullable=False)
+    total_overdue = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ClientReminder(client_id={self.client_id}, period={self.period}, outbox_email_id={self.outbox_email_id})>"
@@ -0,0 +1,210 @@
+# app/outbox.py
+import smtplib
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from email.utils import formataddr
+
+from flask import current_app
+from flask_mail import BadHeaderError, Message
+
+from app.extensions import db, mail
+from app.models import OutboxEmail, OutboxStatus
+
+
+def queue_email(message, commit=True, send_at=None):
+    """
+    Store a flask_mail Message in the mail_outbox table.
+
+    Nothing is sent here; the deliver_outbox task picks the email up. Only
+    the subject, sender, recipients and the text and HTML parts are kept.
+
+    Args:
+        commit (bool): Commit straight away; pass False to commit the email
+            together with the caller's own changes.
+        send_at (datetime): Hold the email back until then (UTC).
+
+    Returns:
+        OutboxEmail: The queued row.
+    """
+    sender = message.sender
+    if isinstance(sender, tuple):
+        sender = formataddr(sender)
+    email = OutboxEmail(
+        subject=message.subject,
+        sender=sender,
+        recipients=list(message.recipients),
+        body=message.body,
+        html=message.html,
+        next_attempt_at=send_at or datetime.utcnow()
+    )
+    db.session.add(email)
+    if commit:
+        db.session.commit()
+    return email
+
+
+def to_message(email):
+    """Rebuild the flask_mail Message of an outbox row"""
+    return Message(
+        subject=email.subject,
+        sender=email.sender,
+        recipients=email.recipients,
+        body=email.body,
+        html=email.html
+    )
+
+
+def is_permanent_failure(error):
+    """True when the SMTP server rejected an email with a 5xx reply, so sending it again cannot succeed"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, 'smtp_code', None)
+    return code is not None and 500 <= code < 600
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next try of an email that has failed attempts times"""
+    config = current_app.config
+    return min(config['MAIL_OUTBOX_RETRY_BACKOFF'] * 2 ** (attempts - 1), config['MAIL_OUTBOX_RETRY_MAX'])
+
+
+def claim_due_emails(batch_size, now=None):
+    """
+    Claim up to batch_size pending emails that are due, oldest first.
+
+    Claiming moves next_attempt_at a lease ahead, so a concurrent consumer
+    skips the rows (SKIP LOCKED where the database supports it), and rows
+    left behind by a crashed consumer come due again once the lease runs
+    out. Attempts are counted by drain_outbox as each email is handed to
+    the SMTP server, not here.
+    """
+    now = now or datetime.utcnow()
+    emails = OutboxEmail.query.filter(
+        OutboxEmail.status == OutboxStatus.PENDING,
+        OutboxEmail.next_attempt_at <= now
+    ).order_by(
+        OutboxEmail.next_attempt_at, OutboxEmail.id
+    ).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    lease = timedelta(seconds=current_app.config['MAIL_OUTBOX_LEASE'])
+    for email in emails:
+        email.next_attempt_at = now + lease
+    db.session.commit()
+    return emails
+
+
+def release_emails(emails, error, totals):
+    """Hand claimed emails that never reached the SMTP server back to the queue, without counting an attempt"""
+    now = datetime.utcnow()
+    for email in emails:
+        email.last_error = f"{type(error).__name__}: {error}"[:500]
+        email.next_attempt_at = now
+        totals['retrying'] += 1
+    db.session.commit()
+
+
+def record_outcomes(emails, errors, totals):
+    """
+    Mark sent emails, and schedule a retry or dead-letter the failed ones.
+
+    Args:
+        errors (dict): (error, permanent) per failed email id; emails missing from it were sent.
+        totals (dict): Running 'sent', 'retrying' and 'dead' counts to update.
+    """
+    now = datetime.utcnow()
+    max_attempts = current_app.config['MAIL_OUTBOX_MAX_ATTEMPTS']
+    for email in emails:
+        if email.id not in errors:
+            email.status = OutboxStatus.SENT
+            email.sent_at = now
+            email.last_error = None
+            totals['sent'] += 1
+            continue
+
+        error, permanent = errors[email.id]
+        email.last_error = f"{type(error).__name__}: {error}"[:500]
+        if permanent or email.attempts >= max_attempts:
+            email.status = OutboxStatus.DEAD
+            totals['dead'] += 1
+        else:
+            email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+            totals['retrying'] += 1
+    db.session.commit()
+
+
+def drain_outbox(batch_size=None, max_batches=None):
+    """
+    Send the due outbox emails in batches over one SMTP connection.
+
+    The connection is opened with the first batch and reused for every
+    batch after it. An email the server rejects is retried with exponential
+    backoff, or dead-lettered after a 5xx reply or MAIL_OUTBOX_MAX_ATTEMPTS
+    tries. When the connection itself fails, draining stops until the next
+    run; the email being sent is retried with backoff, and the emails not
+    yet handed to the server go back to the queue without using up an
+    attempt, so an SMTP outage never dead-letters mail.
+
+    Returns:
+        dict: Counts of emails 'sent', 'retrying' and 'dead'.
+    """
+    config = current_app.config
+    batch_size = batch_size or config['MAIL_OUTBOX_BATCH_SIZE']
+    max_batches = max_batches or config['MAIL_OUTBOX_MAX_BATCHES']
+    totals = {'sent': 0, 'retrying': 0, 'dead': 0}
+
+    stack = ExitStack()
+    connection = None
+    try:
+        for _ in range(max_batches):
+            emails = claim_due_emails(batch_size)
+            if not emails:
+                break
+
+            errors = {}
+            attempted = []
+            handled = set()
+            try:
+                if connection is None:
+                    connection = stack.enter_context(mail.connect())
+                for email in emails:
+                    email.attempts += 1
+                    attempted.append(email)
+                    try:
+                        connection.send(to_message(email))
+                    except smtplib.SMTPServerDisconnected:
+                        raise
+                    except smtplib.SMTPException as e:
+                        errors[email.id] = (e, is_permanent_failure(e))
+                    except BadHeaderError as e:
+                        errors[email.id] = (e, True)
+                    handled.add(email.id)
+            except (smtplib.SMTPException, OSError) as e:
+                # The connection failed, not the email: retry the one in flight and requeue the rest
+                for email in attempted:
+                    if email.id not in handled:
+                        errors[email.id] = (e, False)
+                record_outcomes(attempted, errors, totals)
+                release_emails(emails[len(attempted):], e, totals)
+                break
+
+            record_outcomes(emails, errors, totals)
+            if len(emails) < batch_size:
+                break
+    finally:
+        try:
+            stack.close()
+        except (smtplib.SMTPException, OSError):
+            # QUIT on a connection the server already dropped
+            pass
+    return totals
+
+
+def requeue_dead_emails():
+    """Put every dead-lettered email back in the queue with a fresh attempt count; returns how many"""
+    count = OutboxEmail.query.filter_by(status=OutboxStatus.DEAD).update({
+        OutboxEmail.status: OutboxStatus.PENDING,
+        OutboxEmail.attempts: 0,
+        OutboxEmail.next_attempt_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
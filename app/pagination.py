@@ -0,0 +1,113 @@
+# app/pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """One page of keyset-paginated rows plus the cursors around it"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    return value
+
+
+def encode_cursor(values):
+    """Encode a row's sort key values as an opaque URL-safe cursor"""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor produced by encode_cursor, raising InvalidCursor if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(value) for value in values]
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Cursor does not match the sort key")
+    return values
+
+
+def _beyond(columns, values, descending):
+    """Build the row-value comparison (columns) < (values), or > when ascending"""
+    column, *rest = columns
+    value, *rest_values = values
+    step = column < value if descending else column > value
+    if not rest:
+        return step
+    return or_(step, and_(column == value, _beyond(rest, rest_values, descending)))
+
+
+def keyset_paginate(query, columns, key, per_page, after=None, before=None, descending=True, having=False):
+    """
+    Fetch one page of query ordered by columns, starting after or before a cursor.
+
+    Args:
+        query: The query to paginate. It must not already be ordered.
+        columns: Sort key expressions; the last one must be unique (e.g. the primary key).
+        key: Function returning the sort key values for a result row.
+        per_page (int): Maximum number of rows on the page.
+        after (str): Cursor of the last row of the previous page, to page forward.
+        before (str): Cursor of the first row of the next page, to page backward.
+        descending (bool): Sort direction for every column.
+        having (bool): Apply the cursor condition with HAVING, for aggregate sort keys.
+
+    Returns:
+        KeysetPage: The rows plus next/previous cursors.
+    """
+    cursor = before or after
+    backwards = before is not None
+    if cursor is not None:
+        condition = _beyond(columns, decode_cursor(cursor, len(columns)), descending != backwards)
+        query = query.having(condition) if having else query.filter(condition)
+
+    ascending_fetch = descending == backwards
+    ordering = [column.asc() if ascending_fetch else column.desc() for column in columns]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    first_cursor = encode_cursor(key(rows[0])) if rows else None
+    last_cursor = encode_cursor(key(rows[-1])) if rows else None
+    if backwards:
+        next_cursor = last_cursor
+        prev_cursor = first_cursor if has_more else None
+    else:
+        next_cursor = last_cursor if has_more else None
+        prev_cursor = first_cursor if cursor is not None else None
+
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -0,0 +1,69 @@
+# app/ratelimit.py
+import threading
+import time
+from datetime import timedelta
+
+import redis
+
+
+class DomainRateLimiter:
+    """
+    Spread a run of emails over time, per recipient domain.
+
+    Each email reserves the next slot for its domain from a Redis counter
+    shared by every worker, and the Nth email of a run to a domain may go
+    out (N - 1) // limit minutes after the run started. Falls back to
+    per-process counters while Redis is unreachable.
+    """
+
+    def __init__(self, default_limit=60, retry_interval=30):
+        self.default_limit = default_limit
+        self.limits = {}
+        self.retry_interval = retry_interval
+        self.redis = None
+        self._local = {}
+        self._lock = threading.Lock()
+        self._redis_down_until = 0
+
+    def init_app(self, app):
+        self.default_limit = app.config.get('MAIL_DOMAIN_RATE_LIMIT', self.default_limit)
+        self.limits = {domain.lower(): limit for domain, limit in app.config.get('MAIL_DOMAIN_RATE_LIMITS', {}).items()}
+        self.redis = redis.Redis.from_url(
+            app.config['REDIS_URL'],
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+
+    def limit(self, domain):
+        """Emails per minute allowed to domain"""
+        return self.limits.get(domain.lower(), self.default_limit)
+
+    def _reserve(self, key):
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.incr(key)
+                pipe.expire(key, 24 * 60 * 60)
+                count, _ = pipe.execute()
+                return count
+            except redis.RedisError:
+                self._redis_down_until = time.monotonic() + self.retry_interval
+        with self._lock:
+            self._local[key] = self._local.get(key, 0) + 1
+            return self._local[key]
+
+    def reserve(self, run, address, started_at):
+        """
+        Reserve a slot for an email to address in run.
+
+        Args:
+            run (str): Identifies the run; slots are counted per run and domain.
+            address (str): The recipient's email address.
+            started_at (datetime): When the run started.
+
+        Returns:
+            datetime: The earliest time the email may be sent.
+        """
+        domain = address.rpartition('@')[2].lower()
+        count = self._reserve(f'mail_rate:{run}:{domain}')
+        return started_at + timedelta(minutes=(count - 1) // self.limit(domain))
@@ -0,0 +1,247 @@
+# app/reporting.py
+from datetime import datetime
+
+from sqlalchemy import delete, extract, func, insert, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db, report_cache
+from app.models import Client, Job, MonthlyStats, Payment, PaymentStatus, ReportSnapshot
+from app.stats import BUCKET_COLUMNS, get_month_figures, get_report_figures, month_bounds
+
+# Rows fetched per round trip when streaming unpaid payments
+UNPAID_SCAN_BATCH = 500
+
+# Upper bound in days overdue of each aging bucket; older payments fall in '90+'
+AGING_BUCKETS = ((30, '1-30'), (60, '31-60'), (90, '61-90'))
+AGING_LABELS = ('current', *(label for _, label in AGING_BUCKETS), '90+')
+
+# Month figures kept in a report_snapshots row
+SNAPSHOT_COLUMNS = (*BUCKET_COLUMNS, 'cash_received')
+
+
+def iter_unpaid_payments():
+    """
+    Stream every unpaid payment as an (amount, due_date, client, job_description)
+    row, joining the client and job in the same query instead of loading ORM
+    objects, and fetching UNPAID_SCAN_BATCH rows at a time.
+    """
+    return db.session.query(
+        Payment.amount,
+        Payment.due_date,
+        Client.name.label('client'),
+        Job.description.label('job_description')
+    ).join(
+        Job, Job.id == Payment.job_id
+    ).join(
+        Client, Client.id == Job.client_id
+    ).filter(
+        Payment.payment_status == PaymentStatus.UNPAID
+    ).yield_per(UNPAID_SCAN_BATCH)
+
+
+def aging_bucket(due_date, today):
+    """Return the AGING_LABELS bucket of a payment due on due_date"""
+    if due_date >= today:
+        return 'current'
+    days_overdue = (today - due_date).days
+    for limit, label in AGING_BUCKETS:
+        if days_overdue <= limit:
+            return label
+    return '90+'
+
+
+def build_month_snapshot(today=None):
+    """
+    Build the figures shared by the monthly report and the monthly reminder.
+
+    The report figures are aggregates from get_report_figures, and the
+    unpaid payments are read in a single streamed pass for the aging
+    buckets and the per-client breakdown the reminder lists.
+
+    Args:
+        today (datetime): The moment the snapshot describes; defaults to now (UTC).
+
+    Returns:
+        dict: A JSON-serialisable snapshot; datetimes are ISO strings.
+    """
+    today = today or datetime.utcnow()
+    figures = get_report_figures(today)
+
+    clients = {}
+    aging = dict.fromkeys(AGING_LABELS, 0)
+    for payment in iter_unpaid_payments():
+        aging[aging_bucket(payment.due_date, today)] += payment.amount
+
+        client = clients.setdefault(payment.client, {
+            'client': payment.client,
+            'total_owed': 0,
+            'payment_count': 0,
+            'oldest_due_date': payment.due_date,
+            'payments': []
+        })
+        client['total_owed'] += payment.amount
+        client['payment_count'] += 1
+        client['oldest_due_date'] = min(client['oldest_due_date'], payment.due_date)
+        client['payments'].append({
+            'amount': payment.amount,
+            'due_date': payment.due_date.isoformat(),
+            'job_description': payment.job_description or 'No description'
+        })
+
+    for client in clients.values():
+        client['oldest_due_date'] = client['oldest_due_date'].isoformat()
+
+    return {
+        'period': f'{today.year}-{today.month:02d}',
+        'generated_at': today.isoformat(),
+        **figures,
+        'aging': aging,
+        'unpaid_by_client': sorted(clients.values(), key=lambda client: client['total_owed'], reverse=True)
+    }
+
+
+def store_month_snapshot(snapshot):
+    """Cache a snapshot under a key unique to its build time and return the key"""
+    key = f"snapshot:{snapshot['period']}:{snapshot['generated_at']}"
+    report_cache.set(key, snapshot)
+    return key
+
+
+def get_cached_snapshot(key):
+    """Return the snapshot cached under key, or None when there is no key or it is gone"""
+    return report_cache.get(key) if key else None
+
+
+def load_month_snapshot(key=None):
+    """
+    Return the snapshot cached under key, or a freshly built one.
+
+    Tasks run on their own (without a key) always build a fresh snapshot. A
+    missing key means the entry expired, or Redis was down and the snapshot
+    only reached the building process's local cache.
+    """
+    snapshot = get_cached_snapshot(key)
+    if snapshot is None:
+        snapshot = build_month_snapshot()
+    return snapshot
+
+
+def iter_months(start, end):
+    """Yield every (year, month) from start to end inclusive"""
+    year, month = start
+    while (year, month) <= tuple(end):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def save_report_snapshot(year, month, figures, generated_at=None):
+    """Store a month's get_month_figures figures as its report snapshot, replacing any earlier one"""
+    snapshot = ReportSnapshot.query.filter_by(year=year, month=month).one_or_none()
+    if snapshot is None:
+        snapshot = ReportSnapshot(year=year, month=month)
+        db.session.add(snapshot)
+    for column in SNAPSHOT_COLUMNS:
+        setattr(snapshot, column, figures[column])
+    snapshot.generated_at = generated_at or datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process stored the month at the same moment; its figures are as fresh
+        db.session.rollback()
+
+
+def get_closed_month_figures(year, month, today, store=False):
+    """
+    Return a month's get_month_figures figures, from its report snapshot once it has closed.
+
+    A month still open on today, or a closed month without a snapshot, is
+    read live from the rollup; with store set, a closed month read live is
+    kept as its snapshot. Take snapshots again with
+    backfill_report_snapshots(overwrite=True) after late edits to a month.
+    """
+    _, end = month_bounds(year, month)
+    if end > today:
+        return get_month_figures(year, month)
+
+    snapshot = ReportSnapshot.query.filter_by(year=year, month=month).one_or_none()
+    if snapshot is not None:
+        return {column: getattr(snapshot, column) for column in SNAPSHOT_COLUMNS}
+
+    figures = get_month_figures(year, month)
+    if store:
+        save_report_snapshot(year, month, figures, generated_at=today)
+    return figures
+
+
+def first_report_month():
+    """Return the (year, month) of the earliest job, or None when there are no jobs"""
+    first = db.session.query(func.min(Job.time_started)).scalar()
+    return (first.year, first.month) if first is not None else None
+
+
+def _batch_month_figures(months):
+    """Read get_month_figures for several months with one grouped rollup query and one grouped cash query"""
+    figures = {key: dict.fromkeys(SNAPSHOT_COLUMNS, 0) for key in months}
+    first, last = min(months), max(months)
+
+    period = MonthlyStats.year * 12 + MonthlyStats.month
+    rollups = db.session.query(
+        MonthlyStats.year,
+        MonthlyStats.month,
+        *[func.sum(getattr(MonthlyStats, column)).label(column) for column in BUCKET_COLUMNS]
+    ).filter(
+        period.between(first[0] * 12 + first[1], last[0] * 12 + last[1])
+    ).group_by(MonthlyStats.year, MonthlyStats.month)
+    for row in rollups:
+        values = row._asdict()
+        key = (values.pop('year'), values.pop('month'))
+        if key in figures:
+            figures[key].update(values)
+
+    year = extract('year', Payment.payment_date)
+    month = extract('month', Payment.payment_date)
+    start, _ = month_bounds(*first)
+    _, end = month_bounds(*last)
+    cash = db.session.query(year, month, func.sum(Payment.amount)).filter(
+        Payment.payment_status == PaymentStatus.PAID,
+        Payment.payment_date >= start,
+        Payment.payment_date < end
+    ).group_by(year, month)
+    for row_year, row_month, amount in cash:
+        key = (int(row_year), int(row_month))
+        if key in figures:
+            figures[key]['cash_received'] = amount
+    return figures
+
+
+def backfill_report_snapshots(start, end, batch_size=12, overwrite=False, now=None):
+    """
+    Store the report snapshots of every month from start to end.
+
+    Months are read and written batch_size at a time, each batch with two
+    grouped queries and one bulk insert, committed on its own.
+
+    Args:
+        start (tuple): First (year, month).
+        end (tuple): Last (year, month), inclusive.
+        overwrite (bool): Take the snapshot again for months that already have one.
+
+    Returns:
+        int: The number of snapshots written.
+    """
+    now = now or datetime.utcnow()
+    months = list(iter_months(start, end))
+    if not overwrite:
+        stored = set(db.session.query(ReportSnapshot.year, ReportSnapshot.month).all())
+        months = [key for key in months if key not in stored]
+
+    for offset in range(0, len(months), batch_size):
+        batch = months[offset:offset + batch_size]
+        figures = _batch_month_figures(batch)
+        db.session.execute(delete(ReportSnapshot).where(tuple_(ReportSnapshot.year, ReportSnapshot.month).in_(batch)))
+        db.session.execute(insert(ReportSnapshot), [
+            {'year': year, 'month': month, **figures[(year, month)], 'generated_at': now}
+            for year, month in batch
+        ])
+        db.session.commit()
+    return len(months)
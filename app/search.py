@@ -0,0 +1,112 @@
+# app/search.py
+import re
+
+from sqlalchemy import DDL, column, delete, event, false, func, insert, literal_column, null, select, table
+from sqlalchemy.dialects.mysql import match
+
+from app.extensions import db
+from app.models import Client, Job, JobSearch, JobType
+
+# SQLite keeps an external-content FTS5 index over job_search in step with triggers
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS job_search_fts USING fts5("
+    "content, content='job_search', content_rowid='job_id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS job_search_ai AFTER INSERT ON job_search BEGIN "
+    "INSERT INTO job_search_fts(rowid, content) VALUES (new.job_id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS job_search_ad AFTER DELETE ON job_search BEGIN "
+    "INSERT INTO job_search_fts(job_search_fts, rowid, content) VALUES ('delete', old.job_id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS job_search_au AFTER UPDATE ON job_search BEGIN "
+    "INSERT INTO job_search_fts(job_search_fts, rowid, content) VALUES ('delete', old.job_id, old.content); "
+    "INSERT INTO job_search_fts(rowid, content) VALUES (new.job_id, new.content); END",
+)
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(JobSearch.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(
+    JobSearch.__table__, 'before_drop',
+    DDL("DROP TABLE IF EXISTS job_search_fts").execute_if(dialect='sqlite')
+)
+
+job_search_fts = table('job_search_fts', column('rowid'))
+_fts = literal_column('job_search_fts')
+
+
+def search_terms(search_term):
+    """Split a search string into lowercase word tokens"""
+    return re.findall(r'\w+', search_term.lower())
+
+
+def document_select():
+    """Select (job_id, content) search documents for jobs"""
+    content = func.coalesce(Client.name, '') + ' ' + func.coalesce(JobType.name, '') + ' ' + \
+        func.coalesce(Job.description, '') + ' ' + func.coalesce(Job.location, '')
+    return select(Job.id.label('job_id'), content.label('content')).join(
+        Client, Client.id == Job.client_id
+    ).join(JobType, JobType.id == Job.job_type_id)
+
+
+def search_jobs(query, search_term):
+    """
+    Restrict a Job query to jobs matching every word of search_term as a prefix.
+
+    Returns:
+        tuple: The filtered query and a relevance expression (higher is better).
+    """
+    terms = search_terms(search_term)
+    query = query.join(JobSearch, JobSearch.job_id == Job.id)
+    if not terms:
+        # NULL rather than a literal 0, which ORDER BY would read as a column position
+        return query.filter(false()), null()
+
+    if db.session.get_bind().dialect.name == 'mysql':
+        relevance = match(JobSearch.content, against=' '.join(f'+{term}*' for term in terms)).in_boolean_mode()
+        return query.filter(relevance > 0), relevance
+
+    relevance = -func.bm25(_fts)
+    query = query.join(job_search_fts, job_search_fts.c.rowid == JobSearch.job_id).filter(
+        _fts.op('MATCH')(' '.join(f'"{term}"*' for term in terms))
+    )
+    return query, relevance
+
+
+def refresh_documents(connection, job_ids):
+    """Rewrite the search documents for the given jobs"""
+    job_ids = list(job_ids)
+    for start in range(0, len(job_ids), 500):
+        chunk = job_ids[start:start + 500]
+        connection.execute(delete(JobSearch.__table__).where(JobSearch.__table__.c.job_id.in_(chunk)))
+        connection.execute(insert(JobSearch.__table__).from_select(
+            ['job_id', 'content'], document_select().where(Job.id.in_(chunk))
+        ))
+
+
+def rebuild_search_index():
+    """Rebuild every job search document from the raw tables"""
+    db.session.execute(delete(JobSearch))
+    db.session.execute(insert(JobSearch).from_select(['job_id', 'content'], document_select()))
+    db.session.commit()
+    return JobSearch.query.count()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_after_flush(session, flush_context):
+    job_ids = set()
+    client_ids = set()
+    job_type_ids = set()
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Job):
+            job_ids.add(obj.id)
+        elif isinstance(obj, Client) and session.is_modified(obj) and obj not in session.new:
+            client_ids.add(obj.id)
+        elif isinstance(obj, JobType) and session.is_modified(obj) and obj not in session.new:
+            job_type_ids.add(obj.id)
+
+    connection = session.connection()
+    if client_ids or job_type_ids:
+        related = select(Job.id).where(Job.client_id.in_(client_ids) | Job.job_type_id.in_(job_type_ids))
+        job_ids.update(connection.execute(related).scalars())
+
+    job_ids.discard(None)
+    if job_ids:
+        refresh_documents(connection, sorted(job_ids))
@@ -0,0 +1,323 @@
+# app/stats.py
+from datetime import datetime
+from math import isclose
+
+from sqlalchemy import case, delete, event, extract, func, insert, inspect, select, update
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.extensions import db
+from app.models import Client, Expense, Job, MonthlyStats, Payment, PaymentStatus
+
+BUCKET_COLUMNS = ('job_count', 'completed_count', 'paid_count', 'total_amount', 'total_paid', 'total_expenses')
+
+# Denormalized Job column maintained for each child model
+JOB_AMOUNT_COLUMNS = {Payment: 'amount_paid', Expense: 'amount_expensed'}
+
+
+def month_bounds(year, month):
+    """Return the half-open [start, end) datetime range for a month"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def previous_month(now=None):
+    """Return (year, month) of the month before now"""
+    now = now or datetime.now()
+    return (now.year - 1, 12) if now.month == 1 else (now.year, now.month - 1)
+
+
+def bucket_totals_select():
+    """Select job, payment and expense totals grouped by month, client and job type"""
+    year = extract('year', Job.time_started)
+    month = extract('month', Job.time_started)
+
+    return select(
+        year.label('year'),
+        month.label('month'),
+        Job.client_id,
+        Job.job_type_id,
+        func.count(Job.id).label('job_count'),
+        func.count(Job.time_ended).label('completed_count'),
+        func.sum(case((Job.total_paid > 0, 1), else_=0)).label('paid_count'),
+        func.sum(Job.total_amount).label('total_amount'),
+        func.sum(Job.total_paid).label('total_paid'),
+        func.sum(Job.total_expenses).label('total_expenses')
+    ).group_by(year, month, Job.client_id, Job.job_type_id)
+
+
+def refresh_buckets(connection, keys):
+    """Recompute the given (year, month, client_id, job_type_id) rollup rows from the raw tables"""
+    table = MonthlyStats.__table__
+
+    for year, month, client_id, job_type_id in keys:
+        start, end = month_bounds(year, month)
+        row = connection.execute(bucket_totals_select().where(
+            Job.client_id == client_id,
+            Job.job_type_id == job_type_id,
+            Job.time_started >= start,
+            Job.time_started < end
+        )).first()
+
+        connection.execute(delete(table).where(
+            table.c.year == year,
+            table.c.month == month,
+            table.c.client_id == client_id,
+            table.c.job_type_id == job_type_id
+        ))
+        if row is not None:
+            connection.execute(insert(table).values(**row._asdict()))
+
+
+def _pending(session):
+    """Return the rollup keys and job ids touched by the current flush"""
+    return session.info.setdefault('monthly_stats_pending', {'keys': set(), 'job_ids': set()})
+
+
+def _job_key(time_started, client_id, job_type_id):
+    if time_started is None or client_id is None or job_type_id is None:
+        return None
+    return (time_started.year, time_started.month, client_id, job_type_id)
+
+
+def _collect(session, objects, include_previous):
+    """Record the rollup buckets affected by a set of Job, Payment and Expense rows"""
+    pending = _pending(session)
+
+    for obj in objects:
+        if isinstance(obj, Job):
+            attrs = ('time_started', 'client_id', 'job_type_id')
+            current = tuple(getattr(obj, attr) for attr in attrs)
+            pending['keys'].add(_job_key(*current))
+            if include_previous:
+                state = inspect(obj)
+                previous = []
+                for attr, value in zip(attrs, current):
+                    history = state.attrs[attr].history
+                    previous.append(history.deleted[0] if history.deleted else value)
+                pending['keys'].add(_job_key(*previous))
+        elif isinstance(obj, (Payment, Expense)):
+            pending['job_ids'].add(obj.job_id)
+            if include_previous:
+                history = inspect(obj).attrs.job_id.history
+                pending['job_ids'].update(history.deleted)
+
+    pending['keys'].discard(None)
+    pending['job_ids'].discard(None)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Load the stored value when these are set, even on an expired object, so
+# the flush history names the bucket or job a row is moving out of
+for _attribute in (Job.time_started, Job.client_id, Job.job_type_id, Payment.job_id, Expense.job_id):
+    event.listen(_attribute, 'set', _load_previous_value, active_history=True, retval=True)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_before_flush(session, flush_context, instances):
+    # Deleted rows and previous values must be read before the flush removes them
+    _collect(session, session.deleted, include_previous=True)
+    _collect(session, [obj for obj in session.dirty if session.is_modified(obj)], include_previous=True)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_after_flush(session, flush_context):
+    # New rows only have their ids and defaults once they are flushed
+    _collect(session, session.new, include_previous=False)
+    _collect(session, [obj for obj in session.dirty if session.is_modified(obj)], include_previous=False)
+
+    pending = session.info.pop('monthly_stats_pending', None)
+    if not pending or not (pending['keys'] or pending['job_ids']):
+        return
+
+    connection = session.connection()
+    keys = pending['keys']
+    if pending['job_ids']:
+        rows = connection.execute(
+            select(Job.time_started, Job.client_id, Job.job_type_id).where(Job.id.in_(pending['job_ids']))
+        )
+        keys.update(_job_key(*row) for row in rows)
+        keys.discard(None)
+
+    refresh_buckets(connection, sorted(keys))
+
+
+def get_month_stats(year, month, client_id=None, job_type_id=None):
+    """Read the rolled-up figures for a month, optionally narrowed to a client or job type"""
+    query = db.session.query(
+        *[func.coalesce(func.sum(getattr(MonthlyStats, column)), 0) for column in BUCKET_COLUMNS]
+    ).filter(MonthlyStats.year == year, MonthlyStats.month == month)
+
+    if client_id is not None:
+        query = query.filter(MonthlyStats.client_id == client_id)
+    if job_type_id is not None:
+        query = query.filter(MonthlyStats.job_type_id == job_type_id)
+
+    return dict(zip(BUCKET_COLUMNS, query.one()))
+
+
+def get_top_clients(year, month, limit=5):
+    """Get the (client name, revenue) pairs with the highest job value in a month"""
+    revenue = func.sum(MonthlyStats.total_amount)
+    return db.session.query(Client.name, revenue).join(
+        Client, Client.id == MonthlyStats.client_id
+    ).filter(
+        MonthlyStats.year == year,
+        MonthlyStats.month == month
+    ).group_by(Client.id, Client.name).order_by(revenue.desc()).limit(limit).all()
+
+
+def get_month_figures(year, month):
+    """
+    Read a month's rolled-up figures plus the cash received during the month.
+
+    These are the figures kept in a report snapshot; every one of them can
+    be recomputed later from the raw tables.
+    """
+    start, end = month_bounds(year, month)
+    cash_received = db.session.query(func.coalesce(func.sum(Payment.amount), 0)).filter(
+        Payment.payment_status == PaymentStatus.PAID,
+        Payment.payment_date >= start,
+        Payment.payment_date < end
+    ).scalar()
+    return {**get_month_stats(year, month), 'cash_received': cash_received}
+
+
+def get_report_figures(today, top_clients=5):
+    """
+    Compute the monthly report figures for the month containing today.
+
+    Every figure is an aggregate read as scalar rows: the month's figures
+    from the rollup and one cash received query, the unpaid totals from one
+    query on the payments status index, and the top clients with LIMIT. No
+    job or payment rows are loaded, however many the month has.
+
+    Returns:
+        dict: The get_month_figures figures plus outstanding, unpaid_count,
+            overdue, overdue_count and top_clients as [name, revenue] pairs.
+    """
+    overdue = Payment.due_date < today
+    unpaid = db.session.query(
+        func.coalesce(func.sum(Payment.amount), 0).label('outstanding'),
+        func.count(Payment.id).label('unpaid_count'),
+        func.coalesce(func.sum(case((overdue, Payment.amount), else_=0)), 0).label('overdue'),
+        func.coalesce(func.sum(case((overdue, 1), else_=0)), 0).label('overdue_count')
+    ).filter(Payment.payment_status == PaymentStatus.UNPAID).one()
+
+    return {
+        **get_month_figures(today.year, today.month),
+        **unpaid._asdict(),
+        'top_clients': [
+            [name, revenue] for name, revenue in get_top_clients(today.year, today.month, limit=top_clients)
+        ]
+    }
+
+
+def _raw_buckets():
+    buckets = {}
+    for row in db.session.execute(bucket_totals_select()):
+        values = row._asdict()
+        key = tuple(values.pop(column) for column in ('year', 'month', 'client_id', 'job_type_id'))
+        buckets[key] = values
+    return buckets
+
+
+def rebuild_monthly_stats():
+    """Replace every rollup row with figures recomputed from the raw tables"""
+    rows = db.session.execute(bucket_totals_select()).all()
+    db.session.execute(delete(MonthlyStats))
+    if rows:
+        db.session.execute(insert(MonthlyStats), [row._asdict() for row in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def verify_monthly_stats():
+    """
+    Compare the stored rollups with the raw tables.
+
+    Returns:
+        list: One dict per drifted bucket with its key and the expected and stored figures.
+    """
+    expected = _raw_buckets()
+    stored = {
+        (row.year, row.month, row.client_id, row.job_type_id): {
+            column: getattr(row, column) for column in BUCKET_COLUMNS
+        }
+        for row in MonthlyStats.query.all()
+    }
+
+    drift = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want, have = expected.get(key), stored.get(key)
+        if want is None or have is None or not all(
+            isclose(want[column], have[column], abs_tol=0.005) for column in BUCKET_COLUMNS
+        ):
+            drift.append({'key': key, 'expected': want, 'stored': have})
+    return drift
+
+
+def _refresh_job_amount(connection, model, job_id, session=None):
+    """Recompute one denormalized Job amount column from its child rows"""
+    column = JOB_AMOUNT_COLUMNS[model]
+    total = connection.execute(
+        select(func.coalesce(func.sum(model.amount), 0)).where(model.job_id == job_id)
+    ).scalar()
+    connection.execute(update(Job.__table__).where(Job.__table__.c.id == job_id).values({column: total}))
+
+    # Keep an already-loaded Job in step without marking it dirty
+    job = session.identity_map.get(session.identity_key(Job, job_id)) if session is not None else None
+    if job is not None:
+        set_committed_value(job, column, total)
+
+
+def _sync_job_amounts(mapper, connection, target):
+    job_ids = {target.job_id, *inspect(target).attrs.job_id.history.deleted}
+    job_ids.discard(None)
+    for job_id in job_ids:
+        _refresh_job_amount(connection, mapper.class_, job_id, object_session(target))
+
+
+for _model in JOB_AMOUNT_COLUMNS:
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _sync_job_amounts)
+
+
+def verify_job_amounts(fix=False):
+    """
+    Compare Job.amount_paid and Job.amount_expensed with the payment and expense rows.
+
+    Args:
+        fix (bool): Rewrite the drifted jobs with the recomputed totals.
+
+    Returns:
+        list: One dict per drifted job with the stored and expected totals.
+    """
+    rows = db.session.query(
+        Job.id, Job.amount_paid, Job.total_paid, Job.amount_expensed, Job.total_expenses
+    ).all()
+
+    drift = [
+        {
+            'job_id': job_id,
+            'amount_paid': amount_paid,
+            'expected_paid': total_paid,
+            'amount_expensed': amount_expensed,
+            'expected_expensed': total_expenses
+        }
+        for job_id, amount_paid, total_paid, amount_expensed, total_expenses in rows
+        if not isclose(amount_paid, total_paid, abs_tol=0.005)
+        or not isclose(amount_expensed, total_expenses, abs_tol=0.005)
+    ]
+
+    if fix and drift:
+        db.session.execute(update(Job).where(Job.id.in_([item['job_id'] for item in drift])).values(
+            amount_paid=Job.total_paid.expression,
+            amount_expensed=Job.total_expenses.expression
+        ))
+        db.session.commit()
+    return drift
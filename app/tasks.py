@@ -1,9 +1,22 @@
-from app.extensions import celery, mail
-from flask_mail import Message
+from app.extensions import celery, mail_templates, invoice_api
 from flask import current_app
 from datetime import datetime, timedelta
 from app.models import *
-from sqlalchemy import and_
+from app.stats import get_report_figures, previous_month, verify_job_amounts
+from app.invoice_pdf import get_invoice_pdf
+from app.invoicing import InvoiceApiUnavailable
+from app import invoice_run
+from app import client_reminders, reporting
+from app.reporting import get_cached_snapshot, iter_unpaid_payments, load_month_snapshot
+from app.outbox import drain_outbox, queue_email
+from celery import chain, chord, group
+import time
+
+def percent_change(current, previous):
+    """Format the change from previous to current as a signed percentage"""
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / abs(previous) * 100:+.1f}%"
 
 @celery.task
 def send_test_email():
@@ -14,320 +27,273 @@ def send_test_email():
         return "Business notifications are disabled."
 
     with current_app.app_context():
-        msg = Message(
-            subject = "Test Email",
-            recipients = [current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
-            body = "This is a test email. The date and time is {}".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        msg = mail_templates.message(
+            'test_email',
+            subject="Test Email",
+            recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
+            now=datetime.now()
         )
-        mail.send(msg)
+        queue_email(msg)
         return "Test email sent successfully."
 
+@celery.task
+def send_confirmation_email(user_email, confirm_url):
+    """
+    Send a user their email confirmation link.
+
+    The email is rendered from the cached confirmation template with only the
+    link filled in, then delivered through the outbox straight away instead
+    of on the next beat run.
+    """
+    msg = mail_templates.message(
+        'confirmation_email',
+        subject="Confirm your email - MaidVally",
+        recipients=[user_email],
+        sender=current_app.config['MAIL_USERNAME'],
+        slots={'confirm_url': confirm_url}
+    )
+    queue_email(msg)
+    deliver_outbox.delay()
+    return f"Confirmation email queued for {user_email}"
+
 @celery.task
 def send_weekly_reminder_for_unpaid_jobs():
     """
     Send a weekly reminder email for unpaid jobs.
+
+    With CLIENT_REMINDERS_ENABLED the overdue clients with an email address
+    are also sent their own reminders; this business reminder still lists
+    every unpaid payment, whether or not its client has an address.
     """
     if not current_app.config['BUSINESS_NOTIFICATIONS_ENABLED']:
         return "Business notifications are disabled."
+
+    client_run = send_client_reminders() if current_app.config['CLIENT_REMINDERS_ENABLED'] else None
     
     with current_app.app_context():
-        # Get all unpaid payments
-        unpaid_payments = Payment.query.filter(
-            Payment.payment_status == PaymentStatus.UNPAID
-        ).all()
-        
-        if not unpaid_payments:
-            return "No unpaid jobs found"
-        
         today = datetime.utcnow()
         
         # Categorize payments
         overdue = []
         due_soon = []  # Due within 7 days
-        future = []
+        future_count = 0
+        future_amount = 0
+        total_unpaid = 0
+        payment_count = 0
         
         week_from_now = today + timedelta(days=7)
         
-        for payment in unpaid_payments:
+        for payment in iter_unpaid_payments():
+            payment_count += 1
+            total_unpaid += payment.amount
             if payment.due_date < today:
                 days_overdue = (today - payment.due_date).days
                 overdue.append({
-                    'payment': payment,
                     'days_overdue': days_overdue,
-                    'client': payment.job.client.name,
+                    'client': payment.client,
                     'amount': payment.amount,
-                    'job_description': payment.job.description or 'No description'
+                    'job_description': payment.job_description or 'No description'
                 })
             elif payment.due_date <= week_from_now:
                 days_until_due = (payment.due_date - today).days
                 due_soon.append({
-                    'payment': payment,
                     'days_until_due': days_until_due,
-                    'client': payment.job.client.name,
+                    'client': payment.client,
                     'amount': payment.amount,
-                    'job_description': payment.job.description or 'No description'
+                    'job_description': payment.job_description or 'No description'
                 })
             else:
-                future.append(payment)
+                future_count += 1
+                future_amount += payment.amount
+        
+        if not payment_count:
+            return "No unpaid jobs found"
         
-        total_unpaid = sum(p.amount for p in unpaid_payments)
         total_overdue = sum(item['amount'] for item in overdue)
         
-        email_body = f"""
-📋 WEEKLY PAYMENT REMINDER - {today.strftime('%d/%m/%Y')}
+        msg = mail_templates.message(
+            'weekly_reminder',
+            subject=f"📋 Weekly Payment Reminder - £{total_overdue:.2f} Overdue",
+            recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
+            today=today,
+            total_unpaid=total_unpaid,
+            total_overdue=total_overdue,
+            overdue=overdue,
+            due_soon=due_soon,
+            future_count=future_count,
+            future_amount=future_amount
+        )
+        
+        queue_email(msg)
+        result = f"Weekly reminder sent: {len(overdue)} overdue, {len(due_soon)} due soon"
+        return f"{result}; {client_run}" if client_run else result
 
-💰 PAYMENT SUMMARY:
-• Total Outstanding: £{total_unpaid:.2f}
-• Overdue Amount: £{total_overdue:.2f}
+@celery.task
+def send_client_reminders():
+    """
+    Send every overdue client with an email address their own payment reminder.
 
-🔴 OVERDUE PAYMENTS ({len(overdue)} invoices):
-"""
-        
-        for item in overdue:
-            email_body += f"   • {item['client']}: £{item['amount']:.2f} ({item['days_overdue']} days overdue)\n"
-            email_body += f"     Service: {item['job_description']}\n"
-        
-        if not overdue:
-            email_body += "   🎉 No overdue payments!\n"
-        
-        email_body += f"""
+    One grouped query finds the clients, a group of send_client_reminder
+    tasks queues the reminders in parallel across the workers, and the chord
+    callback sends the business a digest of the run.
+    """
+    started_at = datetime.utcnow()
+    period = client_reminders.reminder_period(started_at)
+    reminders = client_reminders.overdue_clients(started_at)
+    if not reminders:
+        return "No overdue clients to remind"
 
-🟡 DUE SOON ({len(due_soon)} invoices):
-"""
-        
-        for item in due_soon:
-            email_body += f"   • {item['client']}: £{item['amount']:.2f} (due in {item['days_until_due']} days)\n"
-        
-        if not due_soon:
-            email_body += "   ✅ No payments due this week\n"
-        
-        email_body += f"""
+    result = chord(
+        group(send_client_reminder.s(reminder, period, started_at.isoformat()) for reminder in reminders),
+        send_client_reminder_digest.s(period)
+    ).apply_async()
+    return f"Client reminders started for {len(reminders)} clients: {result.id}"
 
-🟢 FUTURE PAYMENTS: {len(future)} invoices (£{sum(p.amount for p in future):.2f})
+@celery.task(ignore_result=False)
+def send_client_reminder(reminder, period, started_at):
+    """
+    Queue one client's payment reminder, once per period, and return its
+    digest entry; a failure is reported in the digest instead of failing the chord.
+    """
+    try:
+        return client_reminders.queue_client_reminder(reminder, period, datetime.fromisoformat(started_at))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Payment reminder for %s failed", reminder['client'])
+        return {**reminder, 'status': 'failed', 'error': str(e)}
 
-📞 ACTION NEEDED:
-"""
-        
-        if overdue:
-            email_body += "• Contact overdue clients immediately\n"
-            email_body += "• Consider late payment fees\n"
-        
-        if due_soon:
-            email_body += "• Send gentle reminders to clients with upcoming due dates\n"
-        
-        email_body += """
-• Update payment tracking system
-• Follow up on any payment commitments
+@celery.task
+def send_client_reminder_digest(results, period):
+    """Email the business a summary of a client reminder run, and start delivering the reminders"""
+    queued = [item for item in results if item['status'] == 'queued']
+    duplicates = [item for item in results if item['status'] == 'duplicate']
+    failed = [item for item in results if item['status'] == 'failed']
 
-Your Payment Tracker 💳
-        """
-        
-        msg = Message(
-            subject=f"📋 Weekly Payment Reminder - £{total_overdue:.2f} Overdue",
-            recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
-            body=email_body
-        )
-        
-        mail.send(msg)
-        return f"Weekly reminder sent: {len(overdue)} overdue, {len(due_soon)} due soon"
+    msg = mail_templates.message(
+        'client_reminder_digest',
+        subject=f"📋 Client Payment Reminders - {period} - {len(queued)} sent",
+        recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
+        period=period,
+        queued=queued,
+        duplicates=duplicates,
+        failed=failed,
+        total_overdue=sum(item['total_overdue'] for item in queued)
+    )
+    queue_email(msg)
+    deliver_outbox.delay()
+    return f"Client reminder digest sent: {len(queued)} sent, {len(duplicates)} already sent, {len(failed)} failed"
 
 @celery.task
-def send_monthly_reminder_for_unpaid_jobs():
+def send_monthly_reminder_for_unpaid_jobs(snapshot_key=None):
     """
     Send a monthly reminder email for unpaid jobs.
     More detailed analysis than weekly reminder.
+
+    Args:
+        snapshot_key (str): Cached month snapshot to report on, as passed by
+            run_monthly_reports; without one a fresh snapshot is built.
     """
     if not current_app.config['BUSINESS_NOTIFICATIONS_ENABLED']:
         return "Business notifications are disabled."
     
     with current_app.app_context():
-        # Get all unpaid payments
-        unpaid_payments = Payment.query.filter(
-            Payment.payment_status == PaymentStatus.UNPAID
-        ).all()
+        snapshot = load_month_snapshot(snapshot_key)
+        today = datetime.fromisoformat(snapshot['generated_at'])
+        total_unpaid = snapshot['outstanding']
+        payment_count = snapshot['unpaid_count']
         
-        if not unpaid_payments:
+        if not payment_count:
             # Still send a report showing good payment status
-            email_body = f"""
-📊 MONTHLY PAYMENT STATUS - {datetime.utcnow().strftime('%B %Y')}
-
-🎉 EXCELLENT NEWS!
-No outstanding payments - all clients are up to date!
-
-Keep up the great work with your payment collection!
-
-Your Business Manager 💯
-            """
-            
-            msg = Message(
+            msg = mail_templates.message(
+                'monthly_all_clear',
                 subject=f"📊 Monthly Payment Status - All Clear! 🎉",
                 recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
-                body=email_body
+                today=today
             )
             
-            mail.send(msg)
+            queue_email(msg)
             return "Monthly reminder sent: No unpaid jobs"
         
-        today = datetime.utcnow()
-        
-        # Analyze payment patterns by client
-        client_analysis = {}
-        total_unpaid = 0
-        
-        for payment in unpaid_payments:
-            client_name = payment.job.client.name
-            total_unpaid += payment.amount
-            
-            if client_name not in client_analysis:
-                client_analysis[client_name] = {
-                    'total_owed': 0,
-                    'payments': [],
-                    'oldest_payment': payment.due_date,
-                    'payment_count': 0
-                }
-            
-            client_analysis[client_name]['total_owed'] += payment.amount
-            client_analysis[client_name]['payment_count'] += 1
-            client_analysis[client_name]['payments'].append({
-                'amount': payment.amount,
-                'due_date': payment.due_date,
-                'days_overdue': max(0, (today - payment.due_date).days),
-                'job_description': payment.job.description or 'No description'
-            })
-            
-            # Track oldest payment
-            if payment.due_date < client_analysis[client_name]['oldest_payment']:
-                client_analysis[client_name]['oldest_payment'] = payment.due_date
-        
-        # Sort clients by total amount owed
-        sorted_clients = sorted(client_analysis.items(), key=lambda x: x[1]['total_owed'], reverse=True)
-        
-        email_body = f"""
-📊 MONTHLY PAYMENT ANALYSIS - {today.strftime('%B %Y')}
-
-💰 OVERVIEW:
-• Total Outstanding: £{total_unpaid:.2f}
-• Number of Clients with Unpaid Jobs: {len(client_analysis)}
-• Total Unpaid Invoices: {len(unpaid_payments)}
-
-👥 CLIENT BREAKDOWN (by amount owed):
-"""
+        # Work out each payment's status line once, for both email parts
+        clients = []
+        # Clients with a payment over 30 days overdue or a large balance
+        urgent_clients = []
         
-        for client_name, data in sorted_clients:
-            oldest_days = (today - data['oldest_payment']).days
-            email_body += f"""
-   🏢 {client_name}:
-      • Total Owed: £{data['total_owed']:.2f}
-      • Number of Unpaid Invoices: {data['payment_count']}
-      • Oldest Payment: {oldest_days} days overdue
-"""
-            
-            # Show individual payments for this client
+        for data in snapshot['unpaid_by_client']:
+            payments = []
+            urgent = data['total_owed'] > 500
             for payment in data['payments']:
-                if payment['days_overdue'] > 0:
-                    status = f"({payment['days_overdue']} days overdue)"
+                due_date = datetime.fromisoformat(payment['due_date'])
+                days_overdue = max(0, (today - due_date).days)
+                urgent = urgent or days_overdue > 30
+                if days_overdue > 0:
+                    status = f"({days_overdue} days overdue)"
                 else:
-                    days_until_due = (payment['due_date'] - today).days
+                    days_until_due = (due_date - today).days
                     status = f"(due in {days_until_due} days)" if days_until_due >= 0 else "(due today)"
-                
-                email_body += f"        - £{payment['amount']:.2f} {status}\n"
-        
-        # Recommendations
-        email_body += f"""
-
-💡 RECOMMENDATIONS:
-
-HIGH PRIORITY ACTIONS:
-"""
-        
-        # Identify worst clients
-        urgent_clients = [name for name, data in sorted_clients if 
-                         any(p['days_overdue'] > 30 for p in data['payments']) or 
-                         data['total_owed'] > 500]
-        
-        if urgent_clients:
-            email_body += f"• Contact these clients immediately: {', '.join(urgent_clients[:3])}\n"
-            email_body += "• Consider payment plans for large amounts\n"
-            email_body += "• Review credit terms for repeat late payers\n"
-        
-        email_body += f"""
-GENERAL ACTIONS:
-• Send payment reminders to all overdue clients
-• Update payment tracking system
-• Consider requiring deposits for new jobs from slow payers
-• Review and tighten payment terms if needed
-
-📈 BUSINESS HEALTH:
-• Track your payment collection rate monthly
-• Set up automatic reminders for due dates
-• Consider offering early payment discounts
-
-Generated: {today.strftime('%d/%m/%Y at %H:%M')}
-
-Your Business Analyst 📊
-        """
+                payments.append({'amount': payment['amount'], 'status': status})
+            
+            clients.append({
+                **data,
+                'oldest_days': (today - datetime.fromisoformat(data['oldest_due_date'])).days,
+                'payments': payments
+            })
+            if urgent:
+                urgent_clients.append(data['client'])
         
-        msg = Message(
+        msg = mail_templates.message(
+            'monthly_reminder',
             subject=f"📊 Monthly Payment Analysis - £{total_unpaid:.2f} Outstanding",
             recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
-            body=email_body
+            today=today,
+            total_unpaid=total_unpaid,
+            payment_count=payment_count,
+            aging=snapshot['aging'],
+            clients=clients,
+            urgent_clients=urgent_clients
         )
         
-        mail.send(msg)
-        return f"Monthly analysis sent: {len(client_analysis)} clients, £{total_unpaid:.2f} outstanding"
+        queue_email(msg)
+        return f"Monthly analysis sent: {len(clients)} clients, £{total_unpaid:.2f} outstanding"
     
 @celery.task
-def get_monthly_report():
+def get_monthly_report(snapshot_key=None):
     """
     Generate the monthly report, to be sent via email. 
     It should show the key metrics for the month.
     Show the total revenue paid, show any outstanding payments,
     show the total number of jobs completed.
+
+    Args:
+        snapshot_key (str): Cached month snapshot to report on, as passed by
+            run_monthly_reports; without one the figures are aggregated directly.
     """
     if not current_app.config['BUSINESS_NOTIFICATIONS_ENABLED']:
         return "Business notifications are disabled."
     
     with current_app.app_context():
-        # Calculate date ranges
-        today = datetime.utcnow()
-        first_day_this_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        snapshot = get_cached_snapshot(snapshot_key)
+        today = datetime.fromisoformat(snapshot['generated_at']) if snapshot else datetime.utcnow()
+        figures = snapshot or get_report_figures(today)
         
-        # This month's jobs
-        this_month_jobs = Job.query.filter(
-            Job.time_started >= first_day_this_month
-        ).all()
+        # This month's job figures from the monthly rollup
+        jobs_this_month = figures['job_count']
         
         # Calculate revenue metrics
-        total_revenue_generated = sum(job.total_amount for job in this_month_jobs)
-        total_expenses = sum(job.total_expenses for job in this_month_jobs)
+        total_revenue_generated = figures['total_amount']
+        total_expenses = figures['total_expenses']
         profit_this_month = total_revenue_generated - total_expenses
         
         # Payment metrics
-        payments_received_this_month = Payment.query.filter(
-            and_(
-                Payment.payment_date >= first_day_this_month,
-                Payment.payment_status == PaymentStatus.PAID
-            )
-        ).all()
-        
-        cash_received = sum(payment.amount for payment in payments_received_this_month)
+        cash_received = figures['cash_received']
         
         # Outstanding payments (all time)
-        outstanding_payments = Payment.query.filter(
-            Payment.payment_status == PaymentStatus.UNPAID
-        ).all()
-        
-        total_outstanding = sum(payment.amount for payment in outstanding_payments)
-        overdue_payments = [p for p in outstanding_payments if p.due_date < today]
-        total_overdue = sum(payment.amount for payment in overdue_payments)
+        total_outstanding = figures['outstanding']
+        total_overdue = figures['overdue']
+        overdue_count = figures['overdue_count']
         
         # Top clients this month
-        client_revenue = {}
-        for job in this_month_jobs:
-            client_name = job.client.name
-            client_revenue[client_name] = client_revenue.get(client_name, 0) + job.total_amount
-        
-        top_clients = sorted(client_revenue.items(), key=lambda x: x[1], reverse=True)[:5]
+        top_clients = figures['top_clients']
         
         # Calculate collection rate (fix the syntax error)
         if total_revenue_generated > 0:
@@ -335,49 +301,154 @@ def get_monthly_report():
         else:
             collection_rate = 0
         
-        avg_job_value = (total_revenue_generated / len(this_month_jobs)) if this_month_jobs else 0
-        
-        # Create email report
-        email_body = f"""
-📊 MONTHLY BUSINESS REPORT - {today.strftime('%B %Y')}
-
-💰 REVENUE & PROFIT:
-- Jobs Completed: {len(this_month_jobs)}
-- Total Revenue Generated: £{total_revenue_generated:.2f}
-- Total Expenses: £{total_expenses:.2f}
-- Profit This Month: £{profit_this_month:.2f}
-
-💳 CASH FLOW:
-- Cash Received: £{cash_received:.2f}
-- Outstanding Payments: £{total_outstanding:.2f}
-- ⚠️ Overdue Payments: £{total_overdue:.2f} ({len(overdue_payments)} invoices)
-
-🏆 TOP CLIENTS THIS MONTH:
-"""
+        avg_job_value = (total_revenue_generated / jobs_this_month) if jobs_this_month else 0
         
-        for i, (client, revenue) in enumerate(top_clients, 1):
-            email_body += f"   {i}. {client}: £{revenue:.2f}\n"
+        # Compare with the month that has just closed, snapshotting it the first time
+        last_year, last_month = previous_month(today)
+        last_month_figures = reporting.get_closed_month_figures(last_year, last_month, today, store=True)
+        last_month_name = datetime(last_year, last_month, 1).strftime('%B')
+        last_revenue = last_month_figures['total_amount']
+        last_profit = last_revenue - last_month_figures['total_expenses']
         
-        if not top_clients:
-            email_body += "   No jobs completed this month\n"
+        msg = mail_templates.message(
+            'monthly_report',
+            subject=f"📊 Monthly Report - {today.strftime('%B %Y')} - £{profit_this_month:.2f} Profit",
+            recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
+            today=today,
+            jobs_this_month=jobs_this_month,
+            total_revenue_generated=total_revenue_generated,
+            total_expenses=total_expenses,
+            profit_this_month=profit_this_month,
+            cash_received=cash_received,
+            total_outstanding=total_outstanding,
+            total_overdue=total_overdue,
+            overdue_count=overdue_count,
+            top_clients=top_clients,
+            revenue_trend=percent_change(total_revenue_generated, last_revenue),
+            profit_trend=percent_change(profit_this_month, last_profit),
+            jobs_trend=percent_change(jobs_this_month, last_month_figures['job_count']),
+            last_revenue=last_revenue,
+            last_profit=last_profit,
+            last_job_count=last_month_figures['job_count'],
+            last_month_name=last_month_name,
+            avg_job_value=avg_job_value,
+            collection_rate=collection_rate
+        )
         
-        email_body += f"""
+        queue_email(msg)
+        return f"Monthly report sent: {jobs_this_month} jobs, £{profit_this_month:.2f} profit"
+
+@celery.task
+def run_monthly_reports():
+    """
+    Send the monthly report and the monthly unpaid reminder from one shared
+    month snapshot.
 
-📈 SUMMARY:
-- Revenue vs Last Month: Track your growth!
-- Average Job Value: £{avg_job_value:.2f}
-- Payment Collection Rate: {collection_rate:.1f}%
+    The snapshot is built once by build_report_snapshot and cached in Redis;
+    both email tasks then run in parallel on its cache key instead of each
+    querying the payments themselves.
+    """
+    if not current_app.config['BUSINESS_NOTIFICATIONS_ENABLED']:
+        return "Business notifications are disabled."
 
-Generated on: {today.strftime('%d/%m/%Y at %H:%M')}
+    result = chain(
+        build_report_snapshot.s(),
+        group(get_monthly_report.s(), send_monthly_reminder_for_unpaid_jobs.s())
+    ).apply_async()
+    return f"Monthly reports started: {result.id}"
 
-Your Business Assistant 📈
-        """
-        
-        msg = Message(
-            subject=f"📊 Monthly Report - {today.strftime('%B %Y')} - £{profit_this_month:.2f} Profit",
-            recipients=[current_app.config['BUSINESS_NOTIFICATIONS_EMAIL']],
-            body=email_body
+@celery.task
+def build_report_snapshot():
+    """Build and cache this month's report snapshot and return its cache key"""
+    return reporting.store_month_snapshot(reporting.build_month_snapshot())
+
+@celery.task
+def deliver_outbox():
+    """
+    Send the emails waiting in the mail outbox over a single SMTP connection.
+    Beat runs this every 30 seconds; failed emails wait out their backoff.
+    """
+    totals = drain_outbox()
+    return f"Mail outbox drained: {totals['sent']} sent, {totals['retrying']} retrying, {totals['dead']} dead"
+
+@celery.task
+def check_job_amounts():
+    """
+    Check the denormalized Job.amount_paid and Job.amount_expensed columns
+    against the payment and expense rows, and repair any drifted jobs.
+    """
+    drift = verify_job_amounts(fix=True)
+    if drift:
+        current_app.logger.warning(
+            "Repaired job amounts for %d jobs: %s", len(drift), [item['job_id'] for item in drift]
         )
-        
-        mail.send(msg)
-        return f"Monthly report sent: {len(this_month_jobs)} jobs, £{profit_this_month:.2f} profit"
\ No newline at end of file
+    return f"Job amounts checked: {len(drift)} drifted jobs repaired"
+
+@celery.task(bind=True, ignore_result=False)
+def post_invoice(self, invoice_data):
+    """
+    Post invoice data to the invoice API and return its response.
+
+    Runs off the web request so the remote round trip does not hold a web
+    worker; the result is read back through the invoice status endpoint.
+    A timed out or 429/5xx call is posted again later with the same
+    Idempotency-Key, up to INVOICE_API_TASK_RETRIES times.
+    """
+    try:
+        return invoice_api.post_invoice(invoice_data)
+    except InvoiceApiUnavailable as e:
+        countdown = current_app.config['INVOICE_API_TASK_RETRY_DELAY'] * 2 ** self.request.retries
+        raise self.retry(exc=e, countdown=countdown, max_retries=current_app.config['INVOICE_API_TASK_RETRIES'])
+
+@celery.task(ignore_result=False)
+def render_invoice(invoice_data):
+    """
+    Render invoice data to a PDF in the shared invoice directory.
+
+    The file is keyed by a hash of the payload, so an identical invoice is
+    only rendered once.
+    """
+    digest, _, cached = get_invoice_pdf(invoice_data)
+    return {"digest": digest, "cached": cached}
+
+@celery.task
+def run_month_end_invoices(year=None, month=None):
+    """
+    Render last month's (or the given month's) invoice PDF for every active
+    client.
+
+    Payloads are collected with one query here, rendered by a chord of
+    render_month_end_invoice tasks across the worker pool (its --concurrency
+    sets the parallelism), and the chord callback writes the manifest.
+    """
+    if year is None or month is None:
+        year, month = previous_month()
+    started_at = time.time()
+    payloads = invoice_run.collect_month_invoices(year, month)
+    if not payloads:
+        manifest = invoice_run.write_manifest(year, month, [], started_at, current_app.config['INVOICE_PDF_DIR'])
+        return f"Month-end invoices {manifest['period']}: no clients to invoice"
+
+    chord(render_month_end_invoice.s(payload) for payload in payloads)(
+        write_month_end_manifest.s(year, month, started_at)
+    )
+    return f"Month-end invoices {year}-{month:02d}: rendering {len(payloads)} invoices"
+
+@celery.task(ignore_result=False)
+def render_month_end_invoice(invoice_data):
+    """Render one client's month-end invoice and return its manifest entry"""
+    return invoice_run.render_invoice_entry(invoice_data, current_app.config['INVOICE_PDF_DIR'])
+
+@celery.task
+def write_month_end_manifest(invoices, year, month, started_at):
+    """Chord callback: write the month-end run manifest and summarise it"""
+    manifest = invoice_run.write_manifest(year, month, invoices, started_at, current_app.config['INVOICE_PDF_DIR'])
+    if manifest['failed']:
+        current_app.logger.warning(
+            "Month-end invoices %s: %d failed: %s", manifest['period'], manifest['failed'],
+            [entry['client_id'] for entry in invoices if entry['error']]
+        )
+    return (
+        f"Month-end invoices {manifest['period']}: {manifest['rendered']} rendered, "
+        f"{manifest['cached']} cached, {manifest['failed']} failed"
+    )
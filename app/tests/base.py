@@ -0,0 +1,70 @@
+import unittest
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import Client, ClientStatusEnum, ClientTypeEnum
+
+
+def uses_in_memory_sqlite():
+    """True when the app's engine is an in-memory SQLite database the tests may create and drop"""
+    return db.engine.dialect.name == 'sqlite' and db.engine.url.database in (None, '', ':memory:')
+
+
+def make_client(name="Test Client Ltd", **fields):
+    """A company Client with a London address; fields override any column"""
+    return Client(**{
+        'name': name,
+        'client_type': ClientTypeEnum.COMPANY,
+        'status': ClientStatusEnum.ACTIVE,
+        'address': "123 Business Street",
+        'city': "London",
+        'state': "England",
+        'post_code': "EC1A 1BB",
+        **fields
+    })
+
+
+@contextmanager
+def capture_statements():
+    """Collect the (statement, parameters) of every query sent to the database inside the block"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Run each test in an app context against a freshly created schema.
+
+    Skipped unless DATABASE_URL=sqlite:///:memory:, so the tests never drop
+    a real database. Subclasses set extra app config in config.
+    """
+
+    config = {}
+
+    def setUp(self):
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        if not uses_in_memory_sqlite():
+            self.app_context.pop()
+            self.skipTest(f"{type(self).__name__} needs DATABASE_URL=sqlite:///:memory:")
+
+        self.app.config.update(TESTING=True, **self.config)
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
@@ -0,0 +1,185 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app import create_app
+from app.extensions import celery, db, domain_rate_limiter, mail
+from app.models import ClientReminder, Job, JobType, OutboxEmail, Payment, PaymentStatus
+from app.tests.base import DatabaseTestCase, capture_statements, make_client
+
+
+class TestClientReminders(DatabaseTestCase):
+
+    config = {
+        'BUSINESS_NOTIFICATIONS_ENABLED': True,
+        'BUSINESS_NOTIFICATIONS_EMAIL': 'office@example.com',
+        'CLIENT_REMINDERS_ENABLED': True,
+        'MAIL_DEFAULT_SENDER': 'office@example.com'
+    }
+
+    def setUp(self):
+        super().setUp()
+        mail.init_app(self.app)
+        self.job_type = JobType(name="House Cleaning")
+        db.session.add(self.job_type)
+        db.session.commit()
+
+        celery.conf.task_always_eager = True
+        # Delivery is covered by test_outbox; these tests stop at the outbox
+        self.deliver = patch('app.tasks.deliver_outbox')
+        self.deliver.start()
+
+    def tearDown(self):
+        self.deliver.stop()
+        celery.conf.task_always_eager = False
+        super().tearDown()
+
+    def add_client(self, name, email, overdue_amounts, status=PaymentStatus.UNPAID):
+        client = make_client(name, email=email)
+        db.session.add(client)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        for index, amount in enumerate(overdue_amounts):
+            started = now - timedelta(days=30 + index * 7)
+            job = Job(
+                job_type_id=self.job_type.id,
+                client_id=client.id,
+                total_amount=amount,
+                time_started=started,
+                time_ended=started + timedelta(hours=2),
+                description=f"Job {index}"
+            )
+            db.session.add(job)
+            db.session.flush()
+            db.session.add(Payment(
+                job_id=job.id,
+                amount=amount,
+                payment_date=started,
+                due_date=started + timedelta(days=14),
+                payment_status=status
+            ))
+        db.session.commit()
+        return client
+
+    def add_clients(self):
+        self.add_client("Alpha Ltd", "accounts@alpha.example.com", [100.0, 50.0])
+        self.add_client("Beta Ltd", "beta@gmail.com", [200.0])
+        self.add_client("Gamma Ltd", "gamma@GMAIL.com", [75.0])
+        self.add_client("No Email Ltd", None, [300.0])
+        self.add_client("Paid Up Ltd", "paid@example.com", [80.0], status=PaymentStatus.PAID)
+
+    def test_each_overdue_client_gets_one_reminder(self):
+        from app.tasks import send_weekly_reminder_for_unpaid_jobs
+
+        self.add_clients()
+        started = datetime.utcnow()
+        send_weekly_reminder_for_unpaid_jobs()
+
+        reminders = {reminder.client_id: reminder for reminder in ClientReminder.query}
+        emails = {
+            email.recipients[0]: email for email in OutboxEmail.query
+            if email.recipients[0] != "office@example.com"
+        }
+        self.assertEqual(sorted(emails), ["accounts@alpha.example.com", "beta@gmail.com", "gamma@GMAIL.com"])
+        self.assertEqual(sorted(reminder.total_overdue for reminder in reminders.values()), [75.0, 150.0, 200.0])
+        self.assertIn("2 unpaid invoices totalling £150.00", emails["accounts@alpha.example.com"].body)
+
+        weekly, digest = self.business_emails()
+        self.assertTrue(weekly.subject.startswith("📋 Weekly Payment Reminder"))
+        self.assertEqual(digest.subject, f"📋 Client Payment Reminders - {started:%G-W%V} - 3 sent")
+        self.assertIn("• Reminders sent: 3 (£425.00 overdue)", digest.body)
+        self.assertIn("Gamma Ltd <gamma@GMAIL.com>: £75.00 (1 invoices)", digest.body)
+
+    def business_emails(self):
+        """The business emails of a run, the weekly reminder before the client reminder digest"""
+        emails = OutboxEmail.query.filter(OutboxEmail.recipients.contains("office@example.com")).all()
+        return sorted(emails, key=lambda email: "Weekly" not in email.subject)
+
+    def test_business_reminder_still_lists_clients_without_an_email(self):
+        from app.tasks import send_weekly_reminder_for_unpaid_jobs
+
+        self.add_client("Alpha Ltd", "accounts@alpha.example.com", [100.0])
+        no_email = self.add_client("No Email Ltd", None, [300.0])
+        job = Job.query.filter_by(client_id=no_email.id).first()
+        db.session.add(Payment(
+            job_id=job.id,
+            amount=40.0,
+            payment_date=datetime.utcnow(),
+            due_date=datetime.utcnow() + timedelta(days=3),
+            payment_status=PaymentStatus.UNPAID
+        ))
+        db.session.commit()
+
+        send_weekly_reminder_for_unpaid_jobs()
+
+        self.assertEqual([reminder.client_id for reminder in ClientReminder.query], [1])
+        weekly, digest = self.business_emails()
+        self.assertIn("No Email Ltd: £300.00", weekly.body)
+        self.assertIn("DUE SOON (1 invoices)", weekly.body)
+        self.assertIn("No Email Ltd: £40.00", weekly.body)
+        self.assertIn("1 sent", digest.subject)
+
+    def test_business_reminder_is_sent_when_no_client_has_an_email(self):
+        from app.tasks import send_weekly_reminder_for_unpaid_jobs
+
+        self.add_client("No Email Ltd", None, [300.0])
+        send_weekly_reminder_for_unpaid_jobs()
+
+        weekly, = self.business_emails()
+        self.assertIn("No Email Ltd: £300.00", weekly.body)
+        self.assertEqual(ClientReminder.query.count(), 0)
+
+    def test_domain_rate_limit_holds_back_later_emails(self):
+        from app.tasks import send_client_reminders
+
+        self.app.config.update(MAIL_DOMAIN_RATE_LIMIT=1, MAIL_DOMAIN_RATE_LIMITS={'Example.com': 5})
+        domain_rate_limiter.init_app(self.app)
+        self.add_clients()
+        self.add_client("Delta Ltd", "delta@example.com", [60.0])
+        self.add_client("Epsilon Ltd", "epsilon@example.com", [90.0])
+
+        started = datetime.utcnow()
+        try:
+            send_client_reminders()
+        finally:
+            domain_rate_limiter.init_app(create_app())
+
+        send_at = {email.recipients[0]: email.next_attempt_at for email in OutboxEmail.query}
+        self.assertLess(send_at["accounts@alpha.example.com"], started + timedelta(minutes=1))
+        self.assertLess(send_at["beta@gmail.com"], started + timedelta(minutes=1))
+        # gmail.com and GMAIL.com are one domain, so the second email waits a minute
+        self.assertGreaterEqual(send_at["gamma@GMAIL.com"], started + timedelta(minutes=1))
+        self.assertLess(send_at["epsilon@example.com"], started + timedelta(minutes=1))
+
+    def test_reruns_in_the_same_period_send_nothing_new(self):
+        from app.tasks import send_client_reminders
+
+        self.add_clients()
+        send_client_reminders()
+        send_client_reminders()
+
+        self.assertEqual(ClientReminder.query.count(), 3)
+        digests = OutboxEmail.query.filter(OutboxEmail.recipients.contains("office@example.com")).all()
+        self.assertEqual(len(digests), 2)
+        self.assertIn("0 sent", digests[1].subject)
+        self.assertIn("• Already reminded this period: 3", digests[1].body)
+
+    def test_clients_are_read_with_one_query(self):
+        from app.client_reminders import overdue_clients
+
+        for index in range(20):
+            self.add_client(f"Client {index}", f"client{index}@example.com", [100.0] * (index % 4 + 1))
+
+        db.session.expire_all()
+        with capture_statements() as statements:
+            reminders = overdue_clients(datetime.utcnow())
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(reminders), 20)
+        self.assertEqual(reminders[3]['payment_count'], 4)
+        self.assertEqual(reminders[3]['total_overdue'], 400.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
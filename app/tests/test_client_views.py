@@ -0,0 +1,157 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Job, JobType, Payment, PaymentStatus
+from app.tests.base import DatabaseTestCase, capture_statements, make_client
+
+
+class TestClientViewQueries(DatabaseTestCase):
+    """Client pages and invoices must cost the same number of queries however many jobs the client has"""
+
+    config = {'LOGIN_DISABLED': True}
+
+    def setUp(self):
+        super().setUp()
+        self.job_type = JobType(name="House Cleaning")
+        db.session.add(self.job_type)
+        db.session.commit()
+        self.statements = []
+
+    def add_client(self, job_count):
+        client = make_client(f"Client with {job_count} jobs")
+        db.session.add(client)
+        db.session.flush()
+
+        now = datetime.now()
+        for index in range(job_count):
+            started = now - timedelta(days=index * 3)
+            job = Job(
+                job_type_id=self.job_type.id,
+                client_id=client.id,
+                total_amount=100.0,
+                time_started=started,
+                time_ended=started + timedelta(hours=2),
+                description=f"Job {index}"
+            )
+            db.session.add(job)
+            db.session.flush()
+            if index % 3 != 2:
+                db.session.add(Payment(
+                    job_id=job.id,
+                    amount=100.0 if index % 2 else 40.0,
+                    payment_date=started,
+                    due_date=started + timedelta(days=14),
+                    payment_status=PaymentStatus.PAID if index % 3 == 0 else PaymentStatus.UNPAID
+                ))
+        db.session.commit()
+        return client.id
+
+    def count_queries(self, func):
+        db.session.expire_all()
+        with capture_statements() as statements:
+            result = func()
+        self.statements = [statement for statement, _ in statements]
+        return result, len(self.statements)
+
+    def view_client(self, client_id):
+        response, count = self.count_queries(lambda: self.app.test_client().get(f'/clients/edit_client/{client_id}'))
+        self.assertEqual(response.status_code, 200)
+        return count
+
+    def build_invoice(self, client_id, period=None, query_string=''):
+        from app.views.clients import get_invoice_data
+
+        def build():
+            with self.app.test_request_context(f'/clients/generate_invoice/{client_id}{query_string}'):
+                return get_invoice_data(client_id, period)
+        return self.count_queries(build)
+
+    def test_query_count_is_independent_of_job_count(self):
+        small = self.view_client(self.add_client(1))
+        large = self.view_client(self.add_client(60))
+
+        self.assertEqual(small, large)
+        # The client row plus the single stats aggregate
+        self.assertEqual(large, 2, "\n\n".join(self.statements))
+
+    def test_invoice_query_count_is_independent_of_job_count(self):
+        small_id, large_id = self.add_client(1), self.add_client(60)
+
+        for period, query_string in ((None, ''), ('all_unpaid', ''), ('current_month', '?unpaid_only=true')):
+            _, small = self.build_invoice(small_id, period, query_string)
+            _, large = self.build_invoice(large_id, period, query_string)
+            self.assertEqual(small, large, period)
+            # The client row plus one jobs query with the job types joined in
+            self.assertEqual(large, 2, "\n\n".join(self.statements))
+
+    def test_unpaid_invoice_excludes_paid_jobs(self):
+        client_id = self.add_client(60)
+        paid = {
+            payment.job_id for payment in Payment.query.filter_by(payment_status=PaymentStatus.PAID)
+        }
+        expected = {job.id for job in Job.query.filter_by(client_id=client_id) if job.id not in paid}
+
+        invoice, _ = self.build_invoice(client_id, 'all_unpaid')
+        self.assertEqual({job['job_id'] for job in invoice['jobs']}, expected)
+
+        invoice, _ = self.build_invoice(client_id, query_string='?unpaid_only=true')
+        self.assertEqual({job['job_id'] for job in invoice['jobs']}, expected)
+        self.assertTrue(all(job['job_type'] == "House Cleaning" for job in invoice['jobs']))
+
+    def test_stats_match_the_jobs(self):
+        from app.views.clients import get_client_stats
+
+        client_id = self.add_client(60)
+        now = datetime.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        jobs = Job.query.filter_by(client_id=client_id).all()
+
+        # Expected figures come from the payment rows, not the denormalized Job.amount_paid the stats read
+        paid = {}
+        for payment in Payment.query.all():
+            paid[payment.job_id] = paid.get(payment.job_id, 0) + payment.amount
+        current = [job for job in jobs if job.time_started >= month_start]
+        outstanding = [job for job in jobs if paid.get(job.id, 0) < job.total_amount]
+
+        stats = get_client_stats(client_id, now)
+        self.assertEqual(stats['total_jobs'], len(jobs))
+        self.assertAlmostEqual(stats['total_amount'], sum(job.total_amount for job in jobs))
+        self.assertAlmostEqual(stats['total_paid'], sum(paid.values()))
+        self.assertAlmostEqual(
+            stats['outstanding_amount'], sum(job.total_amount - paid.get(job.id, 0) for job in outstanding)
+        )
+        self.assertEqual(stats['outstanding_jobs_count'], len(outstanding))
+        self.assertEqual(stats['current_month_jobs'], len(current))
+        self.assertAlmostEqual(stats['current_month_amount'], sum(job.total_amount for job in current))
+        self.assertEqual(
+            stats['current_month_unpaid'],
+            len([job for job in current if paid.get(job.id, 0) < job.total_amount])
+        )
+
+    def test_stats_follow_payment_changes(self):
+        from app.stats import verify_job_amounts
+        from app.views.clients import get_client_stats
+
+        client_id = self.add_client(6)
+        job = Job.query.filter_by(client_id=client_id).order_by(Job.id).first()
+        payment = Payment.query.filter_by(job_id=job.id).one()
+        payment.amount = 25.0
+        db.session.add(Payment(
+            job_id=job.id,
+            amount=15.0,
+            payment_date=job.time_started,
+            due_date=job.time_started + timedelta(days=14),
+            payment_status=PaymentStatus.PAID
+        ))
+        db.session.commit()
+        db.session.delete(Payment.query.filter(Payment.job_id != job.id).first())
+        db.session.commit()
+
+        self.assertEqual(verify_job_amounts(), [])
+        total_paid = db.session.query(db.func.sum(Payment.amount)).scalar()
+        self.assertAlmostEqual(get_client_stats(client_id, datetime.now())['total_paid'], total_paid)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,118 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Job, JobType, Payment, PaymentStatus
+from app.tests.base import DatabaseTestCase, make_client
+from app.views.clients import get_clients_page
+
+# name: ((total_amount, amount_paid) per job)
+CLIENT_JOBS = {
+    "Acme Offices": ((100.0, 100.0),),
+    "Baker Street Flats": ((200.0, 50.0), (100.0, 0)),
+    "Crown Hotel": ((200.0, 0),),
+    "Delta Dental": (),
+    "Echo Studios": ((150.0, 100.0), (150.0, 0)),
+}
+
+# Names A-Z, totals highest first with ties broken by the higher client id
+BY_NAME = ["Acme Offices", "Baker Street Flats", "Crown Hotel", "Delta Dental", "Echo Studios"]
+BY_OUTSTANDING = ["Baker Street Flats", "Echo Studios", "Crown Hotel", "Delta Dental", "Acme Offices"]
+BY_BILLED = ["Echo Studios", "Baker Street Flats", "Crown Hotel", "Acme Offices", "Delta Dental"]
+
+
+class TestClientsListing(DatabaseTestCase):
+
+    config = {'LOGIN_DISABLED': True, 'WTF_CSRF_ENABLED': False}
+
+    def setUp(self):
+        super().setUp()
+        job_type = JobType(name="House Cleaning")
+        db.session.add(job_type)
+        started = datetime(2024, 5, 1, 9)
+        for name, jobs in CLIENT_JOBS.items():
+            client = make_client(name)
+            db.session.add(client)
+            db.session.flush()
+            for total_amount, paid in jobs:
+                job = Job(
+                    job_type_id=job_type.id,
+                    client_id=client.id,
+                    total_amount=total_amount,
+                    time_started=started,
+                    time_ended=started + timedelta(hours=2)
+                )
+                db.session.add(job)
+                db.session.flush()
+                if paid:
+                    db.session.add(Payment(
+                        job_id=job.id,
+                        amount=paid,
+                        payment_date=started,
+                        due_date=started + timedelta(days=14),
+                        payment_status=PaymentStatus.PAID
+                    ))
+        db.session.commit()
+
+    def page(self, **params):
+        with self.app.test_request_context('/clients/clients', query_string=params):
+            page = get_clients_page(params.get('sort', 'name'), params.get('min_outstanding'))
+        return [row.Client.name for row in page.items], page
+
+    def walk(self, **params):
+        names, page = self.page(per_page=2, **params)
+        pages = [names]
+        while page.has_next:
+            names, page = self.page(per_page=2, after=page.next_cursor, **params)
+            pages.append(names)
+
+        # Step back from the last page to the one before it
+        if len(pages) > 1:
+            back, _ = self.page(per_page=2, before=page.prev_cursor, **params)
+            self.assertEqual(back, pages[-2])
+        return [name for names in pages for name in names]
+
+    def test_sorts_by_name_outstanding_and_billed(self):
+        for sort, expected in (('name', BY_NAME), ('outstanding', BY_OUTSTANDING), ('billed', BY_BILLED)):
+            with self.subTest(sort=sort):
+                self.assertEqual(self.page(sort=sort)[0], expected)
+
+    def test_totals_per_client(self):
+        _, page = self.page()
+        totals = {row.Client.name: (row.billed, row.paid, row.outstanding) for row in page.items}
+
+        self.assertEqual(totals["Baker Street Flats"], (300.0, 50.0, 250.0))
+        self.assertEqual(totals["Delta Dental"], (0, 0, 0))
+
+    def test_min_outstanding_filter(self):
+        self.assertEqual(self.page(sort='outstanding', min_outstanding=200)[0], BY_OUTSTANDING[:3])
+        self.assertEqual(self.page(min_outstanding=200)[0], ["Baker Street Flats", "Crown Hotel", "Echo Studios"])
+        self.assertEqual(self.page(min_outstanding=1000)[0], [])
+
+    def test_cursor_paging_for_every_sort(self):
+        for sort, expected in (('name', BY_NAME), ('outstanding', BY_OUTSTANDING), ('billed', BY_BILLED)):
+            with self.subTest(sort=sort):
+                self.assertEqual(self.walk(sort=sort), expected)
+
+        self.assertEqual(self.walk(sort='billed', min_outstanding=200), ["Echo Studios", "Baker Street Flats", "Crown Hotel"])
+
+    def test_listing_page_follows_its_next_link(self):
+        client = self.app.test_client()
+        response = client.get('/clients/clients', query_string={'sort': 'outstanding', 'per_page': 3})
+        body = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(body.index("Baker Street Flats"), body.index("Echo Studios"))
+
+        next_url = re.search(r'href="([^"]*after=[^"]*)"', body).group(1).replace('&amp;', '&')
+        rest = client.get(next_url).get_data(as_text=True)
+        self.assertIn("Delta Dental", rest)
+        self.assertNotIn("Baker Street Flats", rest)
+
+    def test_bad_cursor_is_a_bad_request(self):
+        response = self.app.test_client().get('/clients/clients', query_string={'sort': 'billed', 'after': 'nope!'})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+import time
+import unittest
+
+from app import create_app
+from app.cache import ContextCache
+from app.extensions import dashboard_cache, db
+from app.models import JobType
+from app.tests.base import DatabaseTestCase, make_client
+
+# Nothing listens here, so every Redis call fails at once and the cache falls back to its LRU
+UNREACHABLE_REDIS_URL = 'redis://127.0.0.1:1/0'
+
+
+class TestContextCacheFallback(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['REDIS_URL'] = UNREACHABLE_REDIS_URL
+        self.cache = ContextCache('test', ttl=300)
+        self.cache.init_app(self.app)
+
+    def test_serves_from_the_local_lru_while_redis_is_down(self):
+        self.cache.set('2024-05', {'jobs': 3})
+
+        self.assertEqual(self.cache.get('2024-05'), {'jobs': 3})
+        self.assertEqual(self.cache.stats()['backend'], 'local')
+        self.assertEqual(self.cache.stats()['local_entries'], 1)
+
+    def test_local_entries_expire_after_local_ttl(self):
+        self.cache.local_ttl = 0.05
+        self.cache.set('2024-05', {'jobs': 3})
+        time.sleep(0.1)
+
+        self.assertIsNone(self.cache.get('2024-05'))
+
+    def test_counts_hits_and_misses(self):
+        self.assertIsNone(self.cache.get('2024-05'))
+        self.cache.set('2024-05', {'jobs': 3})
+        self.cache.get('2024-05')
+        self.cache.get('2024-05')
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 1, 66.7))
+
+    def test_value_computed_before_a_clear_is_not_stored(self):
+        generation = self.cache.generation()
+        self.cache.clear()
+        self.cache.set('2024-05', {'jobs': 3}, generation=generation)
+        self.assertIsNone(self.cache.get('2024-05'))
+
+        self.cache.set('2024-05', {'jobs': 4}, generation=self.cache.generation())
+        self.assertEqual(self.cache.get('2024-05'), {'jobs': 4})
+
+
+class TestDashboardCacheInvalidation(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['REDIS_URL'] = UNREACHABLE_REDIS_URL
+        dashboard_cache.init_app(self.app)
+        dashboard_cache.clear()
+        dashboard_cache.set('2024-05', {'jobs': 3})
+
+    def tearDown(self):
+        dashboard_cache.clear()
+        super().tearDown()
+
+    def test_commit_touching_a_watched_model_clears_the_cache(self):
+        db.session.add(make_client())
+        db.session.commit()
+
+        self.assertIsNone(dashboard_cache.get('2024-05'))
+
+    def test_rolled_back_and_unwatched_changes_keep_the_cache(self):
+        db.session.add(make_client())
+        db.session.flush()
+        db.session.rollback()
+        db.session.add(JobType(name="House Cleaning"))
+        db.session.commit()
+
+        self.assertEqual(dashboard_cache.get('2024-05'), {'jobs': 3})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
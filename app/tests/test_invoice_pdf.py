@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app.extensions import celery, db
+from app.invoice_pdf import get_invoice_pdf, invoice_digest
+from app.models import Job, JobType
+from app.tests.base import DatabaseTestCase, make_client
+
+
+class TestInvoicePdf(DatabaseTestCase):
+
+    config = {'LOGIN_DISABLED': True, 'WTF_CSRF_ENABLED': False}
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.app.config['INVOICE_PDF_DIR'] = self.directory
+
+        job_type = JobType(name="House Cleaning")
+        self.customer = make_client()
+        self.idle = make_client("Idle Client Ltd")
+        db.session.add_all([job_type, self.customer, self.idle])
+        db.session.flush()
+        started = datetime.now() - timedelta(days=1)
+        db.session.add(Job(
+            job_type_id=job_type.id,
+            client_id=self.customer.id,
+            total_amount=100.0,
+            time_started=started,
+            time_ended=started + timedelta(hours=2),
+            description="Deep clean"
+        ))
+        db.session.commit()
+
+        # Render in-process instead of through the broker
+        celery.conf.task_always_eager = True
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        celery.conf.task_always_eager = False
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def payload(self, **fields):
+        job = {
+            'job_id': 1,
+            'job_type': "House Cleaning",
+            'total_amount': 100.0,
+            'time_started': '2024-05-01T09:00:00',
+            'time_ended': '2024-05-01T11:00:00',
+            'location': None,
+            'description': "Deep clean"
+        }
+        return {'client_id': 1, 'client_name': "Test Client Ltd", 'jobs': [job], **fields}
+
+    def test_same_payload_is_rendered_once(self):
+        digest, path, cached = get_invoice_pdf(self.payload())
+        self.assertFalse(cached)
+        self.assertEqual(os.path.basename(path), f'{digest}.pdf')
+        modified = os.path.getmtime(path)
+
+        # Key order does not change the digest
+        again = get_invoice_pdf(dict(reversed(list(self.payload().items()))))
+        self.assertEqual(again, (digest, path, True))
+        self.assertEqual(os.path.getmtime(path), modified)
+
+        self.assertNotEqual(invoice_digest(self.payload(client_name="Other Ltd")), digest)
+        self.assertEqual(os.listdir(self.directory), [f'{digest}.pdf'])
+
+    def test_miss_renders_then_hit_redirects_to_the_download(self):
+        url = f'/clients/invoice_pdf/{self.customer.id}/all_unpaid'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json['task_id'])
+        download_url = response.json['download_url']
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, download_url)
+
+        response = self.client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertTrue(response.data.startswith(b'%PDF'))
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+    def test_download_supports_ranges_and_conditional_requests(self):
+        digest, _, _ = get_invoice_pdf(self.payload())
+        url = f'/clients/invoice_pdf/download/{digest}'
+
+        response = self.client.get(url, headers={'Range': 'bytes=0-3'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, b'%PDF')
+
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_download_rejects_unknown_and_malformed_digests(self):
+        for digest in ('0' * 64, '..%2Fsecret', 'ABC'):
+            with self.subTest(digest=digest):
+                self.assertEqual(self.client.get(f'/clients/invoice_pdf/download/{digest}').status_code, 404)
+
+    def test_client_without_jobs_gets_a_message(self):
+        response = self.client.get(f'/clients/invoice_pdf/{self.idle.id}')
+        self.assertEqual(response.json, {'message': "No jobs to invoice"})
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_custom_period_download_polls_instead_of_submitting(self):
+        page = self.client.get(f'/clients/edit_client/{self.customer.id}').get_data(as_text=True)
+        self.assertIn('invoice-pdf-submit', page)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
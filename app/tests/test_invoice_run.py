@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app import invoice_run
+from app.commands import month_end_invoices_command
+from app.extensions import celery, db
+from app.invoice_pdf import get_invoice_pdf, invoice_digest
+from app.models import ClientStatusEnum, Job, JobType
+from app.stats import previous_month
+from app.tasks import run_month_end_invoices
+from app.tests.base import DatabaseTestCase, make_client
+from app.views.clients import get_invoice_data
+
+
+class TestMonthEndInvoices(DatabaseTestCase):
+
+    config = {'LOGIN_DISABLED': True}
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.app.config['INVOICE_PDF_DIR'] = self.directory
+        self.year, self.month = previous_month()
+
+        self.job_type = JobType(name="House Cleaning")
+        self.acme = make_client("Acme Offices")
+        self.baker = make_client("Baker Street Flats")
+        self.gone = make_client("Gone Ltd", status=ClientStatusEnum.INACTIVE)
+        self.quiet = make_client("Quiet Ltd")
+        db.session.add_all([self.job_type, self.acme, self.baker, self.gone, self.quiet])
+        db.session.flush()
+
+        in_month = datetime(self.year, self.month, 10, 9)
+        self.add_job(self.acme, in_month)
+        self.add_job(self.acme, in_month + timedelta(days=1))
+        self.add_job(self.baker, in_month)
+        self.add_job(self.gone, in_month)
+        # The day after the month ends belongs to the next run
+        self.add_job(self.quiet, datetime(self.year + self.month // 12, self.month % 12 + 1, 1))
+        db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def add_job(self, client, started):
+        db.session.add(Job(
+            job_type_id=self.job_type.id,
+            client_id=client.id,
+            total_amount=100.0,
+            time_started=started,
+            time_ended=started + timedelta(hours=2),
+            description="Deep clean"
+        ))
+
+    def manifests(self):
+        runs = os.path.join(self.directory, 'runs')
+        manifests = []
+        for name in sorted(os.listdir(runs)):
+            with open(os.path.join(runs, name)) as manifest_file:
+                manifests.append(json.load(manifest_file))
+        return manifests
+
+    def test_collects_active_clients_with_jobs_in_the_month(self):
+        payloads = invoice_run.collect_month_invoices(self.year, self.month)
+
+        self.assertEqual([(payload['client_name'], len(payload['jobs'])) for payload in payloads], [
+            ("Acme Offices", 2), ("Baker Street Flats", 1)
+        ])
+        # Shaped like the client page's last month invoice, so both share a cached PDF
+        with self.app.test_request_context():
+            self.assertEqual(invoice_digest(payloads[0]), invoice_digest(get_invoice_data(self.acme.id, 'last_month')))
+
+    def test_run_writes_a_manifest_and_reuses_cached_pdfs(self):
+        first = invoice_run.run_month_end_invoices(self.year, self.month, concurrency=1)
+        second = invoice_run.run_month_end_invoices(self.year, self.month, concurrency=1)
+
+        self.assertEqual((first['clients'], first['rendered'], first['cached'], first['failed']), (2, 2, 0, 0))
+        self.assertEqual((second['rendered'], second['cached']), (0, 2))
+        self.assertEqual([entry['file'] for entry in first['invoices']], [entry['file'] for entry in second['invoices']])
+
+        stored = self.manifests()
+        self.assertEqual(len(stored), 2)
+        self.assertEqual(stored[0]['period'], f'{self.year}-{self.month:02d}')
+        self.assertEqual(stored[0]['invoices'][0]['total_amount'], 200.0)
+        self.assertEqual(stored[0]['concurrency'], 1)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, stored[0]['invoices'][0]['file'])))
+
+    def test_failed_client_is_recorded_and_the_rest_still_render(self):
+        def fail_for_acme(invoice_data, directory=None):
+            if invoice_data['client_name'] == "Acme Offices":
+                raise OSError("disk full")
+            return get_invoice_pdf(invoice_data, directory)
+
+        with patch('app.invoice_run.get_invoice_pdf', side_effect=fail_for_acme):
+            result = self.app.test_cli_runner().invoke(
+                month_end_invoices_command, ['--year', str(self.year), '--month', str(self.month), '--concurrency', '1']
+            )
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Acme Offices: 2 jobs", result.output)
+        self.assertIn("FAILED OSError: disk full", result.output)
+        [manifest] = self.manifests()
+        self.assertEqual((manifest['rendered'], manifest['failed']), (1, 1))
+        failed, rendered = manifest['invoices']
+        self.assertEqual((failed['file'], failed['error']), (None, "OSError: disk full"))
+        self.assertIsNone(rendered['error'])
+
+    def test_year_and_month_must_be_passed_together(self):
+        result = self.app.test_cli_runner().invoke(month_end_invoices_command, ['--year', '2024'])
+        self.assertEqual(result.exit_code, 2)
+
+    def test_celery_run_writes_the_manifest_from_the_chord(self):
+        celery.conf.task_always_eager = True
+        try:
+            run_month_end_invoices.apply(args=[self.year, self.month]).get()
+        finally:
+            celery.conf.task_always_eager = False
+
+        [manifest] = self.manifests()
+        self.assertEqual([entry['client_name'] for entry in manifest['invoices']], ["Acme Offices", "Baker Street Flats"])
+        self.assertEqual(manifest['rendered'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
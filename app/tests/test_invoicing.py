@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import create_app
+from app.extensions import celery, db, invoice_api
+from app.invoicing import CircuitOpenError, InvoiceApiError, InvoiceApiUnavailable
+from app.models import Job, JobType
+from app.tasks import post_invoice
+from app.tests.base import make_client, uses_in_memory_sqlite
+
+
+class StandInInvoiceApi(BaseHTTPRequestHandler):
+    """Local stand-in for the invoice API, answering with a scripted list of status codes ('slow' stalls past the read timeout)"""
+
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    requests = []
+    keys = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        type(self).requests.append((self.client_address[1], body))
+        type(self).keys.append(self.headers['Idempotency-Key'])
+        status = type(self).statuses.pop(0) if type(self).statuses else 200
+        if status == 'slow':
+            time.sleep(0.5)
+            status = 200
+
+        payload = json.dumps({'invoice_url': f"https://invoices.test/{body['client_id']}.pdf"}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestInvoiceApiClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInInvoiceApi)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config.update(
+            TESTING=True,
+            LOGIN_DISABLED=True,
+            INVOICE_API_URL=f'http://127.0.0.1:{self.server.server_port}/generate-invoice',
+            INVOICE_API_READ_TIMEOUT=0.3,
+            INVOICE_API_RETRIES=2,
+            INVOICE_API_BACKOFF=0,
+            INVOICE_API_TASK_RETRIES=2,
+            INVOICE_API_TASK_RETRY_DELAY=0,
+            INVOICE_API_BREAKER_THRESHOLD=2,
+            INVOICE_API_BREAKER_RESET=0.2
+        )
+        invoice_api.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        StandInInvoiceApi.statuses = []
+        StandInInvoiceApi.requests = []
+        StandInInvoiceApi.keys = []
+
+    def tearDown(self):
+        invoice_api.close()
+        self.app_context.pop()
+
+    def test_reuses_one_keep_alive_connection(self):
+        for client_id in range(3):
+            result = invoice_api.post_invoice({'client_id': client_id, 'jobs': []})
+            self.assertEqual(result, {'invoice_url': f"https://invoices.test/{client_id}.pdf"})
+
+        ports = {port for port, _ in StandInInvoiceApi.requests}
+        self.assertEqual(len(StandInInvoiceApi.requests), 3)
+        self.assertEqual(len(ports), 1)
+
+    def test_does_not_repeat_a_post_the_api_may_have_seen(self):
+        for status in (503, 429, 'slow'):
+            with self.subTest(status=status):
+                StandInInvoiceApi.statuses = [status]
+                StandInInvoiceApi.requests = []
+                with self.assertRaises(InvoiceApiUnavailable):
+                    invoice_api.post_invoice({'client_id': 1, 'jobs': []})
+                self.assertEqual(len(StandInInvoiceApi.requests), 1)
+                invoice_api.breaker.record_success()
+
+    def test_rejected_invoice_is_not_worth_posting_again(self):
+        StandInInvoiceApi.statuses = [422]
+        with self.assertRaises(InvoiceApiError) as raised:
+            invoice_api.post_invoice({'client_id': 1, 'jobs': []})
+
+        self.assertNotIsInstance(raised.exception, InvoiceApiUnavailable)
+        self.assertEqual(len(StandInInvoiceApi.requests), 1)
+
+    def test_task_posts_again_with_the_same_idempotency_key(self):
+        invoice_api.breaker.failure_threshold = 10
+        StandInInvoiceApi.statuses = [502, 'slow']
+        result = post_invoice.apply(args=[{'client_id': 1, 'jobs': [{'id': 1}]}]).get()
+        post_invoice.apply(args=[{'jobs': [{'id': 1}], 'client_id': 1}]).get()
+        post_invoice.apply(args=[{'client_id': 2, 'jobs': [{'id': 1}]}]).get()
+
+        self.assertEqual(result['invoice_url'], "https://invoices.test/1.pdf")
+        first, *rest = StandInInvoiceApi.keys
+        self.assertEqual(len(StandInInvoiceApi.keys), 5)
+        # The task's retries and the re-post of the same invoice reuse the key; another invoice gets its own
+        self.assertEqual(rest[:3], [first] * 3)
+        self.assertNotEqual(rest[3], first)
+
+    def test_task_gives_up_after_bounded_retries(self):
+        invoice_api.breaker.failure_threshold = 10
+        StandInInvoiceApi.statuses = [500] * 10
+        with self.assertRaises(InvoiceApiUnavailable):
+            post_invoice.apply(args=[{'client_id': 1, 'jobs': []}]).get()
+
+        # The first attempt plus INVOICE_API_TASK_RETRIES
+        self.assertEqual(len(StandInInvoiceApi.requests), 3)
+
+    def test_circuit_opens_and_recovers(self):
+        StandInInvoiceApi.statuses = [500] * 2
+        for _ in range(2):
+            with self.assertRaises(InvoiceApiError):
+                invoice_api.post_invoice({'client_id': 1, 'jobs': []})
+        self.assertEqual(invoice_api.breaker.state, 'open')
+
+        calls = len(StandInInvoiceApi.requests)
+        with self.assertRaises(CircuitOpenError):
+            invoice_api.post_invoice({'client_id': 1, 'jobs': []})
+        self.assertEqual(len(StandInInvoiceApi.requests), calls)
+
+        time.sleep(0.25)
+        self.assertEqual(invoice_api.breaker.state, 'half-open')
+        invoice_api.post_invoice({'client_id': 1, 'jobs': []})
+        self.assertEqual(invoice_api.breaker.state, 'closed')
+
+    def test_generate_invoice_returns_task_id(self):
+        if not uses_in_memory_sqlite():
+            self.skipTest("Needs DATABASE_URL=sqlite:///:memory:")
+
+        db.create_all()
+        try:
+            job_type = JobType(name="House Cleaning")
+            client = make_client()
+            db.session.add_all([job_type, client])
+            db.session.flush()
+            started = datetime.now() - timedelta(days=1)
+            db.session.add(Job(
+                job_type_id=job_type.id,
+                client_id=client.id,
+                total_amount=100.0,
+                time_started=started,
+                time_ended=started + timedelta(hours=2)
+            ))
+            db.session.commit()
+
+            # Run the task in-process instead of through the broker
+            celery.conf.task_always_eager = True
+            try:
+                response = self.app.test_client().get(f'/clients/generate_invoice/{client.id}')
+            finally:
+                celery.conf.task_always_eager = False
+
+            self.assertEqual(response.status_code, 202)
+            self.assertTrue(response.json['task_id'])
+            self.assertEqual(response.json['status_url'], f"/clients/invoice_status/{response.json['task_id']}")
+            [(_, posted)] = StandInInvoiceApi.requests
+            self.assertEqual(posted['client_id'], client.id)
+            self.assertEqual(len(posted['jobs']), 1)
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,87 @@
+import unittest
+
+from app.extensions import db, form_choices
+from app.models import ClientStatusEnum, JobType
+from app.tests.base import DatabaseTestCase, make_client
+
+
+class TestJobFormChoices(DatabaseTestCase):
+
+    config = {'LOGIN_DISABLED': True, 'WTF_CSRF_ENABLED': False, 'JOBS_MAX_PAGE_SIZE': 3}
+
+    def setUp(self):
+        super().setUp()
+        self.cleaning = JobType(name="House Cleaning")
+        self.clients = [
+            make_client(name)
+            for name in ("Acme Offices", "Baker Street Flats", "Acorn Nursery", "The Acme Annexe", "Zed Acme")
+        ]
+        db.session.add_all([self.cleaning, *self.clients])
+        db.session.commit()
+        # Another test's snapshot may still be cached in this process
+        form_choices.clear()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        form_choices.clear()
+        super().tearDown()
+
+    def typeahead(self, q, **params):
+        response = self.client.get('/jobs/client_typeahead.json', query_string={'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [client['name'] for client in response.json['clients']]
+
+    def test_snapshot_is_reused_until_a_watched_commit(self):
+        snapshot = form_choices.get()
+        self.assertIs(form_choices.get(), snapshot)
+
+        db.session.add(make_client("Crown Hotel"))
+        db.session.commit()
+
+        self.assertIsNot(form_choices.get(), snapshot)
+        self.assertIn("Crown Hotel", form_choices.get().client_names.values())
+
+    def test_renaming_a_client_or_job_type_reloads_the_choices(self):
+        form_choices.get()
+        self.clients[1].name = "Baker Street Apartments"
+        self.cleaning.name = "Deep Cleaning"
+        db.session.commit()
+
+        choices = form_choices.get()
+        self.assertEqual(choices.client_names[self.clients[1].id], "Baker Street Apartments")
+        self.assertEqual(choices.job_types, [(self.cleaning.id, "Deep Cleaning")])
+
+    def test_adding_a_job_type_reloads_the_choices(self):
+        form_choices.get()
+        windows = JobType(name="Window Washing")
+        db.session.add(windows)
+        db.session.commit()
+
+        self.assertIn((windows.id, "Window Washing"), form_choices.get().job_types)
+
+    def test_inactive_clients_are_not_offered(self):
+        form_choices.get()
+        self.clients[0].status = ClientStatusEnum.INACTIVE
+        db.session.commit()
+
+        self.assertNotIn(self.clients[0].id, form_choices.get().client_names)
+
+    def test_typeahead_matches_word_prefixes(self):
+        # Names starting with the query come first, then the rest alphabetically
+        self.assertEqual(self.typeahead("acme"), ["Acme Offices", "The Acme Annexe", "Zed Acme"])
+        self.assertEqual(self.typeahead("ACO"), ["Acorn Nursery"])
+        self.assertEqual(self.typeahead("acme an"), ["The Acme Annexe"])
+        self.assertEqual(self.typeahead("street"), ["Baker Street Flats"])
+        self.assertEqual(self.typeahead("cme"), [])
+        self.assertEqual(self.typeahead("  "), [])
+
+    def test_typeahead_limit_is_capped(self):
+        # Four clients match; JOBS_MAX_PAGE_SIZE caps both the asked and the default limit
+        self.assertEqual(self.typeahead("ac", limit=100), ["Acme Offices", "Acorn Nursery", "The Acme Annexe"])
+        self.assertEqual(len(self.typeahead("ac")), 3)
+        self.assertEqual(self.typeahead("ac", limit=2), ["Acme Offices", "Acorn Nursery"])
+        self.assertEqual(self.typeahead("ac", limit=0), ["Acme Offices"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
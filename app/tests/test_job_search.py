@@ -0,0 +1,91 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Job, JobType
+from app.tests.base import DatabaseTestCase, make_client
+
+
+class TestJobSearch(DatabaseTestCase):
+
+    config = {'LOGIN_DISABLED': True, 'WTF_CSRF_ENABLED': False}
+
+    def setUp(self):
+        super().setUp()
+        self.cleaning = JobType(name="House Cleaning")
+        self.windows = JobType(name="Window Washing")
+        self.acme = make_client("Acme Offices")
+        self.baker = make_client("Baker Street Flats")
+        db.session.add_all([self.cleaning, self.windows, self.acme, self.baker])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def add_job(self, client, job_type, description, days_ago=0):
+        started = datetime.utcnow() - timedelta(days=days_ago)
+        job = Job(
+            job_type_id=job_type.id,
+            client_id=client.id,
+            total_amount=100.0,
+            time_started=started,
+            time_ended=started + timedelta(hours=2),
+            description=description
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+    def search(self, term, **params):
+        response = self.client.get('/jobs/jobs.json', query_string={'search': term, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.json
+
+    def job_ids(self, term, **params):
+        return [job['job_id'] for job in self.search(term, **params)['jobs']]
+
+    def test_punctuation_only_search_is_an_empty_page(self):
+        self.add_job(self.acme, self.cleaning, "Deep clean")
+
+        for term in ('"', '-', '*', '" -'):
+            with self.subTest(term=term):
+                self.assertEqual(self.search(term), {'jobs': [], 'next_cursor': None, 'prev_cursor': None})
+                self.assertEqual(self.client.get('/jobs/jobs', query_string={'search': term}).status_code, 200)
+
+    def test_every_word_matches_as_a_prefix(self):
+        deep = self.add_job(self.acme, self.cleaning, "Deep clean of the kitchen")
+        gutters = self.add_job(self.baker, self.windows, "Gutters and frames")
+        self.add_job(self.baker, self.cleaning, "Carpets")
+
+        self.assertEqual(self.job_ids("kitch"), [deep])
+        self.assertEqual(sorted(self.job_ids("wind")), [gutters])
+        # Client and job type names are searched too, and every word must match
+        self.assertEqual(self.job_ids("acme clea"), [deep])
+        self.assertEqual(self.job_ids("baker gutter"), [gutters])
+        self.assertEqual(self.job_ids("acme gutter"), [])
+
+    def test_results_are_ranked_by_relevance(self):
+        passing = self.add_job(
+            self.acme, self.cleaning, "Skirting boards, stairs, landing and one oven in the utility room", days_ago=1
+        )
+        focused = self.add_job(self.acme, self.cleaning, "Oven oven oven", days_ago=3)
+
+        self.assertEqual(self.job_ids("oven"), [focused, passing])
+
+    def test_pages_through_search_results(self):
+        expected = {self.add_job(self.acme, self.cleaning, f"Oven clean {index}", days_ago=index) for index in range(5)}
+        self.add_job(self.baker, self.windows, "Gutters")
+
+        pages = [self.search("oven", per_page=2)]
+        while pages[-1]['next_cursor']:
+            pages.append(self.search("oven", per_page=2, after=pages[-1]['next_cursor']))
+
+        ids = [job['job_id'] for page in pages for job in page['jobs']]
+        self.assertEqual([len(page['jobs']) for page in pages], [2, 2, 1])
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), expected)
+
+        back = self.search("oven", per_page=2, before=pages[1]['prev_cursor'])
+        self.assertEqual(back['jobs'], pages[0]['jobs'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Job, JobType
+from app.pagination import encode_cursor
+from app.tests.base import DatabaseTestCase, make_client
+
+
+class TestJobsPagination(DatabaseTestCase):
+
+    config = {'LOGIN_DISABLED': True, 'WTF_CSRF_ENABLED': False}
+
+    def setUp(self):
+        super().setUp()
+        job_type = JobType(name="House Cleaning")
+        client = make_client()
+        db.session.add_all([job_type, client])
+        db.session.flush()
+
+        # Jobs 3 and 4 start at the same moment, so the id breaks the tie
+        base = datetime(2024, 5, 1, 9)
+        starts = [base, base + timedelta(days=1), base + timedelta(days=2), base + timedelta(days=2), base + timedelta(days=3)]
+        jobs = [
+            Job(
+                job_type_id=job_type.id,
+                client_id=client.id,
+                total_amount=100.0,
+                time_started=started,
+                time_ended=started + timedelta(hours=2)
+            )
+            for started in starts
+        ]
+        db.session.add_all(jobs)
+        db.session.commit()
+        # Newest first, ties broken by the higher id
+        self.expected = [job.id for job in sorted(jobs, key=lambda job: (job.time_started, job.id), reverse=True)]
+        self.client = self.app.test_client()
+
+    def page(self, **params):
+        response = self.client.get('/jobs/jobs.json', query_string=params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.json
+
+    def ids(self, page):
+        return [job['job_id'] for job in page['jobs']]
+
+    def test_pages_forward_newest_first(self):
+        pages = [self.page(per_page=2)]
+        while pages[-1]['next_cursor']:
+            pages.append(self.page(per_page=2, after=pages[-1]['next_cursor']))
+
+        self.assertEqual([self.ids(page) for page in pages], [self.expected[0:2], self.expected[2:4], self.expected[4:]])
+        self.assertIsNone(pages[0]['prev_cursor'])
+
+    def test_pages_backward_from_the_last_page(self):
+        first = self.page(per_page=2)
+        second = self.page(per_page=2, after=first['next_cursor'])
+        last = self.page(per_page=2, after=second['next_cursor'])
+
+        back = self.page(per_page=2, before=last['prev_cursor'])
+        self.assertEqual(self.ids(back), self.expected[2:4])
+        self.assertEqual(self.ids(self.page(per_page=2, before=back['prev_cursor'])), self.expected[0:2])
+
+    def test_bad_cursor_is_a_bad_request(self):
+        for cursor in ('not-a-cursor!', encode_cursor([1]), encode_cursor(['2024-05-01', 1, 2])):
+            for url in ('/jobs/jobs', '/jobs/jobs.json'):
+                with self.subTest(cursor=cursor, url=url):
+                    self.assertEqual(self.client.get(url, query_string={'after': cursor}).status_code, 400)
+                    self.assertEqual(self.client.get(url, query_string={'before': cursor}).status_code, 400)
+
+    def test_html_listing_links_to_the_next_page(self):
+        next_cursor = self.page(per_page=2)['next_cursor']
+
+        response = self.client.get('/jobs/jobs', query_string={'per_page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'after={next_cursor}', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from app import create_app
+from app.extensions import mail_templates
+
+
+class TestMailTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app.config['MAIL_TEMPLATE_CACHE_DIR'] = self.cache_dir.name
+        mail_templates.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+        # Point the shared renderer back at the configured cache
+        mail_templates.init_app(create_app())
+        self.cache_dir.cleanup()
+
+    def weekly_context(self, overdue_count):
+        return dict(
+            today=datetime(2026, 10, 5, 9, 30),
+            total_unpaid=overdue_count * 125.5,
+            total_overdue=overdue_count * 125.5,
+            overdue=[
+                {
+                    'client': f"Client {index}",
+                    'amount': 125.5,
+                    'days_overdue': index % 90,
+                    'job_description': f"Job {index}"
+                }
+                for index in range(overdue_count)
+            ],
+            due_soon=[],
+            future_count=0,
+            future_amount=0
+        )
+
+    def test_renders_text_and_html_parts(self):
+        context = self.weekly_context(2)
+        context['overdue'][0]['client'] = "Smith & <Sons>"
+
+        text, html = mail_templates.render('weekly_reminder', **context)
+
+        self.assertTrue(text.startswith("📋 WEEKLY PAYMENT REMINDER - 05/10/2026\n"))
+        self.assertIn("   • Smith & <Sons>: £125.50 (0 days overdue)\n     Service: Job 0\n", text)
+        self.assertIn("   ✅ No payments due this week\n", text)
+        self.assertIn("Smith &amp; &lt;Sons&gt;", html)
+        self.assertNotIn("<Sons>", html)
+
+    def test_text_only_email_has_no_html_part(self):
+        text, html = mail_templates.render('test_email', now=datetime(2026, 10, 5, 9, 30))
+
+        self.assertEqual(text, "This is a test email. The date and time is 2026-10-05 09:30:00")
+        self.assertIsNone(html)
+
+    def test_cached_render_only_substitutes_slots(self):
+        first_url = "https://example.com/auth/confirm/first?a=1&b=2"
+        text, html = mail_templates.render_cached('confirmation_email', {'confirm_url': first_url})
+
+        expected_text, expected_html = mail_templates.render('confirmation_email', confirm_url=first_url)
+        self.assertEqual((text, html), (expected_text, expected_html))
+        self.assertIn("first?a=1&amp;b=2", html)
+
+        with patch.object(mail_templates, '_stream', side_effect=AssertionError("rendered again")):
+            text, html = mail_templates.render_cached(
+                'confirmation_email', {'confirm_url': "https://example.com/auth/confirm/second"}
+            )
+        self.assertIn("https://example.com/auth/confirm/second\n", text)
+        self.assertNotIn("first", html)
+        self.assertNotIn("[[slot:", html)
+
+    def test_compiled_templates_are_cached_on_disk(self):
+        mail_templates.render('weekly_reminder', **self.weekly_context(1))
+
+        self.assertTrue(any(name.endswith('.cache') for name in os.listdir(self.cache_dir.name)))
+
+    def test_ten_thousand_line_reminder_renders_quickly(self):
+        context = self.weekly_context(5000)
+
+        started = time.perf_counter()
+        text, html = mail_templates.render('weekly_reminder', **context)
+        elapsed = time.perf_counter() - started
+
+        self.assertGreaterEqual(text.count('\n'), 10000)
+        self.assertEqual(html.count('<tr>'), 5001)
+        self.assertLess(elapsed, 1.0, f"Rendering took {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
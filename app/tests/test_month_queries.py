@@ -0,0 +1,135 @@
+import os
+import random
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.extensions import db
+from app.models import Job, JobType
+from app.stats import bucket_totals_select, month_bounds
+from app.tests.base import make_client, uses_in_memory_sqlite
+from app.views.clients import get_jobs_between
+
+CLIENT_COUNT = 200
+JOB_TYPE_COUNT = 6
+
+
+def median_ms(func, runs=200):
+    """Return the median wall-clock time of func in milliseconds"""
+    func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+class TestMonthQueries(unittest.TestCase):
+    """Check the half-open month range queries are answered from the job indexes"""
+
+    job_count = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app()
+        cls.app_context = cls.app.app_context()
+        cls.app_context.push()
+
+        if not uses_in_memory_sqlite():
+            cls.app_context.pop()
+            raise unittest.SkipTest("Month query tests need DATABASE_URL=sqlite:///:memory:")
+
+        db.create_all()
+        db.session.add_all([JobType(name=f"Job Type {i}") for i in range(JOB_TYPE_COUNT)])
+        db.session.add_all([make_client(f"Client {i}") for i in range(CLIENT_COUNT)])
+        db.session.commit()
+
+        # Five years of jobs, inserted in bulk so the rollup listeners are bypassed
+        rng = random.Random(0)
+        base = datetime(2021, 1, 1)
+        rows = []
+        for _ in range(cls.job_count):
+            started = base + timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60))
+            rows.append({
+                'job_type_id': rng.randint(1, JOB_TYPE_COUNT),
+                'client_id': rng.randint(1, CLIENT_COUNT),
+                'total_amount': 100.0,
+                'time_started': started,
+                'time_ended': started + timedelta(hours=2)
+            })
+        db.session.execute(db.insert(Job), rows)
+        db.session.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.app_context.pop()
+
+    def query_plan(self, statement):
+        compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        return ' '.join(row[-1] for row in rows)
+
+    def test_month_range_uses_time_started_index(self):
+        start, end = month_bounds(2024, 6)
+        statement = db.select(db.func.count(Job.id)).where(Job.time_started >= start, Job.time_started < end)
+
+        self.assertIn('ix_job_time_started', self.query_plan(statement))
+
+    def test_client_period_uses_composite_index(self):
+        start, end = month_bounds(2024, 6)
+        statement = db.select(Job).where(
+            Job.client_id == 7, Job.time_started >= start, Job.time_started < end
+        )
+
+        self.assertIn('ix_job_client_id_time_started', self.query_plan(statement))
+
+    def test_rollup_bucket_refresh_uses_composite_index(self):
+        start, end = month_bounds(2024, 6)
+        statement = bucket_totals_select().where(
+            Job.client_id == 7,
+            Job.job_type_id == 2,
+            Job.time_started >= start,
+            Job.time_started < end
+        )
+
+        self.assertIn('ix_job_client_id_time_started', self.query_plan(statement))
+
+
+@unittest.skipUnless(os.getenv('RUN_BENCHMARKS'), "Set RUN_BENCHMARKS=1 to time the month queries against 100k jobs")
+class BenchmarkMonthQueries(TestMonthQueries):
+    """Time the month range queries against 100k jobs, within BENCHMARK_BUDGET_MS each"""
+
+    job_count = 100000
+    budget_ms = float(os.getenv('BENCHMARK_BUDGET_MS', 1))
+
+    def assertWithinBudget(self, name, func):
+        elapsed = median_ms(func)
+        self.assertLess(elapsed, self.budget_ms, f"{name} took {elapsed:.3f} ms")
+
+    def test_month_job_count_time(self):
+        start, end = month_bounds(2024, 6)
+        statement = db.select(db.func.count(Job.id)).where(Job.time_started >= start, Job.time_started < end)
+        self.assertWithinBudget("month job count", lambda: db.session.execute(statement).scalar())
+
+    def test_client_month_jobs_time(self):
+        start, end = month_bounds(2024, 6)
+        self.assertWithinBudget("client month jobs", lambda: get_jobs_between(7, start, end))
+
+    def test_rollup_bucket_refresh_time(self):
+        start, end = month_bounds(2024, 6)
+        statement = bucket_totals_select().where(
+            Job.client_id == 7,
+            Job.job_type_id == 2,
+            Job.time_started >= start,
+            Job.time_started < end
+        )
+        self.assertWithinBudget("monthly_stats bucket refresh", lambda: db.session.execute(statement).first())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,126 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Expense, ExpenseType, Job, JobType, MonthlyStats, Payment, PaymentStatus
+from app.stats import verify_job_amounts, verify_monthly_stats
+from app.tests.base import DatabaseTestCase, make_client
+
+
+class TestMonthlyStatsListeners(DatabaseTestCase):
+    """
+    Edit committed rows, so every object is expired before it changes, and
+    check the rollup and the job amounts still match the raw tables.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cleaning = JobType(name="House Cleaning")
+        self.windows = JobType(name="Window Washing")
+        self.acme = make_client("Acme Offices")
+        self.baker = make_client("Baker Street Flats")
+        db.session.add_all([self.cleaning, self.windows, self.acme, self.baker])
+        db.session.commit()
+
+    def add_job(self, started=datetime(2024, 5, 10, 9), client=None, job_type=None, amount=100.0):
+        job = Job(
+            job_type_id=(job_type or self.cleaning).id,
+            client_id=(client or self.acme).id,
+            total_amount=amount,
+            time_started=started,
+            time_ended=started + timedelta(hours=2)
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def add_payment(self, job, amount=40.0):
+        payment = Payment(
+            job_id=job.id,
+            amount=amount,
+            payment_date=job.time_started,
+            due_date=job.time_started + timedelta(days=30),
+            payment_status=PaymentStatus.PAID
+        )
+        db.session.add(payment)
+        db.session.commit()
+        return payment
+
+    def assertInStep(self):
+        self.assertEqual(verify_monthly_stats(), [])
+        self.assertEqual(verify_job_amounts(), [])
+
+    def buckets(self):
+        return {
+            (row.year, row.month, row.client_id, row.job_type_id): row.job_count
+            for row in MonthlyStats.query.all()
+        }
+
+    def test_moving_a_job_to_another_month(self):
+        job = self.add_job()
+        self.add_job(client=self.baker)
+
+        job.time_started = datetime(2024, 6, 2, 9)
+        db.session.commit()
+
+        self.assertInStep()
+        self.assertNotIn((2024, 5, self.acme.id, self.cleaning.id), self.buckets())
+
+    def test_moving_a_job_to_another_client(self):
+        job = self.add_job()
+        self.add_job()
+
+        job.client_id = self.baker.id
+        db.session.commit()
+
+        self.assertInStep()
+        self.assertEqual(self.buckets()[(2024, 5, self.acme.id, self.cleaning.id)], 1)
+
+    def test_moving_a_job_to_another_job_type(self):
+        job = self.add_job()
+        self.add_payment(job)
+
+        job.job_type_id = self.windows.id
+        db.session.commit()
+
+        self.assertInStep()
+        self.assertEqual(self.buckets(), {(2024, 5, self.acme.id, self.windows.id): 1})
+
+    def test_moving_a_payment_to_another_job(self):
+        first = self.add_job()
+        second = self.add_job(started=datetime(2024, 6, 3, 9), client=self.baker)
+        payment = self.add_payment(first)
+
+        payment.job_id = second.id
+        db.session.commit()
+
+        self.assertInStep()
+        self.assertEqual((first.amount_paid, second.amount_paid), (0, 40.0))
+
+    def test_moving_an_expense_to_another_job(self):
+        first = self.add_job()
+        second = self.add_job(job_type=self.windows)
+        expense = Expense(job_id=first.id, expense_type=ExpenseType.SUPPLIES, amount=15.0, expense_date=first.time_started)
+        db.session.add(expense)
+        db.session.commit()
+
+        expense.job_id = second.id
+        db.session.commit()
+
+        self.assertInStep()
+
+    def test_deleting_a_job(self):
+        job = self.add_job()
+        payment = self.add_payment(job)
+        self.add_job(started=datetime(2024, 6, 3, 9))
+
+        db.session.delete(payment)
+        db.session.delete(job)
+        db.session.commit()
+
+        self.assertInStep()
+        self.assertEqual(self.buckets(), {(2024, 6, self.acme.id, self.cleaning.id): 1})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,243 @@
+import socketserver
+import threading
+import unittest
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+from flask_mail import Message
+
+from app.extensions import celery, confirmation_throttle, db, mail
+from app.models import OutboxEmail, OutboxStatus, User
+from app.tests.base import DatabaseTestCase
+
+
+class StandInSmtpServer(socketserver.ThreadingTCPServer):
+    """
+    A local SMTP server standing in for MAIL_SERVER.
+
+    It records every connection and accepted message, and answers RCPT TO
+    with the replies queued in rcpt_replies before falling back to 250.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInSmtpHandler)
+        self.connections = 0
+        self.messages = []
+        self.rcpt_replies = []
+
+
+class StandInSmtpHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply("250 stand-in")
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                answer = server.rcpt_replies.pop(0) if server.rcpt_replies else "250 OK"
+                if answer.startswith('250'):
+                    recipients.append(command.split(':', 1)[1].strip('<> '))
+                self.reply(answer)
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line == b'.\r\n':
+                        break
+                    data.append(data_line)
+                server.messages.append((recipients, message_from_bytes(b''.join(data))))
+                self.reply("250 OK queued")
+            elif verb in ('RSET', 'NOOP'):
+                recipients = [] if verb == 'RSET' else recipients
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class TestMailOutbox(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = StandInSmtpServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.app.config.update(
+            MAIL_SERVER='127.0.0.1',
+            MAIL_PORT=self.server.server_address[1],
+            MAIL_USE_TLS=False,
+            MAIL_USE_SSL=False,
+            MAIL_USERNAME=None,
+            MAIL_PASSWORD=None,
+            MAIL_DEFAULT_SENDER='office@example.com',
+            MAIL_SUPPRESS_SEND=False
+        )
+        mail.init_app(self.app)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def queue(self, count, **fields):
+        from app.outbox import queue_email
+
+        return [
+            queue_email(Message(
+                subject=f"Reminder {index}",
+                recipients=[f"client{index}@example.com"],
+                body=f"Reminder {index}",
+                html=f"<p>Reminder {index}</p>",
+                **fields
+            ))
+            for index in range(count)
+        ]
+
+    def make_due(self):
+        OutboxEmail.query.update({OutboxEmail.next_attempt_at: datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+
+    def test_batches_share_one_connection(self):
+        from app.outbox import drain_outbox
+
+        self.queue(7)
+        self.assertEqual(self.server.connections, 0)
+
+        self.assertEqual(drain_outbox(batch_size=3), {'sent': 7, 'retrying': 0, 'dead': 0})
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(
+            [recipients for recipients, _ in self.server.messages],
+            [[f"client{index}@example.com"] for index in range(7)]
+        )
+        _, first = self.server.messages[0]
+        self.assertEqual(first['Subject'], "Reminder 0")
+        self.assertEqual(first['From'], "office@example.com")
+        self.assertEqual(
+            [part.get_content_type() for part in first.walk() if not part.is_multipart()],
+            ['text/plain', 'text/html']
+        )
+        self.assertEqual({email.status for email in OutboxEmail.query}, {OutboxStatus.SENT})
+
+    def test_temporary_failure_retries_with_backoff(self):
+        from app.tasks import deliver_outbox
+
+        email, = self.queue(1)
+        self.server.rcpt_replies = ["451 4.7.1 Try again later"] * 2
+
+        started = datetime.utcnow()
+        self.assertIn("0 sent, 1 retrying, 0 dead", deliver_outbox())
+        self.assertEqual((email.status, email.attempts), (OutboxStatus.PENDING, 1))
+        self.assertIn("451", email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, started + timedelta(seconds=60))
+
+        # Not due yet, so nothing is tried
+        self.assertIn("0 sent, 0 retrying, 0 dead", deliver_outbox())
+        self.assertEqual(email.attempts, 1)
+
+        self.make_due()
+        deliver_outbox()
+        self.assertEqual(email.attempts, 2)
+        self.assertGreaterEqual(email.next_attempt_at, started + timedelta(seconds=120))
+
+        self.make_due()
+        self.assertIn("1 sent, 0 retrying, 0 dead", deliver_outbox())
+        self.assertEqual((email.status, email.attempts, email.last_error), (OutboxStatus.SENT, 3, None))
+        self.assertEqual(len(self.server.messages), 1)
+
+    def test_failures_are_dead_lettered(self):
+        from app.outbox import drain_outbox, requeue_dead_emails
+
+        rejected, flaky = self.queue(2)
+        self.app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = 2
+        self.server.rcpt_replies = ["550 5.1.1 No such user", "451 4.3.0 Busy", "451 4.3.0 Busy"]
+
+        self.assertEqual(drain_outbox(), {'sent': 0, 'retrying': 1, 'dead': 1})
+        self.assertEqual((rejected.status, rejected.attempts), (OutboxStatus.DEAD, 1))
+        self.assertIn("550", rejected.last_error)
+
+        self.make_due()
+        self.assertEqual(drain_outbox(), {'sent': 0, 'retrying': 0, 'dead': 1})
+        self.assertEqual((flaky.status, flaky.attempts), (OutboxStatus.DEAD, 2))
+
+        self.assertEqual(requeue_dead_emails(), 2)
+        self.assertEqual(drain_outbox(), {'sent': 2, 'retrying': 0, 'dead': 0})
+
+    def test_connection_failure_retries_the_batch(self):
+        from app.outbox import drain_outbox
+
+        first, second = self.queue(2)
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = 2
+        # An outage longer than MAIL_OUTBOX_MAX_ATTEMPTS runs uses up no attempts
+        for _ in range(3):
+            self.assertEqual(drain_outbox(), {'sent': 0, 'retrying': 2, 'dead': 0})
+        self.assertEqual([first.attempts, second.attempts], [0, 0])
+        self.assertEqual({first.status, second.status}, {OutboxStatus.PENDING})
+        self.assertLessEqual(first.next_attempt_at, datetime.utcnow())
+        self.assertIn("ConnectionRefusedError", first.last_error)
+
+    def test_confirmation_emails_are_throttled_per_user(self):
+        users = [User(name=name, email=f"{name}@example.com") for name in ("office", "manager")]
+        db.session.add_all(users)
+        db.session.commit()
+        confirmation_throttle.clear()
+
+        def request_confirmation(user):
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user.id)
+            # A fresh app context, so flask-login does not reuse the last request's user from g
+            with self.app.app_context():
+                response = client.get('/auth/email_confirmation')
+            with client.session_transaction() as session:
+                return response.status_code, session.pop('_flashes', [])
+
+        celery.conf.task_always_eager = True
+        try:
+            responses = [request_confirmation(user) for user in (users[0], users[0], users[1], users[0])]
+        finally:
+            celery.conf.task_always_eager = False
+            confirmation_throttle.clear()
+
+        self.assertEqual([status for status, _ in responses], [200] * 4)
+        self.assertEqual(
+            [flashes[0][1] for _, flashes in responses],
+            ["Email confirmation sent",
+             "A confirmation email was sent recently, please check your inbox",
+             "Email confirmation sent",
+             "A confirmation email was sent recently, please check your inbox"]
+        )
+        self.assertEqual(
+            [recipients for recipients, _ in self.server.messages],
+            [["office@example.com"], ["manager@example.com"]]
+        )
+        links = [
+            message.get_payload()[0].get_payload()[0].get_payload(decode=True).decode()
+            for _, message in self.server.messages
+        ]
+        self.assertIn("http://localhost/auth/confirm/", links[0])
+        self.assertNotEqual(links[0].split("/confirm/")[1], links[1].split("/confirm/")[1])
+        self.assertEqual(OutboxEmail.query.filter_by(status=OutboxStatus.SENT).count(), 2)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,122 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.extensions import db
+from app.models import Expense, ExpenseType, Job, JobType, Payment, PaymentStatus
+from app.tests.base import DatabaseTestCase, capture_statements, make_client
+
+# A plain "SCAN payments" (no USING INDEX) is a full table scan
+FULL_SCAN = re.compile(r'^SCAN (payments|expenses)$')
+
+
+class TestQueryPlans(DatabaseTestCase):
+    """EXPLAIN every payments/expenses query issued by app.tasks and app.views.clients"""
+
+    config = {'LOGIN_DISABLED': True, 'BUSINESS_NOTIFICATIONS_ENABLED': True}
+
+    def setUp(self):
+        super().setUp()
+        self.seed()
+
+    def seed(self):
+        job_type = JobType(name="House Cleaning")
+        client = make_client()
+        db.session.add_all([job_type, client])
+        db.session.flush()
+
+        now = datetime.utcnow()
+        for days_ago in range(0, 60, 3):
+            started = now - timedelta(days=days_ago)
+            job = Job(
+                job_type_id=job_type.id,
+                client_id=client.id,
+                total_amount=100.0,
+                time_started=started,
+                time_ended=started + timedelta(hours=2),
+                description=f"Job {days_ago}"
+            )
+            db.session.add(job)
+            db.session.flush()
+            status = PaymentStatus.PAID if days_ago % 2 else PaymentStatus.UNPAID
+            db.session.add(Payment(
+                job_id=job.id,
+                amount=100.0,
+                payment_date=started,
+                due_date=started + timedelta(days=14),
+                payment_status=status
+            ))
+            db.session.add(Expense(job_id=job.id, expense_type=ExpenseType.SUPPLIES, amount=10.0))
+        db.session.commit()
+        self.client_id = client.id
+
+    def assert_indexed(self, func):
+        """Run func and check every payments/expenses/mail_outbox SELECT it issued avoids a full scan"""
+        with capture_statements() as captured:
+            func()
+
+        statements = [
+            (statement, parameters) for statement, parameters in captured
+            if statement.lstrip().upper().startswith('SELECT')
+            and re.search(r'\b(payments|expenses|mail_outbox)\b', statement)
+        ]
+        self.assertTrue(statements, "No payments/expenses/mail_outbox queries were captured")
+        indexes = set()
+        for statement, parameters in statements:
+            plan = [row[-1] for row in db.session.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )]
+            for step in plan:
+                self.assertIsNone(FULL_SCAN.match(step), f"Full scan in plan {plan} for:\n{statement}")
+            indexes.update(re.findall(r'INDEX (ix_\w+)', ' '.join(plan)))
+        return indexes
+
+    @patch('app.tasks.queue_email')
+    def test_task_queries_use_indexes(self, mock_queue_email):
+        from app.tasks import (
+            check_job_amounts, get_monthly_report, send_monthly_reminder_for_unpaid_jobs,
+            send_weekly_reminder_for_unpaid_jobs
+        )
+
+        self.assertIn('ix_payments_status_due_date', self.assert_indexed(send_weekly_reminder_for_unpaid_jobs))
+        self.assertIn('ix_payments_status_due_date', self.assert_indexed(send_monthly_reminder_for_unpaid_jobs))
+        self.assertIn('ix_payments_status_due_date', self.assert_indexed(get_monthly_report))
+
+        indexes = self.assert_indexed(check_job_amounts)
+        self.assertIn('ix_payments_job_id_status', indexes)
+        self.assertIn('ix_expenses_job_id_amount', indexes)
+
+        from app.outbox import drain_outbox
+        self.assertIn('ix_mail_outbox_status_next_attempt_at', self.assert_indexed(drain_outbox))
+
+    def test_client_view_queries_use_indexes(self):
+        from app.views.clients import get_invoice_data
+
+        def build_invoices():
+            for query_string in ('', '?unpaid_only=true'):
+                for period in (None, 'current_month', 'last_month', 'all_unpaid'):
+                    with self.app.test_request_context(f'/clients/generate_invoice{query_string}'):
+                        get_invoice_data(self.client_id, period)
+
+        self.assertIn('ix_payments_job_id_status', self.assert_indexed(build_invoices))
+
+    def test_edit_client_queries_use_indexes(self):
+        def view_client():
+            response = self.app.test_client().get(f'/clients/edit_client/{self.client_id}')
+            self.assertEqual(response.status_code, 200)
+
+        # edit_client reads the denormalized Job amounts, so only the flush
+        # listeners touch payments; run a payment change alongside it
+        def view_client_and_pay():
+            view_client()
+            payment = Payment.query.filter_by(payment_status=PaymentStatus.UNPAID).first()
+            payment.payment_status = PaymentStatus.PAID
+            db.session.commit()
+
+        indexes = self.assert_indexed(view_client_and_pay)
+        self.assertIn('ix_payments_job_id_status', indexes)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
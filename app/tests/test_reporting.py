@@ -0,0 +1,162 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.extensions import db
+from app.models import Expense, ExpenseType, Job, JobType, Payment, PaymentStatus, ReportSnapshot
+from app.tests.base import DatabaseTestCase, capture_statements, make_client
+
+
+class TestMonthlyReport(DatabaseTestCase):
+    """The monthly report must cost the same number of queries however many jobs ran that month"""
+
+    config = {'BUSINESS_NOTIFICATIONS_ENABLED': True}
+
+    def setUp(self):
+        super().setUp()
+        self.job_type = JobType(name="House Cleaning")
+        db.session.add(self.job_type)
+        db.session.commit()
+        self.statements = []
+
+    def add_jobs(self, client_name, job_count):
+        client = make_client(client_name)
+        db.session.add(client)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        for index in range(job_count):
+            started = now - timedelta(days=index * 2)
+            job = Job(
+                job_type_id=self.job_type.id,
+                client_id=client.id,
+                total_amount=100.0 + index,
+                time_started=started,
+                time_ended=started + timedelta(hours=2),
+                description=f"Job {index}"
+            )
+            db.session.add(job)
+            db.session.flush()
+            db.session.add(Expense(job_id=job.id, expense_type=ExpenseType.SUPPLIES, amount=10.0))
+            db.session.add(Payment(
+                job_id=job.id,
+                amount=100.0 + index,
+                payment_date=started,
+                due_date=started + timedelta(days=14),
+                payment_status=PaymentStatus.PAID if index % 3 == 0 else PaymentStatus.UNPAID
+            ))
+        db.session.commit()
+
+    @patch('app.tasks.queue_email')
+    def send_report(self, mock_queue_email):
+        from app.tasks import get_monthly_report
+
+        db.session.expire_all()
+        with capture_statements() as statements:
+            get_monthly_report()
+        self.statements = [statement for statement, _ in statements]
+        return mock_queue_email.call_args.args[0].body, len(self.statements)
+
+    def test_query_count_is_independent_of_job_count(self):
+        self.add_jobs("Small Client", 1)
+        # The first run also stores last month's snapshot
+        self.send_report()
+        _, small = self.send_report()
+        self.add_jobs("Large Client", 60)
+        _, large = self.send_report()
+
+        self.assertEqual(small, large, "\n\n".join(self.statements))
+        # Month rollup, cash received, unpaid totals, top clients and last month's snapshot
+        self.assertEqual(large, 5, "\n\n".join(self.statements))
+
+    def test_report_snapshots_the_month_that_just_closed(self):
+        from app.reporting import SNAPSHOT_COLUMNS
+        from app.stats import get_month_figures, previous_month
+        from app.views.main import get_dashboard_context
+
+        self.add_jobs("Client", 40)
+        today = datetime.utcnow()
+        last_year, last_month = previous_month(today)
+        live = get_month_figures(last_year, last_month)
+
+        self.send_report()
+        snapshot, = ReportSnapshot.query.all()
+        self.assertEqual((snapshot.year, snapshot.month), (last_year, last_month))
+        for column in SNAPSHOT_COLUMNS:
+            self.assertAlmostEqual(getattr(snapshot, column), live[column], msg=column)
+
+        # Later reports and the dashboard read the closed month back from its snapshot
+        snapshot.total_amount, snapshot.total_expenses, snapshot.job_count = 1000.0, 100.0, 8
+        db.session.commit()
+        body, _ = self.send_report()
+        self.assertIn("(£1000.00 in ", body)
+        self.assertIn("(8 in ", body)
+        self.assertEqual(ReportSnapshot.query.count(), 1)
+
+        context = get_dashboard_context(today)
+        self.assertEqual(context['jobs_trend'], round((context['total_jobs_month'] - 8) / 8 * 100))
+
+    def test_dashboard_does_not_write_snapshots(self):
+        from app.views.main import get_dashboard_context
+
+        self.add_jobs("Client", 40)
+        context = get_dashboard_context(datetime.utcnow())
+
+        self.assertEqual(ReportSnapshot.query.count(), 0)
+        self.assertTrue(context['total_jobs_month'])
+
+    def test_backfill_matches_the_rollup(self):
+        from app.reporting import SNAPSHOT_COLUMNS, backfill_report_snapshots, iter_months
+        from app.stats import get_month_figures
+
+        self.add_jobs("Client", 120)
+        first = Job.query.order_by(Job.time_started).first().time_started
+        today = datetime.utcnow()
+        months = list(iter_months((first.year, first.month), (today.year, today.month)))
+
+        self.assertEqual(backfill_report_snapshots(months[0], months[-1], batch_size=2), len(months))
+        self.assertEqual(backfill_report_snapshots(months[0], months[-1], batch_size=2), 0)
+        for snapshot in ReportSnapshot.query.all():
+            figures = get_month_figures(snapshot.year, snapshot.month)
+            for column in SNAPSHOT_COLUMNS:
+                self.assertAlmostEqual(getattr(snapshot, column), figures[column], msg=column)
+        self.assertEqual(
+            sorted((snapshot.year, snapshot.month) for snapshot in ReportSnapshot.query.all()), months
+        )
+
+    def test_figures_match_the_raw_tables(self):
+        from app.stats import get_report_figures
+
+        for index in range(7):
+            self.add_jobs(f"Client {index}", index * 5 + 1)
+
+        today = datetime.utcnow()
+        first_day = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        jobs = [job for job in Job.query.all() if job.time_started >= first_day]
+        payments = Payment.query.all()
+        unpaid = [payment for payment in payments if payment.payment_status == PaymentStatus.UNPAID]
+        overdue = [payment for payment in unpaid if payment.due_date < today]
+        revenue = {}
+        for job in jobs:
+            revenue[job.client.name] = revenue.get(job.client.name, 0) + job.total_amount
+
+        figures = get_report_figures(today)
+        self.assertEqual(figures['job_count'], len(jobs))
+        self.assertAlmostEqual(figures['total_amount'], sum(job.total_amount for job in jobs))
+        self.assertAlmostEqual(figures['total_expenses'], sum(job.total_expenses for job in jobs))
+        self.assertAlmostEqual(figures['cash_received'], sum(
+            payment.amount for payment in payments
+            if payment.payment_status == PaymentStatus.PAID and payment.payment_date >= first_day
+        ))
+        self.assertAlmostEqual(figures['outstanding'], sum(payment.amount for payment in unpaid))
+        self.assertEqual(figures['unpaid_count'], len(unpaid))
+        self.assertAlmostEqual(figures['overdue'], sum(payment.amount for payment in overdue))
+        self.assertEqual(figures['overdue_count'], len(overdue))
+        self.assertEqual(
+            [name for name, _ in figures['top_clients']],
+            sorted(revenue, key=revenue.get, reverse=True)[:5]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,57 @@
+import unittest
+
+from app import create_app
+from app.extensions import apply_worker_profile, celery, make_celery
+
+QUEUES = {'mail', 'reporting', 'invoices'}
+
+
+class TestTaskRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+
+    def queue_of(self, celery_app, task_name):
+        return celery_app.amqp.router.route({}, task_name)['queue'].name
+
+    def test_every_task_has_a_dedicated_queue(self):
+        task_names = [name for name in celery.tasks if name.startswith('app.tasks.')]
+
+        self.assertTrue(task_names)
+        for name in task_names:
+            self.assertIn(self.queue_of(celery, name), QUEUES, name)
+
+    def test_mail_does_not_share_a_queue_with_reports_or_invoices(self):
+        self.assertEqual(self.queue_of(celery, 'app.tasks.send_confirmation_email'), 'mail')
+        self.assertEqual(self.queue_of(celery, 'app.tasks.deliver_outbox'), 'mail')
+        self.assertEqual(self.queue_of(celery, 'app.tasks.get_monthly_report'), 'reporting')
+        self.assertEqual(self.queue_of(celery, 'app.tasks.send_client_reminder'), 'reporting')
+        self.assertEqual(self.queue_of(celery, 'app.tasks.post_invoice'), 'invoices')
+
+    def test_worker_profiles(self):
+        for name, profile in self.app.config['CELERY_WORKER_PROFILES'].items():
+            with self.subTest(profile=name):
+                worker = make_celery(self.app)
+                apply_worker_profile(worker, self.app, name)
+
+                self.assertEqual(sorted(worker.amqp.queues.consume_from), sorted(profile['queues']))
+                self.assertEqual(worker.conf.worker_concurrency, profile['concurrency'])
+                self.assertEqual(worker.conf.worker_prefetch_multiplier, profile['prefetch_multiplier'])
+                self.assertEqual(worker.conf.worker_max_tasks_per_child, profile['max_tasks_per_child'])
+                self.assertEqual(worker.tasks['app.tasks.get_monthly_report'].acks_late, profile['acks_late'])
+                # Every task that queues an email runs at most once, even if its worker dies
+                self.assertFalse(worker.tasks['app.tasks.send_confirmation_email'].acks_late)
+                self.assertFalse(worker.tasks['app.tasks.send_client_reminder_digest'].acks_late)
+                self.assertEqual(worker.tasks['app.tasks.deliver_outbox'].ignore_result, profile['ignore_result'])
+                # Polled and chord header results are stored whatever the profile
+                self.assertFalse(worker.tasks['app.tasks.post_invoice'].ignore_result)
+                self.assertFalse(worker.tasks['app.tasks.send_client_reminder'].ignore_result)
+                self.assertEqual(self.queue_of(worker, 'app.tasks.send_confirmation_email'), 'mail')
+
+    def test_unknown_profile_is_rejected(self):
+        with self.assertRaises(ValueError):
+            apply_worker_profile(make_celery(self.app), self.app, 'everything')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
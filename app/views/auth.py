@@ -5,8 +5,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import User, db
 from app.views import auth_bp
-from flask_mail import Message
-from app import mail
+from app.extensions import confirmation_throttle
+from app.tasks import send_confirmation_email
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -74,8 +74,10 @@ def email_confirmation():
         return redirect(url_for('main.dashboard'))
 
     try:
-        send_confirmation_email(current_user.email)
-        flash('Email confirmation sent', 'success')
+        if request_confirmation_email(current_user):
+            flash('Email confirmation sent', 'success')
+        else:
+            flash('A confirmation email was sent recently, please check your inbox', 'info')
     except Exception as e:
         flash('Email confirmation failed', 'error')
         print(f"ERROR: {e}")
@@ -116,127 +118,26 @@ def generate_token(user_email):
     return serializer.dumps(user_email, salt='email-confirmation')
 
 
-def send_confirmation_email(user_email):
-    token = generate_token(user_email)
-    confirm_url = url_for('auth.confirm_email', token=token, _external=True)
-    
-    subject = "Confirm your email - MaidVally"
-    
-    html_body = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Confirm Your Email - MaidVally</title>
-    </head>
-    <body style="margin: 0; padding: 0; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f8f9fa;">
-        <div style="max-width: 600px; margin: 0 auto; background-color: #ffffff; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-            
-            <!-- Header -->
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 40px 30px; text-align: center;">
-                <h1 style="color: white; margin: 0; font-size: 28px; font-weight: 300;">
-                    🏠 MaidVally
-                </h1>
-                <p style="color: rgba(255,255,255,0.9); margin: 10px 0 0 0; font-size: 16px;">
-                    Professional Cleaning Services
-                </p>
-            </div>
-            
-            <!-- Main Content -->
-            <div style="padding: 40px 30px;">
-                <h2 style="color: #2c3e50; margin: 0 0 20px 0; font-size: 24px; font-weight: 400;">
-                    Welcome aboard! 🎉
-                </h2>
-                
-                <p style="color: #555; line-height: 1.6; margin: 0 0 25px 0; font-size: 16px;">
-                    Thank you for joining MaidVally! We're excited to help you connect with trusted cleaning professionals in your area.
-                </p>
-                
-                <p style="color: #555; line-height: 1.6; margin: 0 0 30px 0; font-size: 16px;">
-                    To complete your registration and start booking services, please confirm your email address:
-                </p>
-                
-                <!-- Call to Action Button -->
-                <div style="text-align: center; margin: 35px 0;">
-                    <a href="{confirm_url}" 
-                       style="background: linear-gradient(135deg, #28a745, #20c997); 
-                              color: white; 
-                              text-decoration: none; 
-                              padding: 16px 32px; 
-                              border-radius: 8px; 
-                              font-size: 16px; 
-                              font-weight: 600; 
-                              display: inline-block; 
-                              box-shadow: 0 4px 15px rgba(40, 167, 69, 0.3);
-                              transition: all 0.3s ease;">
-                        ✅ Confirm My Email Address
-                    </a>
-                </div>
-                
-                <!-- Alternative Link -->
-                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 6px; margin: 30px 0; border-left: 4px solid #667eea;">
-                    <p style="margin: 0 0 10px 0; color: #666; font-size: 14px; font-weight: 600;">
-                        Can't click the button? Copy and paste this link:
-                    </p>
-                    <p style="margin: 0; word-break: break-all; color: #667eea; font-size: 13px; font-family: monospace;">
-                        {confirm_url}
-                    </p>
-                </div>
-                
-                <!-- What's Next Section -->
-                <div style="background: linear-gradient(135deg, #e3f2fd, #f3e5f5); padding: 25px; border-radius: 8px; margin: 30px 0;">
-                    <h3 style="color: #2c3e50; margin: 0 0 15px 0; font-size: 18px;">
-                        🚀 What's next?
-                    </h3>
-                    <ul style="color: #555; margin: 0; padding-left: 20px; line-height: 1.8;">
-                        <li>Complete your profile setup</li>
-                        <li>Browse your past cleaning jobs</li>
-                        <li>Schedule your cleaning service</li>
-                        <li>Enjoy serving your customers ✨</li>
-                    </ul>
-                </div>
-                
-                <!-- Security Notice -->
-                <div style="background-color: #fff3cd; border: 1px solid #ffeaa7; color: #856404; padding: 15px; border-radius: 6px; margin: 25px 0;">
-                    <p style="margin: 0; font-size: 14px;">
-                        <strong>⏰ Important:</strong> This confirmation link will expire in 1 hour for your security.
-                    </p>
-                </div>
-            </div>
-            
-            <!-- Footer -->
-            <div style="background-color: #2c3e50; padding: 30px; text-align: center;">
-                <p style="color: #bdc3c7; margin: 0 0 15px 0; font-size: 16px; font-weight: 500;">
-                    Here to help!
-                </p>
-                
-                <hr style="border: none; border-top: 1px solid #34495e; margin: 20px 0;">
-                
-                <p style="color: #95a5a6; margin: 0; font-size: 12px; line-height: 1.4;">
-                    If you didn't create an account with MaidVally, please ignore this email.<br>
-                    This email was sent from an automated system, please do not reply.
-                </p>
-                <hr style="border: none; border-top: 1px solid #34495e; margin: 20px 0;">
-                </p>
-                
-                <p style="color: #7f8c8d; margin: 15px 0 0 0; font-size: 12px;">
-                    © 2025 MaidVally. All rights reserved.
-                </p>
-            </div>
-        </div>
-    </body>
-    </html>
+def request_confirmation_email(user):
     """
-    
-    message = Message(
-        subject=subject,
-        recipients=[user_email],
-        html=html_body,
-        sender=current_app.config['MAIL_USERNAME']
-    )
-
-    mail.send(message)
+    Have a worker send user a confirmation email, unless one was requested
+    in the last CONFIRMATION_THROTTLE_CACHE_TTL seconds.
+
+    Returns:
+        bool: True when an email was requested, False when throttled.
+    """
+    key = f'user:{user.id}'
+    if not confirmation_throttle.add(key, True):
+        return False
+
+    confirm_url = url_for('auth.confirm_email', token=generate_token(user.email), _external=True)
+    try:
+        send_confirmation_email.delay(user.email, confirm_url)
+    except Exception:
+        # Nothing was queued, so let the user ask again straight away
+        confirmation_throttle.delete(key)
+        raise
+    return True
 
 class SignatureExpired(Exception):
     pass
@@ -4,9 +4,15 @@ from flask import render_template, redirect, url_for, request
 from flask_login import login_required
 from app.forms.clients import AddClientForm, EditClientForm
 from app.models import Client, db, ClientTypeEnum, ClientStatusEnum, Job
-from flask import flash, jsonify
+from flask import flash, jsonify, abort, current_app, send_file
 from datetime import datetime, timedelta
-import requests
+import os
+from app.pagination import keyset_paginate, InvalidCursor
+from app.stats import month_bounds
+from app.extensions import celery
+from app.tasks import post_invoice, render_invoice
+from app.invoice_pdf import DIGEST_PATTERN, invoice_digest, invoice_pdf_path
+from sqlalchemy import and_, case, func
 
 
 @clients_bp.route('/clients', methods=['GET', 'POST'])
@@ -23,7 +29,8 @@ def clients():
             address=form.address.data,
             city=form.city.data,
             state=form.state.data,
-            post_code=form.post_code.data
+            post_code=form.post_code.data,
+            email=form.email.data or None
         )
         db.session.add(new_client)
         db.session.commit()
@@ -31,15 +38,70 @@ def clients():
         flash('Client added successfully!', 'success')
         return redirect(url_for('clients.clients'))
     
-    clients = Client.query.all()  # Fetch all clients
+    sort = request.args.get('sort', 'name')
+    min_outstanding = request.args.get('min_outstanding', type=float)
+    page = get_clients_page(sort, min_outstanding)
     return render_template(
         'clients/clients.html',
-        clients=clients,
+        clients=page.items,
+        page=page,
+        sort=sort,
+        min_outstanding=min_outstanding,
+        per_page=request.args.get('per_page', type=int),
         form=form,
         ClientTypeEnum=ClientTypeEnum,
         ClientStatusEnum=ClientStatusEnum
     )
 
+
+def get_clients_page(sort='name', min_outstanding=None):
+    """
+    Get one page of clients with their billed, paid and outstanding totals and last job date.
+
+    The totals come from a single outer join onto the client's jobs grouped
+    per client. sort is 'name' (A-Z), 'outstanding' or 'billed' (highest
+    first); every ordering is keyset-paginated with the client id as the
+    tie-breaker.
+    """
+    per_page = request.args.get('per_page', current_app.config['CLIENTS_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['CLIENTS_MAX_PAGE_SIZE']))
+
+    billed = func.coalesce(func.sum(Job.total_amount), 0)
+    outstanding = func.coalesce(
+        func.sum(case((Job.amount_paid < Job.total_amount, Job.total_amount - Job.amount_paid), else_=0)), 0
+    )
+    query = db.session.query(
+        Client,
+        billed.label('billed'),
+        func.coalesce(func.sum(Job.amount_paid), 0).label('paid'),
+        outstanding.label('outstanding'),
+        func.max(Job.time_started).label('last_job')
+    ).outerjoin(Job, Job.client_id == Client.id).group_by(Client.id)
+
+    if min_outstanding is not None:
+        query = query.having(outstanding >= min_outstanding)
+
+    if sort == 'outstanding':
+        columns, key, descending = [outstanding, Client.id], lambda row: (row.outstanding, row.Client.id), True
+    elif sort == 'billed':
+        columns, key, descending = [billed, Client.id], lambda row: (row.billed, row.Client.id), True
+    else:
+        columns, key, descending = [Client.name, Client.id], lambda row: (row.Client.name, row.Client.id), False
+
+    try:
+        return keyset_paginate(
+            query,
+            columns,
+            key=key,
+            per_page=per_page,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            descending=descending,
+            having=sort in ('outstanding', 'billed')
+        )
+    except InvalidCursor:
+        abort(400)
+
 from datetime import datetime, timedelta
 
 @clients_bp.route('/edit_client/<int:client_id>', methods=['GET', 'POST'])
@@ -56,6 +118,7 @@ def edit_client(client_id):
         form.city.data = client.city
         form.state.data = client.state
         form.post_code.data = client.post_code
+        form.email.data = client.email
             
     if form.validate_on_submit():
         client.name = form.name.data
@@ -65,6 +128,7 @@ def edit_client(client_id):
         client.city = form.city.data
         client.state = form.state.data
         client.post_code = form.post_code.data
+        client.email = form.email.data or None
         db.session.commit()
         flash('Client updated successfully!', 'success')
         
@@ -78,33 +142,8 @@ def edit_client(client_id):
     previous_month = now.replace(day=1) - timedelta(days=1)
     previous_month_name = previous_month.strftime('%B %Y')
     
-    # Calculate statistics properly
-    all_jobs = client.jobs.all()
-    
-    # Current month jobs
-    current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    current_month_jobs = [job for job in all_jobs if job.time_started >= current_month_start]
-    current_month_amount = sum(job.total_amount for job in current_month_jobs)
-    current_month_unpaid = [job for job in current_month_jobs if job.total_paid < job.total_amount]
-    
-    # All outstanding jobs
-    outstanding_jobs = [job for job in all_jobs if job.total_paid < job.total_amount]
-    outstanding_amount = sum(job.total_amount - job.total_paid for job in outstanding_jobs)
-    
-    # Total stats
-    total_amount = sum(job.total_amount for job in all_jobs)
-    total_paid = sum(job.total_paid for job in all_jobs)
-    
-    stats = {
-        'total_jobs': len(all_jobs),
-        'total_amount': total_amount,
-        'total_paid': total_paid,
-        'outstanding_amount': outstanding_amount,
-        'current_month_jobs': len(current_month_jobs),
-        'current_month_amount': current_month_amount,
-        'current_month_unpaid': len(current_month_unpaid),
-        'outstanding_jobs_count': len(outstanding_jobs)
-    }
+    # Calculate statistics in one grouped query
+    stats = get_client_stats(client.id, now)
     
     return render_template('clients/edit_client.html', 
         form=form, 
@@ -115,6 +154,32 @@ def edit_client(client_id):
         stats=stats
     )
 
+def get_client_stats(client_id, now):
+    """
+    Get the job totals shown on the edit client page.
+
+    Every figure is a conditional aggregate over the client's jobs, so the
+    page costs one query however long the client's history is.
+    """
+    current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    current_month = Job.time_started >= current_month_start
+    outstanding = Job.amount_paid < Job.total_amount
+
+    row = db.session.query(
+        func.count(Job.id).label('total_jobs'),
+        func.coalesce(func.sum(Job.total_amount), 0).label('total_amount'),
+        func.coalesce(func.sum(Job.amount_paid), 0).label('total_paid'),
+        func.coalesce(func.sum(case((outstanding, Job.total_amount - Job.amount_paid), else_=0)), 0)
+            .label('outstanding_amount'),
+        func.coalesce(func.sum(case((current_month, 1), else_=0)), 0).label('current_month_jobs'),
+        func.coalesce(func.sum(case((current_month, Job.total_amount), else_=0)), 0).label('current_month_amount'),
+        func.coalesce(func.sum(case((and_(current_month, outstanding), 1), else_=0)), 0)
+            .label('current_month_unpaid'),
+        func.coalesce(func.sum(case((outstanding, 1), else_=0)), 0).label('outstanding_jobs_count')
+    ).filter(Job.client_id == client_id).one()
+
+    return row._asdict()
+
 @clients_bp.route('/deactivate/<int:client_id>', methods=['POST'])
 @login_required
 def deactivate_client(client_id):
@@ -144,11 +209,74 @@ def generate_invoice(client_id, period=None):
     # Get invoice data using helper function
     invoice_data = get_invoice_data(client_id, period)
     
-    # Post to your API (add your API endpoint here)
-    api_response = post_invoice_to_api(invoice_data)
+    # Only post if there are jobs to invoice
+    if not invoice_data["jobs"]:
+        return jsonify({"message": "No jobs to invoice"})
+    
+    # Post to the invoice API from a Celery worker and hand back the task id
+    task = post_invoice.delay(invoice_data)
+    return jsonify({
+        "task_id": task.id,
+        "status_url": url_for('clients.invoice_status', task_id=task.id)
+    }), 202
+
+
+@clients_bp.route('/invoice_status/<task_id>')
+@login_required
+def invoice_status(task_id):
+    """Report the state of an invoice task, with the API response once it has finished"""
+    result = celery.AsyncResult(task_id)
+    body = {"task_id": task_id, "state": result.state}
+    
+    if result.successful():
+        body["result"] = result.result
+    elif result.failed():
+        body["error"] = str(result.result)
+    else:
+        return jsonify(body), 202
+    return jsonify(body)
+
+
+@clients_bp.route('/invoice_pdf/<int:client_id>')
+@clients_bp.route('/invoice_pdf/<int:client_id>/<period>')
+@login_required
+def invoice_pdf(client_id, period=None):
+    """Serve a locally rendered PDF invoice, rendering it in a Celery worker if it is not cached yet"""
+    invoice_data = get_invoice_data(client_id, period)
+    if not invoice_data["jobs"]:
+        return jsonify({"message": "No jobs to invoice"})
+    
+    digest = invoice_digest(invoice_data)
+    download_url = url_for('clients.download_invoice_pdf', digest=digest)
+    if os.path.exists(invoice_pdf_path(digest)):
+        return redirect(download_url)
     
-    # Return the invoice data or API response
-    return jsonify(api_response)
+    task = render_invoice.delay(invoice_data)
+    return jsonify({
+        "task_id": task.id,
+        "status_url": url_for('clients.invoice_status', task_id=task.id),
+        "download_url": download_url
+    }), 202
+
+
+@clients_bp.route('/invoice_pdf/download/<digest>')
+@login_required
+def download_invoice_pdf(digest):
+    """Stream a cached PDF invoice, with range and conditional request support"""
+    if not DIGEST_PATTERN.match(digest):
+        abort(404)
+    path = invoice_pdf_path(digest)
+    if not os.path.exists(path):
+        abort(404)
+    
+    # With USE_X_SENDFILE set, the front-end server sends the file itself
+    return send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f'invoice-{digest[:12]}.pdf',
+        conditional=True
+    )
 
 
 def get_invoice_data(client_id, period=None):
@@ -172,85 +300,83 @@ def get_invoice_data(client_id, period=None):
     unpaid_only_param = request.args.get('unpaid_only')
     unpaid_only = unpaid_only_param in ['true', 'True', '1', 'yes', 'on'] if unpaid_only_param else False
 
-    # Helper function to check if job should be included
-    def should_include_job(job):
-        if unpaid_only:
-            payments = Payment.query.filter_by(job_id=job.id).first()
-            return payments is None or payments.payment_status == PaymentStatus.UNPAID
-        return True
-
-    # Get jobs based on period
+    # Get jobs based on period, leaving out paid jobs in the same query when asked
     if start_date and end_date:
-        jobs = get_jobs_by_date_range(client_id, start_date, end_date)
+        jobs = get_jobs_by_date_range(client_id, start_date, end_date, unpaid_only)
     elif period == 'current_month':
-        jobs = get_jobs_current_month(client_id)
+        jobs = get_jobs_current_month(client_id, unpaid_only)
     elif period == 'last_month':
-        jobs = get_jobs_last_month(client_id)
+        jobs = get_jobs_last_month(client_id, unpaid_only)
     elif period == 'all_unpaid' or unpaid_only:
         jobs = get_unpaid_jobs(client_id)
     else:
         jobs = get_all_jobs(client_id)
     
-    # Filter jobs and build response
-    for job in jobs:
-        if should_include_job(job):
-            job_details = build_job_details(job)
-            api_json["jobs"].append(job_details)
+    # Build response
+    api_json["jobs"] = [build_job_details(job) for job in jobs]
     
     return api_json
 
 
-def get_jobs_by_date_range(client_id, start_date, end_date):
-    """Get jobs within a specific date range"""
+def get_jobs_by_date_range(client_id, start_date, end_date, unpaid_only=False):
+    """Get jobs within a specific date range (end date inclusive)"""
     from datetime import datetime
     start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-    end_datetime = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+    end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
     
-    return Job.query.filter_by(client_id=client_id).filter(
-        Job.time_started.between(start_datetime, end_datetime)
-    ).all()
+    return get_jobs_between(client_id, start_datetime, end_datetime, unpaid_only)
 
 
-def get_jobs_current_month(client_id):
+def get_jobs_current_month(client_id, unpaid_only=False):
     """Get jobs from current month"""
     from datetime import datetime
     now = datetime.now()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    return Job.query.filter_by(client_id=client_id).filter(
-        Job.time_started >= month_start
-    ).all()
+    return get_jobs_between(client_id, *month_bounds(now.year, now.month), unpaid_only=unpaid_only)
 
 
-def get_jobs_last_month(client_id):
+def get_jobs_last_month(client_id, unpaid_only=False):
     """Get jobs from last month"""
     from datetime import datetime, timedelta
-    now = datetime.now()
-    last_month_end = now.replace(day=1) - timedelta(days=1)
-    last_month_start = last_month_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    last_month_end = last_month_end.replace(hour=23, minute=59, second=59, microsecond=999999)
+    last_month = datetime.now().replace(day=1) - timedelta(days=1)
     
-    return Job.query.filter_by(client_id=client_id).filter(
-        Job.time_started.between(last_month_start, last_month_end)
+    return get_jobs_between(client_id, *month_bounds(last_month.year, last_month.month), unpaid_only=unpaid_only)
+
+
+def get_jobs_between(client_id, start, end, unpaid_only=False):
+    """Get jobs for a client started in the half-open range [start, end)"""
+    return get_invoice_jobs_query(client_id, unpaid_only).filter(
+        Job.time_started >= start,
+        Job.time_started < end
     ).all()
 
 
 def get_unpaid_jobs(client_id):
     """Get all unpaid jobs for client"""
-    all_jobs = Job.query.filter_by(client_id=client_id).all()
-    unpaid_jobs = []
-    
-    for job in all_jobs:
-        payments = Payment.query.filter_by(job_id=job.id).first()
-        if payments is None or payments.payment_status == PaymentStatus.UNPAID:
-            unpaid_jobs.append(job)
-    
-    return unpaid_jobs
+    return get_invoice_jobs_query(client_id, unpaid_only=True).all()
 
 
 def get_all_jobs(client_id):
     """Get all jobs for client"""
-    return Job.query.filter_by(client_id=client_id).all()
+    return get_invoice_jobs_query(client_id).all()
+
+
+def get_invoice_jobs_query(client_id, unpaid_only=False):
+    """
+    Get the query for a client's invoice jobs in date order with their job type loaded.
+
+    With unpaid_only, jobs that have a PAID payment are excluded by a
+    NOT EXISTS anti-join rather than checked one job at a time.
+    """
+    query = Job.query.filter(Job.client_id == client_id).options(db.joinedload(Job.job_type)).order_by(
+        Job.time_started, Job.id
+    )
+    if unpaid_only:
+        query = query.filter(~db.exists().where(
+            Payment.job_id == Job.id,
+            Payment.payment_status == PaymentStatus.PAID
+        ))
+    return query
 
 
 def build_job_details(job):
@@ -264,22 +390,3 @@ def build_job_details(job):
         "location": job.location,
         "description": job.description
     }
-
-
-def post_invoice_to_api(invoice_data):
-    """Post invoice data to external API"""
-    
-    # Only post if there are jobs to invoice
-    if invoice_data["jobs"]:
-        try:
-            api_url = "https://your-lambda-api.com/generate-invoice"
-
-            response = requests.post(api_url, json=invoice_data, timeout=30)
-            response.raise_for_status()
-            
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
-    else:
-        return {"message": "No jobs to invoice"}
\ No newline at end of file
@@ -1,6 +1,9 @@
 from app.forms.jobs import AddJobForm
+from app.extensions import form_choices
 from app.models import Job, db, Payment, PaymentStatus
-from flask import render_template, redirect, url_for, flash, request
+from app.pagination import keyset_paginate, InvalidCursor
+from app.search import search_jobs
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort, current_app
 from flask_login import login_required
 from app.views import jobs_bp
 from datetime import datetime
@@ -35,38 +38,115 @@ def jobs():
                 for error in errors:
                     flash(f"{field}: {error}", 'danger')
     
-    # Get all jobs with related data (like fetchJobs in React)
-    jobs = Job.query.options(
-        db.joinedload(Job.client),
-        db.joinedload(Job.job_type)
-    ).order_by(Job.time_started.desc()).all()
-    
-    # Get search term from URL params
+    # Get search term and page cursor from URL params
     search_term = request.args.get('search', '')
-    
-    # Filter jobs if search term exists
-    if search_term:
-        jobs = [job for job in jobs if 
-            search_term.lower() in job.client.name.lower() or
-            search_term.lower() in job.job_type.name.lower() or
-            (job.description and search_term.lower() in job.description.lower()) or
-            (job.location and search_term.lower() in job.location.lower())
-        ]
+    page = get_jobs_page(search_term)
     
     return render_template('jobs/jobs.html', 
         form=form, 
-        jobs=jobs, 
+        jobs=page.items, 
+        page=page,
+        per_page=request.args.get('per_page', type=int),
         search_term=search_term)
 
+@jobs_bp.route('/jobs.json')
+@login_required
+def jobs_json():
+    """JSON variant of the jobs listing, paginated the same way"""
+    page = get_jobs_page(request.args.get('search', ''))
+    return jsonify({
+        'jobs': [serialize_job(job) for job in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
+
+@jobs_bp.route('/client_typeahead.json')
+@login_required
+def client_typeahead():
+    """Active clients matching the typed prefix, for the add job form"""
+    limit = min(
+        request.args.get('limit', current_app.config['CLIENT_TYPEAHEAD_LIMIT'], type=int),
+        current_app.config['JOBS_MAX_PAGE_SIZE']
+    )
+    matches = form_choices.get().search_clients(request.args.get('q', ''), limit=max(1, limit))
+    return jsonify({
+        'clients': [{'id': client_id, 'name': name} for client_id, name in matches]
+    })
+
+
+def get_jobs_query():
+    """Get the jobs listing query with client and job type loaded"""
+    return Job.query.join(Job.client).join(Job.job_type).options(
+        db.contains_eager(Job.client),
+        db.contains_eager(Job.job_type)
+    )
+
+
+def get_jobs_page(search_term=''):
+    """
+    Get one page of the jobs listing.
+
+    Without a search term jobs are listed newest first, keyed on
+    (time_started, id); with one they are ranked by relevance, keyed on
+    (relevance, id).
+    """
+    per_page = request.args.get('per_page', current_app.config['JOBS_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['JOBS_MAX_PAGE_SIZE']))
+    after = request.args.get('after')
+    before = request.args.get('before')
+
+    try:
+        if not search_term:
+            return keyset_paginate(
+                get_jobs_query(),
+                [Job.time_started, Job.id],
+                key=lambda job: (job.time_started, job.id),
+                per_page=per_page,
+                after=after,
+                before=before
+            )
+
+        query, relevance = search_jobs(get_jobs_query(), search_term)
+        page = keyset_paginate(
+            query.add_columns(relevance.label('relevance')),
+            [relevance, Job.id],
+            key=lambda row: (row[1], row[0].id),
+            per_page=per_page,
+            after=after,
+            before=before
+        )
+        page.items = [job for job, _ in page.items]
+        return page
+    except InvalidCursor:
+        abort(400)
+
+
+def serialize_job(job):
+    """Build the JSON representation of a job in the listing"""
+    return {
+        "job_id": job.id,
+        "client": job.client.name,
+        "job_type": job.job_type.name,
+        "total_amount": job.total_amount,
+        "amount_paid": job.amount_paid,
+        "paid": job.amount_paid >= job.total_amount,
+        "time_started": job.time_started.isoformat(),
+        "time_ended": job.time_ended.isoformat(),
+        "location": job.location,
+        "description": job.description
+    }
+
 # Fixed route with payment_method parameter
 @jobs_bp.route('/toggle_payment/<int:job_id>/', methods=['POST'])
 @login_required
 def toggle_payment(job_id):
     job = Job.query.get_or_404(job_id)
 
-    if job.total_paid >= job.total_amount:
-        # Mark as unpaid - remove all payments
-        Payment.query.filter_by(job_id=job_id).delete()
+    if job.amount_paid >= job.total_amount:
+        # Mark as unpaid - remove all payments through the ORM so the
+        # monthly_stats rollup and Job.amount_paid see the deletes
+        for payment in job.payments:
+            db.session.delete(payment)
         flash('Job marked as unpaid!', 'warning')
     else:
         # Mark as paid - create a payment record with specified method
@@ -86,7 +166,7 @@ def toggle_payment(job_id):
 @login_required
 def delete_job(job_id):
     job = Job.query.get_or_404(job_id)
-    if job.total_paid > 0:
+    if job.amount_paid > 0:
         flash('Cannot delete job with payments', 'danger')
         return redirect(url_for('jobs.jobs'))
     db.session.delete(job)
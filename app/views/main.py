@@ -1,39 +1,47 @@
-from flask import render_template, redirect, url_for
+from flask import render_template, redirect, url_for, jsonify
 from flask_login import login_required, current_user
 from app.views import main_bp
 from app.models import *
 from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app.stats import get_month_stats
+from app.extensions import dashboard_cache
+from app.reporting import get_closed_month_figures
 
 
 def get_jobs_for_month(month, year):
-    """Get all jobs for a specific month and year"""
-    all_jobs = Job.query.all()
-    month_jobs = []
-    for job in all_jobs:
-        if job.time_started.month == month and job.time_started.year == year:
-            month_jobs.append(job)
-    return month_jobs
+    """Get the rolled-up job figures for a specific month and year"""
+    return get_month_stats(year, month)
 
-def calculate_completion_rate(jobs):
-    """Calculate completion rate for a list of jobs"""
-    if not jobs:
+def calculate_completion_rate(summary):
+    """Calculate completion rate for a job summary"""
+    if not summary['job_count']:
         return 0
-    completed = [job for job in jobs if job.time_ended is not None]
-    return round((len(completed) / len(jobs)) * 100)
+    return round((summary['completed_count'] / summary['job_count']) * 100)
 
-def calculate_payment_rate(jobs):
-    """Calculate payment rate for a list of jobs"""
-    if not jobs:
+def calculate_payment_rate(summary):
+    """Calculate payment rate for a job summary"""
+    if not summary['job_count']:
         return 0
-    paid = [job for job in jobs if job.total_paid > 0]
-    return round((len(paid) / len(jobs)) * 100)
+    return round((summary['paid_count'] / summary['job_count']) * 100)
 
-def calculate_avg_job_value(jobs):
-    """Calculate average job value for a list of jobs"""
-    if not jobs:
+def calculate_avg_job_value(summary):
+    """Calculate average job value for a job summary"""
+    if not summary['job_count']:
         return 0
-    total = sum(job.total_amount for job in jobs)
-    return total / len(jobs)
+    return summary['total_amount'] / summary['job_count']
+
+def get_business_totals():
+    """Get total profit and total paid across all jobs in one SELECT"""
+    total_amount = select(func.coalesce(func.sum(Job.total_amount), 0)).scalar_subquery()
+    total_expenses = select(func.coalesce(func.sum(Expense.amount), 0)).scalar_subquery()
+    total_paid = select(func.coalesce(func.sum(Payment.amount), 0)).scalar_subquery()
+
+    total_amount, total_expenses, total_paid = db.session.query(
+        total_amount, total_expenses, total_paid
+    ).one()
+
+    return total_amount - total_expenses, total_paid
 
 @main_bp.route('/')
 def index():
@@ -43,19 +51,15 @@ def index():
     else:
         return redirect(url_for('auth.login'))
 
-@main_bp.route('/dashboard')
-@login_required
-def dashboard():
+def get_dashboard_context(now):
+    """Compute the dashboard figures for the month containing now"""
     # Count all clients
-    active_clients = len(Client.query.filter_by(status='ACTIVE').all())
+    active_clients = Client.query.filter_by(status='ACTIVE').count()
     
-    # Get all jobs and calculate totals
-    jobs = Job.query.all()
-    total_profit = sum(job.profit for job in jobs)
-    total_paid = sum(job.total_paid for job in jobs)
+    # Calculate totals in the database
+    total_profit, total_paid = get_business_totals()
     
     # Get current month and last month
-    now = datetime.utcnow()
     current_month = now.month
     current_year = now.year
     
@@ -66,9 +70,9 @@ def dashboard():
         last_month = current_month - 1
         last_year = current_year
     
-    # Get jobs for both months
+    # Get job figures for both months, last month's from its snapshot once the report has taken it
     this_month_jobs = get_jobs_for_month(current_month, current_year)
-    last_month_jobs = get_jobs_for_month(last_month, last_year)
+    last_month_jobs = get_closed_month_figures(last_year, last_month, now)
     
     # Calculate completion rates
     completion_rate = calculate_completion_rate(this_month_jobs)
@@ -85,9 +89,9 @@ def dashboard():
         job_value_trend = 0
     
     # Calculate job count trend
-    total_jobs_month = len(this_month_jobs)
-    if len(last_month_jobs) > 0:
-        jobs_trend = round(((len(this_month_jobs) - len(last_month_jobs)) / len(last_month_jobs) * 100))
+    total_jobs_month = this_month_jobs['job_count']
+    if last_month_jobs['job_count'] > 0:
+        jobs_trend = round(((this_month_jobs['job_count'] - last_month_jobs['job_count']) / last_month_jobs['job_count'] * 100))
     else:
         jobs_trend = 0
     
@@ -96,9 +100,7 @@ def dashboard():
     last_payment_rate = calculate_payment_rate(last_month_jobs)
     payment_trend = payment_rate - last_payment_rate
     
-    return render_template(
-        'main/dashboard.html',
-        user=current_user,
+    return dict(
         active_clients=active_clients,
         total_profit=total_profit,
         total_paid=total_paid,
@@ -113,6 +115,25 @@ def dashboard():
         payment_trend=payment_trend
     )
 
+@main_bp.route('/dashboard')
+@login_required
+def dashboard():
+    # Serve the figures from the cache, keyed by month so trends roll over
+    now = datetime.utcnow()
+    cache_key = now.strftime('%Y-%m')
+    context = dashboard_cache.get(cache_key)
+    if context is None:
+        generation = dashboard_cache.generation()
+        context = get_dashboard_context(now)
+        dashboard_cache.set(cache_key, context, generation=generation)
+
+    return render_template('main/dashboard.html', user=current_user, **context)
+
+@main_bp.route('/dashboard/cache_stats')
+@login_required
+def dashboard_cache_stats():
+    return jsonify(dashboard_cache.stats())
+
 @main_bp.route('/health')
 def health_check():
     try:
@@ -11,14 +11,24 @@ celery.conf.beat_schedule = {
         'schedule': crontab(day_of_week=1, hour=9, minute=30),  # Monday at 9:30 AM
     },
 
-    'monthly-report': {
-        'task': 'app.tasks.get_monthly_report',
+    'monthly-reports': {
+        'task': 'app.tasks.run_monthly_reports',
         'schedule': crontab(day_of_month=1, hour=9, minute=30),  # 1st of every month at 9:30 AM
     },
 
-    'monthly_reminder_for_unpaid_jobs': {
-        'task': 'app.tasks.send_monthly_reminder_for_unpaid_jobs',
-        'schedule': crontab(day_of_month=1, hour=9, minute=30),  # 1st of every month at 9:30 AM
+    'nightly-job-amounts-check': {
+        'task': 'app.tasks.check_job_amounts',
+        'schedule': crontab(hour=3, minute=0),  # Every day at 3:00 AM
+    },
+
+    'month-end-invoices': {
+        'task': 'app.tasks.run_month_end_invoices',
+        'schedule': crontab(day_of_month=1, hour=6, minute=0),  # 1st of every month at 6:00 AM
+    },
+
+    'deliver-mail-outbox': {
+        'task': 'app.tasks.deliver_outbox',
+        'schedule': 30.0,  # Every 30 seconds
     }
 }
 
@@ -1,10 +1,12 @@
 from app import create_app
-from app.extensions import make_celery, celery
+from app.extensions import apply_worker_profile, make_celery, celery
 
 app = create_app()
 app.app_context().push()
 
 celery = make_celery(app)
+# CELERY_WORKER_PROFILE picks the queues and pool settings, e.g. "mail" for a worker only sending email
+apply_worker_profile(celery, app, app.config['CELERY_WORKER_PROFILE'])
 
 if __name__ == '__main__':
     celery.start()
\ No newline at end of file
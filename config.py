@@ -26,7 +26,112 @@ class Config:
     CELERY_TASK_SERIALIZER = 'json'
     CELERY_RESULT_SERIALIZER = 'json'
     CELERY_ACCEPT_CONTENT = ['json']
+    # Heavy reporting, latency-sensitive mail, and invoice API calls and rendering
+    # each get their own queue, so a slow report never holds up a confirmation email
+    CELERY_TASK_ROUTES = {
+        'app.tasks.send_test_email': {'queue': 'mail'},
+        'app.tasks.send_confirmation_email': {'queue': 'mail'},
+        'app.tasks.deliver_outbox': {'queue': 'mail'},
+        'app.tasks.send_weekly_reminder_for_unpaid_jobs': {'queue': 'reporting'},
+        'app.tasks.send_client_reminders': {'queue': 'reporting'},
+        'app.tasks.send_client_reminder': {'queue': 'reporting'},
+        'app.tasks.send_client_reminder_digest': {'queue': 'reporting'},
+        'app.tasks.send_monthly_reminder_for_unpaid_jobs': {'queue': 'reporting'},
+        'app.tasks.get_monthly_report': {'queue': 'reporting'},
+        'app.tasks.run_monthly_reports': {'queue': 'reporting'},
+        'app.tasks.build_report_snapshot': {'queue': 'reporting'},
+        'app.tasks.check_job_amounts': {'queue': 'reporting'},
+        'app.tasks.post_invoice': {'queue': 'invoices'},
+        'app.tasks.render_invoice': {'queue': 'invoices'},
+        'app.tasks.run_month_end_invoices': {'queue': 'invoices'},
+        'app.tasks.render_month_end_invoice': {'queue': 'invoices'},
+        'app.tasks.write_month_end_manifest': {'queue': 'invoices'},
+    }
+    # Worker settings per queue, picked with CELERY_WORKER_PROFILE by celery_worker.py.
+    # Results are only stored for tasks that declare ignore_result=False.
+    CELERY_WORKER_PROFILES = {
+        # Long jobs, one task at a time per process. Reports and reminders queue a
+        # new outbox email per run, so a redelivered task would email twice: ack early
+        'reporting': {
+            'queues': ['reporting', 'celery'],
+            'concurrency': 2,
+            'prefetch_multiplier': 1,
+            'acks_late': False,
+            'ignore_result': True,
+            'max_tasks_per_child': 20,
+        },
+        # Short tasks that must start at once. A confirmation email is queued
+        # again if its task is redelivered, so ack early here too
+        'mail': {
+            'queues': ['mail'],
+            'concurrency': 4,
+            'prefetch_multiplier': 1,
+            'acks_late': False,
+            'ignore_result': True,
+            'max_tasks_per_child': 1000,
+        },
+        # Mostly waiting on the invoice API; posting an invoice twice is not safe, so ack early
+        'invoices': {
+            'queues': ['invoices'],
+            'concurrency': 8,
+            'prefetch_multiplier': 4,
+            'acks_late': False,
+            'ignore_result': True,
+            'max_tasks_per_child': 200,
+        },
+        # A single worker for every queue, for development
+        'all': {
+            'queues': ['mail', 'reporting', 'invoices', 'celery'],
+            'concurrency': os.cpu_count() or 2,
+            'prefetch_multiplier': 1,
+            'acks_late': False,
+            'ignore_result': True,
+            'max_tasks_per_child': 100,
+        },
+    }
+    CELERY_WORKER_PROFILE = os.getenv('CELERY_WORKER_PROFILE', 'all')
+
+    # Dashboard cache (stored in the Celery Redis instance)
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 300))
+    # Month snapshots shared by the monthly report and reminder tasks
+    REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', 6 * 60 * 60))
+    # Seconds before a user can be sent another email confirmation link
+    CONFIRMATION_THROTTLE_CACHE_TTL = int(os.getenv('CONFIRMATION_THROTTLE_CACHE_TTL', 5 * 60))
     
+    # Listing page sizes
+    JOBS_PAGE_SIZE = int(os.getenv('JOBS_PAGE_SIZE', 50))
+    JOBS_MAX_PAGE_SIZE = 200
+    CLIENTS_PAGE_SIZE = int(os.getenv('CLIENTS_PAGE_SIZE', 50))
+    CLIENTS_MAX_PAGE_SIZE = 200
+
+    # Job form choices (cached per process)
+    FORM_CHOICES_TTL = int(os.getenv('FORM_CHOICES_TTL', 300))
+    # Above this many active clients the job form uses a typeahead instead of a <select>
+    JOB_FORM_CLIENT_SELECT_LIMIT = int(os.getenv('JOB_FORM_CLIENT_SELECT_LIMIT', 200))
+    CLIENT_TYPEAHEAD_LIMIT = 10
+
+    # Invoice API (called from the post_invoice Celery task)
+    INVOICE_API_URL = os.getenv('INVOICE_API_URL', 'https://your-lambda-api.com/generate-invoice')
+    INVOICE_API_CONNECT_TIMEOUT = 3.05
+    INVOICE_API_READ_TIMEOUT = 30
+    INVOICE_API_RETRIES = 3  # connection errors only, retried within the call
+    INVOICE_API_BACKOFF = 0.5  # seconds, doubled on each retry
+    # Timed out and 429/5xx calls are posted again by the post_invoice task instead
+    INVOICE_API_TASK_RETRIES = 3
+    INVOICE_API_TASK_RETRY_DELAY = 30  # seconds, doubled on each retry
+    INVOICE_API_BREAKER_THRESHOLD = 5  # consecutive failed calls before the circuit opens
+    INVOICE_API_BREAKER_RESET = 60  # seconds before a trial call is let through
+
+    # Locally rendered invoice PDFs; the web and worker processes must share this directory
+    INVOICE_PDF_DIR = os.getenv(
+        'INVOICE_PDF_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'invoices')
+    )
+    # Processes rendering `flask invoices month-end` in parallel; the Celery
+    # task spreads the same work over the worker pool instead
+    INVOICE_RUN_CONCURRENCY = int(os.getenv('INVOICE_RUN_CONCURRENCY', os.cpu_count() or 2))
+    # Let the front-end server (e.g. Apache mod_xsendfile) send downloaded files
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+
     # Mail settings
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
@@ -34,7 +139,24 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_USERNAME')
+    # Compiled templates/mail bytecode, shared by the web and worker processes
+    MAIL_TEMPLATE_CACHE_DIR = os.getenv(
+        'MAIL_TEMPLATE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'mail_templates')
+    )
+    # Outbox drained by the deliver_outbox task over one SMTP connection per run
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE', 50))
+    MAIL_OUTBOX_MAX_BATCHES = 20  # per run; the rest waits for the next run
+    MAIL_OUTBOX_MAX_ATTEMPTS = 8  # tries before an email is dead-lettered
+    MAIL_OUTBOX_RETRY_BACKOFF = 60  # seconds, doubled on each failed try
+    MAIL_OUTBOX_RETRY_MAX = 60 * 60  # longest wait between tries
+    MAIL_OUTBOX_LEASE = 5 * 60  # seconds a claimed email is hidden from other consumers
+    # Emails per minute to one recipient domain in a fan-out run, with per-domain overrides
+    MAIL_DOMAIN_RATE_LIMIT = int(os.getenv('MAIL_DOMAIN_RATE_LIMIT', 30))
+    MAIL_DOMAIN_RATE_LIMITS = {}
 
     # Business Notifications
     BUSINESS_NOTIFICATIONS_ENABLED = True
-    BUSINESS_NOTIFICATIONS_EMAIL = os.getenv('MAIL_DEFAULT_SENDER')
\ No newline at end of file
+    BUSINESS_NOTIFICATIONS_EMAIL = os.getenv('MAIL_DEFAULT_SENDER')
+    # Also email each overdue client with an address their own weekly reminder, with a digest of
+    # that run; the business weekly reminder still lists every unpaid payment
+    CLIENT_REMINDERS_ENABLED = os.getenv('CLIENT_REMINDERS_ENABLED', 'false').lower() == 'true'
\ No newline at end of file